@@ -2,8 +2,9 @@
 # The current backend runs on port 7071 instead of port 5000
 # This file is kept for reference but should not be used
 
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
+from werkzeug.security import safe_join
 import os
 import sys
 import traceback
@@ -12,11 +13,23 @@ import logging
 import base64
 import io
 import numpy as np
-from scipy.io.wavfile import write
 import json
 import uuid
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
 
+import audio_dsp
+import audio_renderer
+import waveform_index
+from http_media import CONTENT_ADDRESSED, IMMUTABLE_CACHE_CONTROL, send_media
+from audio_store import AudioStore
+from render_cache import RenderCache
+from render_executor import RenderQueueFull, RenderTimeout, create_executor_from_env
+from single_flight import SingleFlight
+from generation_jobs import JOB_COMPLETED, JOB_FAILED, FINISHED_STATUSES, GenerationJobRunner, SQLiteJobStore
+
 # Load environment variables
 load_dotenv()
 
@@ -25,6 +38,22 @@ AUDIO_OUTPUT_DIR = os.path.join(os.path.dirname(__file__), 'generated_audio')
 if not os.path.exists(AUDIO_OUTPUT_DIR):
     os.makedirs(AUDIO_OUTPUT_DIR)
 
+# Sharded, size-bounded store for everything written to AUDIO_OUTPUT_DIR
+audio_store = AudioStore(
+    AUDIO_OUTPUT_DIR,
+    max_bytes=int(os.environ.get('AUDIO_STORE_MAX_BYTES',
+                                 os.environ.get('RENDER_CACHE_MAX_BYTES', 1024 * 1024 * 1024)))
+)
+
+# Rendered files are content-addressed by their generation parameters
+render_cache = RenderCache(audio_store)
+
+# CPU-bound renders run in worker processes (RENDER_WORKERS, RENDER_QUEUE_DEPTH, RENDER_TIMEOUT)
+render_executor = create_executor_from_env()
+
+# Identical concurrent renders share one execution, across workers via lock files
+render_flights = SingleFlight(lock_dir=os.path.join(AUDIO_OUTPUT_DIR, '.locks'))
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -36,117 +65,45 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+MAX_WAVEFORM_BINS = 8192
+MAX_DURATION = 600  # seconds; also bounds the WAV header's 32-bit sizes
+
+# Streaming renders requested but not yet pulled, keyed by track id, oldest first.
+# Entries expire, and the oldest go once the cap is hit, so streams that are
+# never read (or abandoned mid-render) don't pile up.
+PENDING_STREAM_TTL = 600
+MAX_PENDING_STREAMS = 256
+pending_streams = OrderedDict()
+pending_streams_lock = threading.Lock()
+
+
+def remember_stream(track_id, params):
+    """Hold stream params until /api/stream/<track_id> is read; keeps the first expiry"""
+    now = time.monotonic()
+    params.setdefault('expires', now + PENDING_STREAM_TTL)
+    if params['expires'] <= now:
+        return
+    with pending_streams_lock:
+        while pending_streams and (len(pending_streams) >= MAX_PENDING_STREAMS
+                                   or next(iter(pending_streams.values()))['expires'] <= now):
+            pending_streams.popitem(last=False)
+        pending_streams.setdefault(track_id, params)
+
+
+def claim_stream(track_id):
+    """Take the pending params for a stream, or None if unknown or expired"""
+    with pending_streams_lock:
+        params = pending_streams.pop(track_id, None)
+    if params is None or params['expires'] <= time.monotonic():
+        return None
+    return params
+
 def generate_enhanced_audio(duration=30, genre='pop', mood='upbeat'):
     """
     Generate enhanced, pleasant audio based on parameters
-    Improved algorithm to avoid buzzing sounds
+    Rendered block by block, see audio_renderer.iter_audio_blocks for streaming
     """
-    sample_rate = 44100
-    t = np.linspace(0, duration, int(sample_rate * duration), False)
-    
-    # Create musical chord progressions for different genres
-    genre_progressions = {
-        'pop': [(261.63, 329.63, 392.00), (246.94, 311.13, 369.99), (293.66, 369.99, 440.00), (261.63, 329.63, 392.00)],
-        'rock': [(196.00, 246.94, 293.66), (220.00, 277.18, 329.63), (246.94, 311.13, 369.99), (196.00, 246.94, 293.66)],
-        'jazz': [(220.00, 277.18, 329.63), (246.94, 311.13, 369.99), (261.63, 329.63, 392.00), (196.00, 246.94, 293.66)],
-        'classical': [(261.63, 329.63, 392.00), (293.66, 369.99, 440.00), (329.63, 415.30, 493.88), (261.63, 329.63, 392.00)],
-        'electronic': [(130.81, 196.00, 261.63), (164.81, 246.94, 329.63), (196.00, 293.66, 392.00), (130.81, 196.00, 261.63)],
-        'hip-hop': [(82.41, 110.00, 146.83), (98.00, 130.81, 174.61), (110.00, 146.83, 196.00), (82.41, 110.00, 146.83)],
-        'ambient': [(174.61, 220.00, 261.63), (196.00, 246.94, 293.66), (220.00, 277.18, 329.63), (174.61, 220.00, 261.63)],
-        'cinematic': [(196.00, 261.63, 329.63), (220.00, 293.66, 369.99), (246.94, 329.63, 415.30), (196.00, 261.63, 329.63)],
-    }
-    
-    # Improved mood parameters
-    mood_params = {
-        'uplifting': {'attack': 0.1, 'decay': 0.3, 'sustain': 0.7, 'release': 0.4, 'brightness': 1.2, 'volume': 0.7},
-        'calm': {'attack': 0.2, 'decay': 0.5, 'sustain': 0.6, 'release': 0.8, 'brightness': 0.8, 'volume': 0.4},
-        'energetic': {'attack': 0.05, 'decay': 0.2, 'sustain': 0.8, 'release': 0.3, 'brightness': 1.3, 'volume': 0.8},
-        'dramatic': {'attack': 0.15, 'decay': 0.4, 'sustain': 0.9, 'release': 0.6, 'brightness': 1.1, 'volume': 0.9},
-        'upbeat': {'attack': 0.08, 'decay': 0.25, 'sustain': 0.75, 'release': 0.35, 'brightness': 1.25, 'volume': 0.75},
-    }
-    
-    # Get progression and parameters
-    progression = genre_progressions.get(genre, genre_progressions['pop'])
-    params = mood_params.get(mood, mood_params['upbeat'])
-    
-    # Generate audio with improved algorithm
-    audio = np.zeros_like(t)
-    chord_duration = duration / len(progression)
-    
-    for chord_idx, chord in enumerate(progression):
-        chord_start = chord_idx * chord_duration
-        chord_end = (chord_idx + 1) * chord_duration
-        
-        # Time mask for this chord
-        chord_mask = (t >= chord_start) & (t < chord_end)
-        chord_t = t[chord_mask] - chord_start
-        
-        if len(chord_t) > 0:
-            # Generate ADSR envelope
-            envelope = generate_adsr_envelope(chord_t, chord_duration, params)
-            
-            # Generate chord harmonics
-            chord_audio = np.zeros_like(chord_t)
-            for i, freq in enumerate(chord):
-                # Add multiple harmonics for richer sound
-                for harmonic in range(1, 4):
-                    harmonic_freq = freq * harmonic * params['brightness']
-                    if harmonic_freq < sample_rate / 2:  # Avoid aliasing
-                        amplitude = (0.7 ** (harmonic - 1)) * (0.8 ** i)
-                        wave = np.sin(2 * np.pi * harmonic_freq * chord_t)
-                        chord_audio += wave * amplitude
-            
-            # Apply envelope and add to main audio
-            audio[chord_mask] += chord_audio * envelope
-    
-    # Apply final volume and normalization
-    audio *= params['volume']
-    
-    # Smooth normalization to prevent clipping
-    if np.max(np.abs(audio)) > 0:
-        audio = audio / np.max(np.abs(audio)) * 0.7
-    
-    # Apply gentle filtering to reduce harshness
-    audio = apply_gentle_filter(audio, sample_rate)
-    
-    return audio
-
-def generate_adsr_envelope(t, duration, params):
-    """Generate ADSR (Attack, Decay, Sustain, Release) envelope"""
-    attack_time = duration * params['attack']
-    decay_time = duration * params['decay']
-    sustain_level = params['sustain']
-    release_time = duration * params['release']
-    
-    envelope = np.ones_like(t)
-    
-    for i, time in enumerate(t):
-        if time < attack_time:
-            # Attack phase
-            envelope[i] = time / attack_time
-        elif time < attack_time + decay_time:
-            # Decay phase
-            decay_progress = (time - attack_time) / decay_time
-            envelope[i] = 1.0 - (1.0 - sustain_level) * decay_progress
-        elif time < duration - release_time:
-            # Sustain phase
-            envelope[i] = sustain_level
-        else:
-            # Release phase
-            release_progress = (time - (duration - release_time)) / release_time
-            envelope[i] = sustain_level * (1.0 - release_progress)
-    
-    return envelope
-
-def apply_gentle_filter(audio, sample_rate):
-    """Apply gentle low-pass filter to reduce harshness"""
-    # Simple moving average filter
-    window_size = int(sample_rate * 0.0001)  # 0.1ms window
-    if window_size > 1:
-        kernel = np.ones(window_size) / window_size
-        audio = np.convolve(audio, kernel, mode='same')
-    
-    return audio
+    return audio_renderer.render_audio(duration, genre, mood)
 
 def generate_simple_audio(duration=30, genre='pop', mood='upbeat'):
     """
@@ -713,7 +670,6 @@ def generate_enhanced_music():
         mood = data.get('mood')
         instruments = data.get('instruments', [])
         template = data.get('template')
-        duration = int(data.get('duration', 30))
         user_id = data.get('user_id', 'demo_user')
         # Validate required fields
         if not genre or not mood or not instruments:
@@ -721,22 +677,35 @@ def generate_enhanced_music():
                 'success': False,
                 'error': 'Missing required parameters (genre, mood, instruments)'
             }), 400
+        try:
+            duration = int(data.get('duration', 30))
+        except (TypeError, ValueError):
+            duration = 0
+        if not 1 <= duration <= MAX_DURATION:
+            return jsonify({
+                'success': False,
+                'error': f'duration must be a whole number of seconds from 1 to {MAX_DURATION}'
+            }), 400
+        # The renderer's tables are lowercase; the cache key, the render and any
+        # queued job must all see the same spelling
+        genre, mood = normalize_render_params(genre, mood)
 
         # Always use fallback simple audio generator for now
         logger.warning("Enhanced generator not available or not implemented, returning mock audio.")
-        audio = generate_simple_audio(duration=duration, genre=genre, mood=mood)
-        sample_rate = 44100
-        filename = f"mock_{uuid.uuid4().hex}.wav"
-        filepath = os.path.join(AUDIO_OUTPUT_DIR, filename)
-        write(filepath, sample_rate, audio.astype(np.float32))
+        stream = bool(data.get('stream'))
+        cache_key = enhanced_cache_key(genre, mood, duration, instruments, template,
+                                       audio_format='pcm16' if stream else 'float32')
+        cached_filename = render_cache.lookup(cache_key)
+        filename = cached_filename or render_cache.filename_for(cache_key)
+        track_id = filename.replace('.wav', '')
         url = f"/api/download-audio/{filename}"
-        return jsonify({
+        result = {
             'status': 'success',
             'success': True,
             'audio_url': url,
             'download_url': url,
             'filename': filename,
-            'track_id': filename.replace('.wav', ''),
+            'track_id': track_id,
             'metadata': {
                 'title': f'Generated {genre.title()} - {mood.title()}',
                 'genre': genre,
@@ -745,8 +714,59 @@ def generate_enhanced_music():
                 'duration': duration
             },
             'stem_urls': {},
-            'mock': True
+            'mock': True,
+            'cached': cached_filename is not None
+        }
+
+        if stream:
+            result['stream_url'] = f"/api/stream/{track_id}"
+            result['streaming'] = True
+            if not cached_filename:
+                # Render lazily while /api/stream/<track_id> is being read
+                remember_stream(track_id, {
+                    'duration': duration, 'genre': genre, 'mood': mood, 'cache_key': cache_key
+                })
+            return jsonify(result)
+
+        if not cached_filename and wants_async(data):
+            # Record the request and answer immediately; poll /api/jobs/<job_id>
+            job_id = generation_jobs.submit(user_id, {
+                'genre': genre, 'mood': mood, 'duration': duration,
+                'instruments': instruments, 'structure': template or ''
+            })
+            if not job_id:
+                return jsonify({
+                    'success': False,
+                    'error': 'Could not queue the generation request'
+                }), 503
+            status_url = f"/api/jobs/{job_id}"
+            response = jsonify({
+                'success': True,
+                'status': 'pending',
+                'job_id': job_id,
+                'status_url': status_url,
+                'metadata': result['metadata']
+            })
+            response.headers['Location'] = status_url
+            return response, 202
+
+        if not cached_filename:
+            render_to_cache(cache_key, filename, genre, mood, duration)
+        return jsonify(result)
+    except RenderQueueFull as e:
+        logger.warning(f"Render queue full: {str(e)}")
+        response = jsonify({
+            'success': False,
+            'error': 'Render queue is full, please retry shortly'
         })
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    except RenderTimeout as e:
+        logger.error(f"Render timed out: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 504
     except Exception as e:
         logger.error(f"Enhanced music generation error: {str(e)}")
         traceback.print_exc()
@@ -755,12 +775,221 @@ def generate_enhanced_music():
             'error': f'Failed to generate enhanced music: {str(e)}'
         }), 500
 
+def normalize_render_params(genre, mood):
+    """Genre and mood as the renderer looks them up (and the render cache keys them)"""
+    return (genre or '').strip().lower(), (mood or '').strip().lower()
+
+def enhanced_cache_key(genre, mood, duration, instruments, template, audio_format='float32'):
+    """Render cache key for the enhanced-music parameters"""
+    return RenderCache.make_key(
+        genre, mood, duration, instruments, template,
+        engine_version=audio_renderer.ENGINE_VERSION,
+        audio_format=audio_format
+    )
+
+def wants_async(data):
+    """Clients opt into 202 + job polling with "async": true or Prefer: respond-async"""
+    return bool(data.get('async')) or 'respond-async' in request.headers.get('Prefer', '')
+
+def render_to_cache(cache_key, filename, genre, mood, duration):
+    """
+    Render a float32 WAV in the render pool and register it with the cache.
+    Identical concurrent renders, in this process or another worker, collapse
+    into one; everyone gets the same file.
+    """
+    filepath = audio_store.path_for(filename, create=True)
+
+    def render():
+        # Another worker may have finished it while we waited for the lock
+        if not os.path.exists(filepath):
+            # Synthesis runs in the render pool; this thread only waits for the file
+            render_executor.render_to_file(duration, genre, mood, filepath)
+        render_cache.add(cache_key, filename)
+        return filename
+
+    filename, shared = render_flights.do(cache_key, render)
+    if shared:
+        logger.info(f"Coalesced duplicate render {filename}")
+    return filename
+
+def render_generation_job(job):
+    """GenerationJobRunner callback: render a recorded request and return its track id"""
+    genre, mood = normalize_render_params(job['genre'], job['mood'])
+    cache_key = enhanced_cache_key(genre, mood, job['duration'],
+                                   job['instruments'], job['structure'] or None)
+    filename = render_cache.lookup(cache_key)
+    while not filename:
+        try:
+            filename = render_to_cache(cache_key, render_cache.filename_for(cache_key),
+                                       genre, mood, job['duration'])
+        except RenderQueueFull:
+            # Synchronous requests hold every render slot; wait for one to free up
+            time.sleep(1)
+    return filename[:-len('.wav')]
+
+# Background generation requests, recorded in a local copy of generation_requests
+generation_jobs = GenerationJobRunner(
+    SQLiteJobStore(os.environ.get('GENERATION_JOBS_DB', os.path.join(AUDIO_OUTPUT_DIR, 'generation_jobs.sqlite3'))),
+    render=render_generation_job,
+    workers=min(render_executor.workers, render_executor.queue_depth)
+)
+
+@app.before_request
+def start_generation_jobs():
+    """Start the job runner in the process that serves requests; no-op once running"""
+    generation_jobs.start()  # also picks up requests left unfinished by a restart
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_generation_job(job_id):
+    """Status of an asynchronous generation request"""
+    try:
+        job = generation_jobs.get(job_id)
+        if not job:
+            return jsonify({
+                "success": False,
+                "error": "Job not found"
+            }), 404
+
+        result = {
+            'success': True,
+            'job_id': job_id,
+            'status': job['status'],
+            'created_at': job['created_at'],
+            'completed_at': job['completed_at'],
+            'processing_time_ms': job['processing_time_ms'],
+            'metadata': {
+                'genre': job['genre'],
+                'mood': job['mood'],
+                'instruments': job['instruments'],
+                'duration': job['duration']
+            }
+        }
+        if job['status'] == JOB_COMPLETED:
+            filename = f"{job['result_track_id']}.wav"
+            url = f"/api/download-audio/{filename}"
+            result.update({'track_id': job['result_track_id'], 'filename': filename,
+                           'audio_url': url, 'download_url': url})
+        elif job['status'] == JOB_FAILED:
+            result['error'] = job['error_message']
+
+        response = jsonify(result)
+        if job['status'] not in FINISHED_STATUSES:
+            response.headers['Retry-After'] = '2'
+        return response
+    except Exception as e:
+        logger.error(f"Job status error: {str(e)}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+def stream_wav(track_id, params):
+    """Yield a WAV header and PCM blocks as they render, teeing them to disk"""
+    filepath = audio_store.path_for(f"{track_id}.wav", create=True)
+    part_path = filepath + '.part'
+    num_samples = audio_renderer.total_samples(params['duration'])
+    peaks = waveform_index.PeakBuilder(audio_renderer.SAMPLE_RATE)
+    completed = False
+    try:
+        with open(part_path, 'wb') as tee:
+            header = audio_dsp.wav_header(num_samples, audio_renderer.SAMPLE_RATE)
+            tee.write(header)
+            yield header
+            pcm = np.empty(audio_renderer.DEFAULT_BLOCK_SIZE, dtype='<i2')
+            for block in audio_renderer.iter_audio_blocks(params['duration'], params['genre'], params['mood']):
+                peaks.add(block)
+                chunk = audio_dsp.to_pcm16(block, out=pcm[:len(block)]).tobytes()
+                tee.write(chunk)
+                yield chunk
+        completed = True
+    finally:
+        if completed:
+            waveform_index.write_peaks(waveform_index.peaks_path(filepath), peaks.finish())
+            os.replace(part_path, filepath)
+            render_cache.add(params['cache_key'], os.path.basename(filepath))
+            logger.info(f"Streamed and saved {track_id}.wav")
+        else:
+            # Client went away mid-render; let the next request start over
+            # until the original request expires
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            remember_stream(track_id, params)
+
+def send_stored(filename, as_attachment=False):
+    """send_media for a file in the audio store; serving it counts as a use for LRU"""
+    response = send_media(audio_store.shard_dir(filename), filename, as_attachment=as_attachment)
+    if response is not None:
+        audio_store.touch(filename)
+    return response
+
+@app.route('/api/stream/<track_id>', methods=['GET'])
+def stream_audio(track_id):
+    """Stream a track as it renders; finished tracks are served from disk"""
+    try:
+        filepath = audio_store.path_for(f"{track_id}.wav")
+        params = claim_stream(track_id)
+
+        if params is None:
+            response = send_stored(f"{track_id}.wav")
+            if response is not None:
+                return response
+            if os.path.exists(filepath + '.part'):
+                return jsonify({
+                    "success": False,
+                    "error": "Track is already streaming, use the download URL once it completes"
+                }), 409
+            return jsonify({
+                "success": False,
+                "error": "Stream not found"
+            }), 404
+
+        # The final length is known from the duration, so the header is exact
+        num_samples = audio_renderer.total_samples(params['duration'])
+        response = Response(
+            stream_with_context(stream_wav(track_id, params)),
+            mimetype='audio/wav',
+            direct_passthrough=True
+        )
+        response.headers['Content-Length'] = str(44 + num_samples * 2)
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+    except Exception as e:
+        print(f"Stream error: {str(e)}", file=sys.stderr)
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@app.route('/api/waveform/<track_id>', methods=['GET'])
+def get_waveform(track_id):
+    """Min/max peaks of a rendered track, read from its precomputed .peaks index"""
+    try:
+        bins = min(max(request.args.get('bins', 512, type=int), 1), MAX_WAVEFORM_BINS)
+        filename = f"{track_id}{waveform_index.PEAKS_EXTENSION}"
+        path = safe_join(audio_store.shard_dir(filename), filename)
+        waveform = waveform_index.load_waveform(path, bins) if path else None
+        if waveform is None:
+            return jsonify({
+                "success": False,
+                "error": "Waveform not found"
+            }), 404
+        response = jsonify({"success": True, "track_id": track_id, **waveform})
+        if CONTENT_ADDRESSED.match(f"{track_id}.wav"):
+            response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        return response
+    except Exception as e:
+        print(f"Waveform error: {str(e)}", file=sys.stderr)
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
 @app.route('/api/download/<filename>', methods=['GET'])
 def download_file(filename):
     try:
-        filepath = os.path.join(AUDIO_OUTPUT_DIR, filename)
-        if os.path.exists(filepath):
-            return send_file(filepath, as_attachment=True)
+        response = send_stored(filename, as_attachment=True)
+        if response is not None:
+            return response
         else:
             return jsonify({
                 "success": False,
@@ -776,9 +1005,9 @@ def download_file(filename):
 @app.route('/api/download-audio/<filename>', methods=['GET'])
 def download_audio_file(filename):
     try:
-        filepath = os.path.join(AUDIO_OUTPUT_DIR, filename)
-        if os.path.exists(filepath):
-            return send_file(filepath, as_attachment=True)
+        response = send_stored(filename, as_attachment=True)
+        if response is not None:
+            return response
         else:
             return jsonify({
                 "success": False,
@@ -791,6 +1020,63 @@ def download_audio_file(filename):
             "error": str(e)
         }), 500
 
+@app.route('/api/music-library/save', methods=['POST'])
+def save_to_library():
+    """Save a generated track to a user's library, pinning it against eviction"""
+    try:
+        data = request.get_json() or {}
+        track_id = data.get('track_id')
+        user_id = data.get('user_id', 'demo_user')
+        if not track_id:
+            return jsonify({
+                "success": False,
+                "error": "track_id is required"
+            }), 400
+        if not audio_store.pin(f"{track_id}.wav", user_id):
+            return jsonify({
+                "success": False,
+                "error": "Track not found"
+            }), 404
+        return jsonify({
+            "success": True,
+            "message": "Track saved to library",
+            "track_id": track_id,
+            "user_id": user_id
+        })
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    except Exception as e:
+        print(f"Save to library error: {str(e)}", file=sys.stderr)
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@app.route('/api/music-library/<track_id>', methods=['DELETE'])
+def remove_from_library(track_id):
+    """Remove a track from a user's library; unpinned tracks become evictable again"""
+    try:
+        user_id = request.args.get('user_id', 'demo_user')
+        if not audio_store.unpin(f"{track_id}.wav", user_id):
+            return jsonify({
+                "success": False,
+                "error": "Track not found in library"
+            }), 404
+        return jsonify({
+            "success": True,
+            "message": "Track removed from library",
+            "track_id": track_id
+        })
+    except Exception as e:
+        print(f"Remove from library error: {str(e)}", file=sys.stderr)
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
 @app.route('/api/status', methods=['GET'])
 def get_status():
     try:
@@ -798,6 +1084,10 @@ def get_status():
             "success": True,
             "status": "running",
             "enhanced_generator": ENHANCED_GENERATOR_AVAILABLE,
+            "render_cache": render_cache.stats(),
+            "render_executor": render_executor.stats(),
+            "generation_jobs_queued": generation_jobs.queued(),
+            "single_flight": render_flights.stats(),
             "endpoints": [
                 "/api/generate-music",
                 "/api/advanced-generate", 
@@ -889,4 +1179,7 @@ if __name__ == '__main__':
     print(f"📡 API endpoints available at: http://localhost:{port}/api/")
     print(f"🔧 CORS enabled for: {', '.join(frontend_urls)}")
     
+    # With the reloader the serving process is the child; don't recover jobs in the watcher
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        generation_jobs.start()
     app.run(host='0.0.0.0', port=port, debug=True)
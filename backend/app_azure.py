@@ -5,8 +5,9 @@ Azure SQL DB, Azure OpenAI, and Azure Storage integration
 Resource Group: rg-portal-ai-music
 """
 
-from flask import Flask, request, jsonify, send_file, abort, send_from_directory, make_response
+from flask import Flask, request, jsonify, send_file, abort, make_response
 from flask_cors import CORS
+from werkzeug.security import safe_join
 import os
 import sys
 import traceback
@@ -18,6 +19,14 @@ from datetime import datetime
 import asyncio
 import threading
 
+from async_runtime import run_async, runtime
+from http_media import send_media
+from music_catalog import ORDERINGS, MusicCatalog
+from pagination import InvalidCursor, by_created_at, decode_cursor, next_cursor
+from search_index import SearchIndex
+from sql_pool import pool_stats
+import waveform_index
+
 # Enhanced Azure integration with free music data
 try:
     from azure_cloud_integration import (
@@ -30,9 +39,9 @@ try:
     )
     from free_music_data_manager import (
         free_music_manager,
-        download_free_music_data,
-        get_free_music_samples,
-        download_music_data_sync
+        catalog_sync,
+        sync_free_music_data,
+        get_free_music_samples
     )
     from azure_sql_manager import AzureSQLManager
     AZURE_AVAILABLE = True
@@ -82,7 +91,9 @@ def health_check():
                 "real_time_testing": True,
                 "audio_streaming": True,
                 "ai_generation": AZURE_AVAILABLE
-            }
+            },
+            "async_runtime": runtime.stats(),
+            "sql_pools": pool_stats()
         }
         
         if AZURE_AVAILABLE:
@@ -94,6 +105,13 @@ def health_check():
         logger.error(f"Health check failed: {e}")
         return jsonify({"status": "unhealthy", "error": str(e)}), 500
 
+STATIC_AUDIO_DIR = os.path.join(app.root_path, 'static', 'audio')
+MAX_WAVEFORM_BINS = 8192
+
+def static_waveform(filename, fallback):
+    """12-bar waveform from a static file's .peaks index, or the placeholder if it has none"""
+    return waveform_index.waveform_summary(waveform_index.peaks_path(os.path.join(STATIC_AUDIO_DIR, filename))) or fallback
+
 # Demo tracks with Azure Storage integration
 @app.route('/api/demo-tracks', methods=['GET'])
 def get_demo_tracks():
@@ -115,7 +133,7 @@ def get_demo_tracks():
                     "mood": "Energetic",
                     "created_at": "2025-01-20T10:00:00Z",
                     "tags": ["demo", "electronic", "ai-generated"],
-                    "waveform": [0.2, 0.8, 0.4, 0.9, 0.3, 0.7, 0.6, 0.5, 0.8, 0.2, 0.9, 0.4]
+                    "waveform": static_waveform("demo1.mp3", [0.2, 0.8, 0.4, 0.9, 0.3, 0.7, 0.6, 0.5, 0.8, 0.2, 0.9, 0.4])
                 },
                 {
                     "id": "demo_2",
@@ -126,7 +144,7 @@ def get_demo_tracks():
                     "mood": "Calm",
                     "created_at": "2025-01-20T10:15:00Z",
                     "tags": ["demo", "acoustic", "peaceful"],
-                    "waveform": [0.1, 0.3, 0.2, 0.4, 0.3, 0.5, 0.4, 0.3, 0.2, 0.4, 0.3, 0.2]
+                    "waveform": static_waveform("demo2.mp3", [0.1, 0.3, 0.2, 0.4, 0.3, 0.5, 0.4, 0.3, 0.2, 0.4, 0.3, 0.2])
                 },
                 {
                     "id": "demo_3",
@@ -137,7 +155,7 @@ def get_demo_tracks():
                     "mood": "Sophisticated",
                     "created_at": "2025-01-20T10:30:00Z",
                     "tags": ["demo", "jazz", "complex"],
-                    "waveform": [0.4, 0.7, 0.5, 0.8, 0.6, 0.9, 0.7, 0.6, 0.8, 0.5, 0.7, 0.4]
+                    "waveform": static_waveform("demo3.mp3", [0.4, 0.7, 0.5, 0.8, 0.6, 0.9, 0.7, 0.6, 0.8, 0.5, 0.7, 0.4])
                 },
                 {
                     "id": "demo_4",
@@ -148,7 +166,7 @@ def get_demo_tracks():
                     "mood": "Dramatic",
                     "created_at": "2025-01-20T10:45:00Z",
                     "tags": ["demo", "cinematic", "epic"],
-                    "waveform": [0.1, 0.9, 0.3, 0.8, 0.2, 0.7, 0.9, 0.4, 0.8, 0.3, 0.9, 0.1]
+                    "waveform": static_waveform("demo1.mp3", [0.1, 0.9, 0.3, 0.8, 0.2, 0.7, 0.9, 0.4, 0.8, 0.3, 0.9, 0.1])
                 },
                 {
                     "id": "demo_5",
@@ -159,7 +177,7 @@ def get_demo_tracks():
                     "mood": "Mystical",
                     "created_at": "2025-01-20T11:00:00Z",
                     "tags": ["demo", "ambient", "space"],
-                    "waveform": [0.3, 0.4, 0.5, 0.6, 0.4, 0.5, 0.3, 0.4, 0.6, 0.5, 0.4, 0.3]
+                    "waveform": static_waveform("demo2.mp3", [0.3, 0.4, 0.5, 0.6, 0.4, 0.5, 0.3, 0.4, 0.6, 0.5, 0.4, 0.3])
                 }
             ]
         
@@ -179,111 +197,155 @@ def get_demo_tracks():
             "message": str(e)
         }), 500
 
+# Enhanced fallback mock data with local audio files, served when Azure is unavailable
+FALLBACK_TRACKS = [
+    {
+        "id": "track_1",
+        "title": "My Epic Electronic Journey",
+        "genre": "Electronic",
+        "mood": "Energetic",
+        "duration": 180,
+        "url": "http://localhost:5002/audio/demo1.mp3",
+        "created_at": "2025-01-25T14:30:00Z",
+        "tags": ["user-generated", "epic", "electronic"],
+        "is_favorite": True
+    },
+    {
+        "id": "track_2",
+        "title": "Ambient Dreamscape",
+        "genre": "Ambient",
+        "mood": "Relaxed",
+        "duration": 240,
+        "url": "http://localhost:5002/audio/demo2.mp3",
+        "created_at": "2025-01-24T09:15:00Z",
+        "tags": ["ambient", "chill", "relaxing"],
+        "is_favorite": False
+    },
+    {
+        "id": "track_3",
+        "title": "Jazz Night Sessions",
+        "genre": "Jazz",
+        "mood": "Sophisticated",
+        "duration": 195,
+        "url": "http://localhost:5002/audio/demo3.mp3",
+        "created_at": "2025-01-23T16:45:00Z",
+        "tags": ["jazz", "night", "sophisticated"],
+        "is_favorite": True
+    },
+    {
+        "id": "track_4",
+        "title": "Cinematic Adventure",
+        "genre": "Cinematic",
+        "mood": "Dramatic",
+        "duration": 210,
+        "url": "http://localhost:5002/audio/demo1.mp3",
+        "created_at": "2025-01-22T11:30:00Z",
+        "tags": ["cinematic", "adventure", "dramatic"],
+        "is_favorite": False
+    },
+    {
+        "id": "track_5",
+        "title": "Acoustic Sunrise",
+        "genre": "Acoustic",
+        "mood": "Peaceful",
+        "duration": 165,
+        "url": "http://localhost:5002/audio/demo2.mp3",
+        "created_at": "2025-01-21T07:20:00Z",
+        "tags": ["acoustic", "sunrise", "peaceful"],
+        "is_favorite": True
+    },
+    {
+        "id": "track_6",
+        "title": "Rock Energy Burst",
+        "genre": "Rock",
+        "mood": "Energetic",
+        "duration": 200,
+        "url": "http://localhost:5002/audio/demo3.mp3",
+        "created_at": "2025-01-20T18:45:00Z",
+        "tags": ["rock", "energy", "powerful"],
+        "is_favorite": False
+    }
+]
+fallback_catalog = MusicCatalog(FALLBACK_TRACKS)
+fallback_search = SearchIndex(FALLBACK_TRACKS)
+
 # Music Library with Azure SQL Database integration
 @app.route('/api/music-library', methods=['GET'])
 def get_music_library():
-    """Get music library from Azure SQL Database"""
+    """Get music library, filtered by genre/mood and sorted by sortBy (date, name, duration, popularity)"""
     try:
         genre = request.args.get('genre', 'all')
+        mood = request.args.get('mood', 'all')
         sort_by = request.args.get('sortBy', 'date')
-        limit = int(request.args.get('limit', 50))
+        limit = max(1, int(request.args.get('limit', 50)))
+        page = max(1, int(request.args.get('page', 1)))
+        cursor = request.args.get('cursor')
+        
+        if sort_by not in ORDERINGS:
+            return jsonify({
+                "success": False,
+                "error": f"Invalid sortBy, expected one of: {', '.join(ORDERINGS)}"
+            }), 400
+        
+        after = None
+        if cursor:
+            try:
+                after = decode_cursor(cursor, sort_by)
+            except InvalidCursor as e:
+                return jsonify({"success": False, "error": str(e)}), 400
         
-        logger.info(f"🎵 Getting music library: genre={genre}, limit={limit}")
+        logger.info(f"🎵 Getting music library: genre={genre}, mood={mood}, sortBy={sort_by}, page={page}, limit={limit}, cursor={bool(cursor)}")
         
+        # A cursor replaces page; one extra row is fetched to tell whether another page exists
+        offset = 0 if after else (page - 1) * limit
+        source = "fallback"
+        position = by_created_at
         if AZURE_AVAILABLE:
-            # First try to get downloaded free music data
-            free_tracks = get_free_music_samples(limit)
-            if free_tracks and len(free_tracks) > 0:
-                # Filter by genre if specified
-                if genre and genre != 'all':
-                    free_tracks = [track for track in free_tracks if track.get('genre', '').lower() == genre.lower()]
-                tracks = free_tracks
+            # Downloaded free music data, served from the indexed catalog
+            catalog = free_music_manager.get_catalog()
+            if len(catalog):
+                tracks, total = catalog.page(genre=genre, mood=mood, sort_by=sort_by,
+                                             offset=offset, limit=limit + 1, after=after)
+                position = lambda track: catalog.position(track, sort_by)
+                source = "free_music_catalog"
             else:
-                # Fall back to Azure SQL
-                tracks = get_azure_music_library(genre=genre, limit=limit)
+                # Fall back to Azure SQL, which pages newest first on IX_tracks_created_at
+                if sort_by != 'date':
+                    return jsonify({
+                        "success": False,
+                        "error": "Azure SQL library only supports sortBy=date"
+                    }), 400
+                if offset:
+                    # Keyset paging only; OFFSET would scan every skipped row
+                    return jsonify({
+                        "success": False,
+                        "error": "Azure SQL library pages with cursor, not page; follow next_cursor"
+                    }), 400
+                try:
+                    tracks = get_azure_music_library(genre=genre, limit=limit + 1, after=after)
+                except InvalidCursor as e:
+                    return jsonify({"success": False, "error": str(e)}), 400
+                total = None
+                source = "azure_sql"
         else:
             # Enhanced fallback mock data with local audio files
-            tracks = [
-                {
-                    "id": "track_1",
-                    "title": "My Epic Electronic Journey",
-                    "genre": "Electronic",
-                    "mood": "Energetic",
-                    "duration": 180,
-                    "url": "http://localhost:5002/audio/demo1.mp3",
-                    "created_at": "2025-01-25T14:30:00Z",
-                    "tags": ["user-generated", "epic", "electronic"],
-                    "is_favorite": True
-                },
-                {
-                    "id": "track_2",
-                    "title": "Ambient Dreamscape",
-                    "genre": "Ambient",
-                    "mood": "Relaxed",
-                    "duration": 240,
-                    "url": "http://localhost:5002/audio/demo2.mp3",
-                    "created_at": "2025-01-24T09:15:00Z",
-                    "tags": ["ambient", "chill", "relaxing"],
-                    "is_favorite": False
-                },
-                {
-                    "id": "track_3",
-                    "title": "Jazz Night Sessions",
-                    "genre": "Jazz",
-                    "mood": "Sophisticated",
-                    "duration": 195,
-                    "url": "http://localhost:5002/audio/demo3.mp3",
-                    "created_at": "2025-01-23T16:45:00Z",
-                    "tags": ["jazz", "night", "sophisticated"],
-                    "is_favorite": True
-                },
-                {
-                    "id": "track_4",
-                    "title": "Cinematic Adventure",
-                    "genre": "Cinematic",
-                    "mood": "Dramatic",
-                    "duration": 210,
-                    "url": "http://localhost:5002/audio/demo1.mp3",
-                    "created_at": "2025-01-22T11:30:00Z",
-                    "tags": ["cinematic", "adventure", "dramatic"],
-                    "is_favorite": False
-                },
-                {
-                    "id": "track_5",
-                    "title": "Acoustic Sunrise",
-                    "genre": "Acoustic",
-                    "mood": "Peaceful",
-                    "duration": 165,
-                    "url": "http://localhost:5002/audio/demo2.mp3",
-                    "created_at": "2025-01-21T07:20:00Z",
-                    "tags": ["acoustic", "sunrise", "peaceful"],
-                    "is_favorite": True
-                },
-                {
-                    "id": "track_6",
-                    "title": "Rock Energy Burst",
-                    "genre": "Rock",
-                    "mood": "Energetic",
-                    "duration": 200,
-                    "url": "http://localhost:5002/audio/demo3.mp3",
-                    "created_at": "2025-01-20T18:45:00Z",
-                    "tags": ["rock", "energy", "powerful"],
-                    "is_favorite": False
-                }
-            ]
-            
-            # Filter by genre if specified
-            if genre and genre != 'all':
-                tracks = [track for track in tracks if track.get('genre', '').lower() == genre.lower()]
+            catalog = fallback_catalog
+            tracks, total = catalog.page(genre=genre, mood=mood, sort_by=sort_by,
+                                         offset=offset, limit=limit + 1, after=after)
+            position = lambda track: catalog.position(track, sort_by)
+        
+        tracks, next_page = next_cursor(tracks, limit, sort_by, position)
         
         return jsonify({
             "success": True,
-            "total": len(tracks),
+            "total": total,
             "tracks": tracks,
-            "page": 1,
+            "page": None if after else page,
             "limit": limit,
-            "has_more": len(tracks) >= limit,
-            "source": "azure_sql" if AZURE_AVAILABLE else "fallback"
+            "has_more": next_page is not None,
+            "next_cursor": next_page,
+            "sort_by": sort_by,
+            "source": source
         })
         
     except Exception as e:
@@ -297,11 +359,12 @@ def get_music_library():
 # Music Library Search with Azure integration
 @app.route('/api/music-library/search', methods=['GET'])
 def search_music_library():
-    """Search music library with Azure integration"""
+    """Full-text search (BM25) over title, artist, tags and description; the last word matches as a prefix"""
     try:
         query = request.args.get('q', '').strip()
         genre = request.args.get('genre', 'all')
         limit = int(request.args.get('limit', 50))
+        prefix = request.args.get('prefix', 'true').lower() != 'false'
         
         if not query:
             return jsonify({
@@ -311,28 +374,15 @@ def search_music_library():
         
         logger.info(f"🔍 Searching music library: query='{query}', genre={genre}")
         
-        # Mock search results for now
-        search_results = [
-            {
-                "id": "search_1",
-                "title": "Epic Search Result",
-                "genre": "Pop",
-                "mood": "Happy",
-                "duration": 150,
-                "url": "http://localhost:5002/audio/demo1.mp3",
-                "created_at": "2025-01-22T09:15:00Z",
-                "tags": ["search-result", "epic", "pop"],
-                "is_favorite": False,
-                "relevance_score": 0.95
-            }
-        ]
+        index, source = search_index_for_request()
+        results, total = index.search(query, genre=genre, limit=limit, prefix=prefix)
         
         return jsonify({
             "success": True,
             "query": query,
-            "total": len(search_results),
-            "tracks": search_results,
-            "source": "azure_search" if AZURE_AVAILABLE else "mock"
+            "total": total,
+            "tracks": [dict(track, relevance_score=score) for track, score in results],
+            "source": source
         })
         
     except Exception as e:
@@ -343,6 +393,32 @@ def search_music_library():
             "message": str(e)
         }), 500
 
+@app.route('/api/music-library/suggest', methods=['GET'])
+def suggest_music_library():
+    """Typeahead completions for a partial search query"""
+    query = request.args.get('q', '').strip()
+    try:
+        limit = max(1, min(50, int(request.args.get('limit', 10))))
+    except ValueError:
+        return jsonify({"success": False, "error": "limit must be an integer"}), 400
+    if not query:
+        return jsonify({"success": True, "query": query, "suggestions": []})
+    index, source = search_index_for_request()
+    return jsonify({
+        "success": True,
+        "query": query,
+        "suggestions": index.suggest(query, limit=limit),
+        "source": source
+    })
+
+def search_index_for_request():
+    """The catalog search index when free music data has been ingested, else the fallback tracks"""
+    if AZURE_AVAILABLE:
+        index = free_music_manager.get_search_index()
+        if len(index):
+            return index, "free_music_catalog"
+    return fallback_search, "fallback"
+
 # Music Generation with Azure OpenAI
 @app.route('/api/generate-music', methods=['POST'])
 def generate_music():
@@ -372,7 +448,7 @@ def generate_music():
             "tags": ["generated", "ai-music", genre.lower()],
             "prompt": prompt,
             "status": "completed",
-            "waveform": [0.3, 0.7, 0.5, 0.9, 0.4, 0.8, 0.6, 0.7, 0.5, 0.6, 0.8, 0.4],
+            "waveform": static_waveform("demo1.mp3", [0.3, 0.7, 0.5, 0.9, 0.4, 0.8, 0.6, 0.7, 0.5, 0.6, 0.8, 0.4]),
             "metadata": {
                 "generation_method": "ai_simulation",
                 "style": genre,
@@ -517,35 +593,34 @@ def test_integration():
 # Enhanced endpoints for free music data and Azure setup
 @app.route('/api/download-free-music-data', methods=['POST'])
 def download_free_music_data_endpoint():
-    """Download free music data from various APIs"""
+    """
+    Sync free music data from various APIs into the saved catalog.
+    Only new or changed tracks are fetched; an interrupted sync resumes from its
+    checkpoint. "limit" caps the tracks fetched per call, "full": true forces a full crawl.
+    """
+    if not AZURE_AVAILABLE:
+        return jsonify({
+            "success": False,
+            "error": "Free music data integration not available"
+        }), 503
+    
     try:
         data = request.get_json() or {}
         limit = int(data.get('limit', 200))
+        full = bool(data.get('full', False))
         
-        logger.info(f"🎵 Starting free music data download (limit: {limit})")
+        logger.info(f"🎵 Starting free music data sync (limit: {limit}, full: {full})")
         
-        if AZURE_AVAILABLE:
-            # Use async download
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                result = loop.run_until_complete(download_free_music_data(limit))
-            finally:
-                loop.close()
-        else:
-            # Use sync download
-            result = download_music_data_sync(limit)
-        
-        # Save to file
-        filename = free_music_manager.save_music_data_to_file()
+        # Runs on the shared loop (keeps the HTTP session warm)
+        result = run_async(sync_free_music_data(limit, full=full))
         
         return jsonify({
             "success": True,
-            "message": "Free music data download completed",
+            "message": "Free music data sync completed",
             "stats": result.get('stats', {}),
-            "total_tracks": len(result.get('tracks', [])),
-            "saved_to": filename,
-            "sources": list(set(track.get('source') for track in result.get('tracks', [])))
+            "total_tracks": result['total_tracks'],
+            "saved_to": catalog_sync.store.records_path,
+            "sources": list(result['stats']['sources'])
         })
         
     except Exception as e:
@@ -667,22 +742,30 @@ def upload_to_azure():
         file_data = file.read()
         filename = file.filename
         
-        # Upload to Azure
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            blob_url = loop.run_until_complete(
-                upload_track_to_azure(file_data, filename, {
+        # Peak index is built once at ingest so waveforms never need decoding later
+        peaks_data = waveform_index.build_for_bytes(file_data, filename)
+        
+        # Upload to Azure; audio and peaks go up concurrently on the shared loop
+        async def upload():
+            uploads = [upload_track_to_azure(file_data, filename, {
+                "uploaded_by": "user",
+                "file_size": len(file_data)
+            })]
+            if peaks_data:
+                uploads.append(upload_track_to_azure(peaks_data, waveform_index.peaks_path(filename), {
                     "uploaded_by": "user",
-                    "file_size": len(file_data)
-                })
-            )
-        finally:
-            loop.close()
+                    "peaks_for": filename
+                }))
+            return await asyncio.gather(*uploads)
+        
+        urls = run_async(upload())
+        blob_url = urls[0]
+        peaks_url = urls[1] if len(urls) > 1 else None
         
         return jsonify({
             "success": True,
             "url": blob_url,
+            "peaks_url": peaks_url,
             "filename": filename,
             "size": len(file_data)
         })
@@ -695,16 +778,36 @@ def upload_to_azure():
             "message": str(e)
         }), 500
 
+@app.route('/api/waveform/<track_id>', methods=['GET'])
+def get_waveform(track_id):
+    """Min/max peaks of a static track (by file name without extension) from its .peaks index"""
+    try:
+        bins = min(max(request.args.get('bins', 512, type=int), 1), MAX_WAVEFORM_BINS)
+        path = safe_join(STATIC_AUDIO_DIR, f"{track_id}{waveform_index.PEAKS_EXTENSION}")
+        waveform = waveform_index.load_waveform(path, bins) if path else None
+        if waveform is None:
+            return jsonify({
+                "success": False,
+                "error": "Waveform not found",
+                "track_id": track_id
+            }), 404
+        return jsonify({"success": True, "track_id": track_id, **waveform})
+    except Exception as e:
+        logger.error(f"❌ Waveform lookup failed: {e}")
+        return jsonify({
+            "success": False,
+            "error": "Failed to load waveform",
+            "message": str(e)
+        }), 500
+
 # Serve static audio files
 @app.route('/audio/<filename>')
 def serve_audio(filename):
     """Serve audio files - CORS handled by middleware"""
-    try:
-        response = send_from_directory('static/audio', filename)
-        response.headers['Content-Type'] = 'audio/mpeg'
-        response.headers['Cache-Control'] = 'no-cache'
+    response = send_media(STATIC_AUDIO_DIR, filename)
+    if response is not None:
         return response
-    except FileNotFoundError:
+    else:
         # Return a simple placeholder response for demo purposes
         return jsonify({
             "error": "Audio file not found",
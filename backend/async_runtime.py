@@ -0,0 +1,135 @@
+"""
+Process-wide asyncio runtime
+One event loop runs for the life of the app on a background thread; Flask
+request threads hand it coroutines and block on the result. Async clients
+(aiohttp sessions, Azure aio, OpenAI async) are created on this loop once and
+reused, so connection pools, keep-alives and DNS caches survive across requests.
+"""
+
+import asyncio
+import atexit
+import concurrent.futures
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Coroutine, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SHUTDOWN_TIMEOUT = 10.0  # seconds allowed for cleanup callbacks at exit
+
+
+class AsyncRuntime:
+    """
+    Long-lived event loop thread with a run_coroutine_threadsafe bridge.
+    Cleanup callbacks (async, no arguments) run on the loop at shutdown to
+    close whatever clients were bound to it.
+    """
+
+    def __init__(self, name: str = 'async-runtime'):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._cleanups: List[Callable[[], Awaitable[Any]]] = []
+        self.submitted = 0
+        self.failed = 0
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The runtime loop, started on first use"""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                self._start_locked()
+            return self._loop
+
+    def _start_locked(self) -> None:
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run() -> None:
+            asyncio.set_event_loop(loop)
+            loop.call_soon(ready.set)
+            loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name=self.name, daemon=True)
+        self._thread.start()
+        ready.wait()
+        self._loop = loop
+        logger.info(f"✅ Async runtime started on thread {self.name}")
+
+    def in_loop_thread(self) -> bool:
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def submit(self, coro: Coroutine) -> concurrent.futures.Future:
+        """Schedule coro on the runtime loop; returns a concurrent.futures.Future"""
+        loop = self.loop
+        with self._lock:
+            self.submitted += 1
+        return asyncio.run_coroutine_threadsafe(coro, loop)
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Run coro on the runtime loop and block the calling thread for its result"""
+        if self.in_loop_thread():
+            coro.close()
+            raise RuntimeError("AsyncRuntime.run() called from the runtime loop; await the coroutine instead")
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            with self._lock:
+                self.failed += 1
+            raise
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+
+    def register_cleanup(self, callback: Callable[[], Awaitable[Any]]) -> None:
+        """Close a loop-bound client when the runtime shuts down"""
+        with self._lock:
+            self._cleanups.append(callback)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            running = self._loop is not None and self._loop.is_running()
+            return {
+                'running': running,
+                'tasks': len(asyncio.all_tasks(self._loop)) if running else 0,
+                'submitted': self.submitted,
+                'failed': self.failed
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            cleanups, self._cleanups = self._cleanups, []
+            self._loop = self._thread = None
+        if loop is None or loop.is_closed():
+            return
+
+        async def close_all() -> None:
+            for callback in reversed(cleanups):
+                try:
+                    await callback()
+                except Exception as e:
+                    logger.warning(f"⚠️ Async cleanup failed: {e}")
+
+        try:
+            asyncio.run_coroutine_threadsafe(close_all(), loop).result(SHUTDOWN_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"⚠️ Async runtime cleanup did not finish: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(SHUTDOWN_TIMEOUT)
+        if not thread.is_alive():
+            loop.close()
+
+
+# Shared by every module in the process
+runtime = AsyncRuntime()
+atexit.register(runtime.shutdown)
+
+
+def run_async(coro: Coroutine, timeout: Optional[float] = None) -> Any:
+    """Run a coroutine on the shared runtime from synchronous code"""
+    return runtime.run(coro, timeout)
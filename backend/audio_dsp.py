@@ -0,0 +1,199 @@
+"""
+Vectorized DSP primitives for the AI Music Portal synthesizers
+Oscillators, ADSR envelopes, mixing, clipping and PCM conversion shared by
+app.py and generate_demo_music.py
+"""
+
+import struct
+import threading
+import numpy as np
+from typing import Callable, Dict, Hashable, Sequence
+
+SAMPLE_RATE = 44100
+TWO_PI = 2.0 * np.pi
+
+
+class ScratchBuffers:
+    """Per-thread reusable work arrays, grown on demand and never shrunk"""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def get(self, name: str, size: int, dtype=np.float32) -> np.ndarray:
+        """A view of size elements; contents are undefined"""
+        buffers = self._local.__dict__.setdefault('buffers', {})
+        key = (name, np.dtype(dtype).str)
+        buffer = buffers.get(key)
+        if buffer is None or len(buffer) < size:
+            buffer = np.empty(size, dtype=dtype)
+            buffers[key] = buffer
+        return buffer[:size]
+
+    def ramp(self, size: int, dtype=np.float64) -> np.ndarray:
+        """Cached 0, 1, 2, ... sample index ramp"""
+        ramps = self._local.__dict__.setdefault('ramps', {})
+        key = np.dtype(dtype).str
+        ramp = ramps.get(key)
+        if ramp is None or len(ramp) < size:
+            ramp = np.arange(size, dtype=dtype)
+            ramps[key] = ramp
+        return ramp[:size]
+
+
+scratch = ScratchBuffers()
+
+
+def sample_times(num_samples: int, sample_rate: int = SAMPLE_RATE, start: int = 0) -> np.ndarray:
+    """Time in seconds of samples start .. start + num_samples"""
+    return np.arange(start, start + num_samples, dtype=np.float64) / sample_rate
+
+
+def sine(frequency: float, t: np.ndarray, amplitude: float = 1.0) -> np.ndarray:
+    """Sine oscillator evaluated at times t (seconds)"""
+    wave = np.sin(TWO_PI * frequency * t)
+    if amplitude != 1.0:
+        wave *= amplitude
+    return wave
+
+
+def add_sine(out: np.ndarray, frequency: float, t: np.ndarray, amplitude: float = 1.0) -> np.ndarray:
+    """Accumulate a sine partial into out in place"""
+    wave = np.multiply(t, TWO_PI * frequency)
+    np.sin(wave, out=wave)
+    wave *= amplitude
+    out += wave
+    return out
+
+
+def chord(frequencies: Sequence[float], t: np.ndarray, amplitude: float = 1.0) -> np.ndarray:
+    """Equal-weight mix of sine partials, normalized by the number of notes"""
+    out = np.zeros_like(t, dtype=np.float64)
+    for freq in frequencies:
+        add_sine(out, freq, t, amplitude)
+    out /= len(frequencies)
+    return out
+
+
+def adsr_envelope(t: np.ndarray, attack: float, decay: float, sustain: float,
+                  release: float, length: float, out: np.ndarray = None) -> np.ndarray:
+    """
+    Piecewise ADSR envelope evaluated at monotonic positions t.
+    attack, decay, release and length share the unit of t (seconds or samples);
+    phases are resolved in the same order as the original per-sample loops, so
+    overlapping phases (attack + decay + release > length) behave identically.
+    Pass out to fill a preallocated (e.g. float32) buffer instead.
+    """
+    t = np.asarray(t, dtype=np.float64)
+    envelope = np.empty_like(t) if out is None else out
+    release_start = length - release
+
+    # t is sorted, so every phase is one contiguous slice
+    a_end, d_end, s_end = np.searchsorted(
+        t, [attack, attack + decay, max(release_start, attack + decay)], side='left'
+    )
+
+    if a_end:
+        np.divide(t[:a_end], attack, out=envelope[:a_end])
+    if d_end > a_end:
+        seg = envelope[a_end:d_end]
+        np.subtract(t[a_end:d_end], attack, out=seg)
+        seg *= -(1.0 - sustain) / decay
+        seg += 1.0
+    envelope[d_end:s_end] = sustain
+    if len(t) > s_end and release <= 0:
+        envelope[s_end:] = 0.0
+    elif len(t) > s_end:
+        seg = envelope[s_end:]
+        np.subtract(t[s_end:], release_start, out=seg)
+        seg *= -sustain / release
+        seg += sustain
+    return envelope
+
+
+def fade_edges(audio: np.ndarray, samples: int) -> np.ndarray:
+    """Apply short linear fade-in and fade-out ramps in place"""
+    samples = min(samples, len(audio) // 2)
+    if samples > 0:
+        ramp = np.linspace(0.0, 1.0, samples, endpoint=False, dtype=audio.dtype)
+        audio[:samples] *= ramp
+        audio[len(audio) - samples:] *= ramp[::-1]
+    return audio
+
+
+def tile_segments(sequence: Sequence[Hashable], render: Callable[[Hashable], np.ndarray]) -> np.ndarray:
+    """
+    Assemble a sequence of segment keys, rendering each distinct key once.
+    Repeats become block copies, so cost scales with the unique segments.
+    """
+    rendered: Dict[Hashable, np.ndarray] = {}
+    for key in sequence:
+        if key not in rendered:
+            rendered[key] = np.asarray(render(key))
+    if not rendered:
+        return np.zeros(0)
+
+    total = sum(len(rendered[key]) for key in sequence)
+    out = np.empty(total, dtype=next(iter(rendered.values())).dtype)
+    position = 0
+    for key in sequence:
+        segment = rendered[key]
+        out[position:position + len(segment)] = segment
+        position += len(segment)
+    return out
+
+
+def mix_into(target: np.ndarray, source: np.ndarray, offset: int = 0) -> np.ndarray:
+    """Add source into target at offset, dropping whatever falls outside target"""
+    if offset < 0:
+        source = source[-offset:]
+        offset = 0
+    end = min(len(target), offset + len(source))
+    if end > offset:
+        target[offset:end] += source[:end - offset]
+    return target
+
+
+def clip(audio: np.ndarray, limit: float = 1.0) -> np.ndarray:
+    """Hard-clip audio to [-limit, limit] in place"""
+    return np.clip(audio, -limit, limit, out=audio)
+
+
+def normalize_peak(audio: np.ndarray, target: float = 0.7) -> np.ndarray:
+    """Scale audio in place so its absolute peak equals target"""
+    peak = float(np.max(np.abs(audio))) if len(audio) else 0.0
+    if peak > 0:
+        audio *= target / peak
+    return audio
+
+
+def to_pcm16(audio: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    """Convert float audio in [-1, 1] to little-endian 16-bit PCM"""
+    if out is None:
+        scaled = np.clip(audio, -1.0, 1.0) * 32767
+        return scaled.astype('<i2')
+    # Preallocated path: clip and scale in a per-thread scratch buffer
+    scaled = scratch.get('pcm16', len(audio), audio.dtype)
+    np.clip(audio, -1.0, 1.0, out=scaled)
+    scaled *= 32767
+    np.copyto(out, scaled, casting='unsafe')  # truncates toward zero like int()
+    return out
+
+
+def peak_abs(audio: np.ndarray) -> float:
+    """Absolute peak without allocating an abs() copy"""
+    if not len(audio):
+        return 0.0
+    return float(max(audio.max(), -audio.min()))
+
+
+def wav_header(num_samples: int, sample_rate: int = SAMPLE_RATE, channels: int = 1,
+               bits_per_sample: int = 16) -> bytes:
+    """44-byte RIFF/WAVE header for PCM data of the given length"""
+    block_align = channels * bits_per_sample // 8
+    data_size = num_samples * block_align
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + data_size, b'WAVE',
+        b'fmt ', 16, 1, channels, sample_rate, sample_rate * block_align, block_align, bits_per_sample,
+        b'data', data_size
+    )
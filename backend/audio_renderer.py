@@ -0,0 +1,237 @@
+"""
+Block-based procedural music renderer
+Streams generate_enhanced_audio output as fixed-size float32 blocks so peak
+memory stays flat regardless of track duration
+"""
+
+import numpy as np
+from typing import Dict, Iterator, List, Tuple
+
+import audio_dsp
+import wavetable
+
+SAMPLE_RATE = audio_dsp.SAMPLE_RATE
+ENGINE_VERSION = '6'  # bump whenever the rendered bytes change
+DEFAULT_BLOCK_SIZE = 8192
+OUTPUT_PEAK = 0.7
+FILTER_SECONDS = 0.0001  # 0.1ms moving-average window to reduce harshness
+
+# Musical chord progressions for different genres
+GENRE_PROGRESSIONS = {
+    'pop': [(261.63, 329.63, 392.00), (246.94, 311.13, 369.99), (293.66, 369.99, 440.00), (261.63, 329.63, 392.00)],
+    'rock': [(196.00, 246.94, 293.66), (220.00, 277.18, 329.63), (246.94, 311.13, 369.99), (196.00, 246.94, 293.66)],
+    'jazz': [(220.00, 277.18, 329.63), (246.94, 311.13, 369.99), (261.63, 329.63, 392.00), (196.00, 246.94, 293.66)],
+    'classical': [(261.63, 329.63, 392.00), (293.66, 369.99, 440.00), (329.63, 415.30, 493.88), (261.63, 329.63, 392.00)],
+    'electronic': [(130.81, 196.00, 261.63), (164.81, 246.94, 329.63), (196.00, 293.66, 392.00), (130.81, 196.00, 261.63)],
+    'hip-hop': [(82.41, 110.00, 146.83), (98.00, 130.81, 174.61), (110.00, 146.83, 196.00), (82.41, 110.00, 146.83)],
+    'ambient': [(174.61, 220.00, 261.63), (196.00, 246.94, 293.66), (220.00, 277.18, 329.63), (174.61, 220.00, 261.63)],
+    'cinematic': [(196.00, 261.63, 329.63), (220.00, 293.66, 369.99), (246.94, 329.63, 415.30), (196.00, 261.63, 329.63)],
+}
+
+# Mood envelope and timbre parameters
+MOOD_PARAMS = {
+    'uplifting': {'attack': 0.1, 'decay': 0.3, 'sustain': 0.7, 'release': 0.4, 'brightness': 1.2, 'volume': 0.7},
+    'calm': {'attack': 0.2, 'decay': 0.5, 'sustain': 0.6, 'release': 0.8, 'brightness': 0.8, 'volume': 0.4},
+    'energetic': {'attack': 0.05, 'decay': 0.2, 'sustain': 0.8, 'release': 0.3, 'brightness': 1.3, 'volume': 0.8},
+    'dramatic': {'attack': 0.15, 'decay': 0.4, 'sustain': 0.9, 'release': 0.6, 'brightness': 1.1, 'volume': 0.9},
+    'upbeat': {'attack': 0.08, 'decay': 0.25, 'sustain': 0.75, 'release': 0.35, 'brightness': 1.25, 'volume': 0.75},
+}
+
+HARMONICS = 3
+HARMONIC_DECAY = 0.7  # level of harmonic h is HARMONIC_DECAY ** (h - 1)
+NOTE_LEVEL = 0.8  # each higher chord note is quieter by this factor
+TIMBRE = 'chord'
+MAX_CHORD_SECONDS = 7.5  # longer tracks cycle the progression
+SEAM_FADE_SAMPLES = 32
+
+# Band-limited tables for the chord timbre, built once per process
+wavetable.bank.register(TIMBRE, [HARMONIC_DECAY ** (h - 1) for h in range(1, HARMONICS + 1)])
+
+
+def total_samples(duration: float, sample_rate: int = SAMPLE_RATE) -> int:
+    """Number of samples rendered for a track of the given duration"""
+    return int(sample_rate * duration)
+
+
+def segment_schedule(num_samples: int, n_chords: int,
+                     sample_rate: int = SAMPLE_RATE) -> List[Tuple[int, int, int]]:
+    """
+    (chord index, start sample, length) for every chord segment of a track.
+    Short tracks stretch the progression over the whole duration; longer ones
+    cycle it with MAX_CHORD_SECONDS segments. All segments share one length
+    except the last, which absorbs the remainder, so repeats are identical.
+    """
+    if num_samples <= 0 or n_chords <= 0:
+        return []
+    length = max(1, min(num_samples // n_chords, int(MAX_CHORD_SECONDS * sample_rate)))
+    count = max(1, num_samples // length)
+    schedule = [(i % n_chords, i * length, length) for i in range(count)]
+    chord_idx, start, _ = schedule[-1]
+    schedule[-1] = (chord_idx, start, num_samples - start)
+    return schedule
+
+
+def chord_voices(chord: Tuple[float, ...], brightness: float) -> List[Tuple[float, float]]:
+    """
+    (frequency, amplitude) of every note of a chord. Brightness shifts the
+    voice pitch, which also decides how many harmonics its table can carry.
+    """
+    return [(freq * brightness, NOTE_LEVEL ** i) for i, freq in enumerate(chord)]
+
+
+class MovingAverageFilter:
+    """Causal moving-average low-pass that keeps its history across blocks"""
+
+    def __init__(self, window_size: int):
+        self.window_size = max(1, window_size)
+        self.history = np.zeros(self.window_size - 1, dtype=np.float32)
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """Filter block in place and return it"""
+        if self.window_size == 1:
+            return block
+        n = len(block)
+        tail = self.window_size - 1
+        padded = audio_dsp.scratch.get('smoother', n + tail)
+        padded[:tail] = self.history
+        padded[tail:] = block
+        self.history[:] = padded[n:]
+        # Sum of shifted views instead of np.convolve: no temporaries
+        np.add(padded[:n], padded[1:n + 1], out=block)
+        for shift in range(2, self.window_size):
+            block += padded[shift:shift + n]
+        block *= np.float32(1.0 / self.window_size)
+        return block
+
+
+class BlockRenderer:
+    """Renders one track as a sequence of float32 blocks"""
+
+    def __init__(self, duration: float = 30, genre: str = 'pop', mood: str = 'upbeat',
+                 sample_rate: int = SAMPLE_RATE, block_size: int = DEFAULT_BLOCK_SIZE):
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        self.num_samples = total_samples(duration, sample_rate)
+        self.progression = GENRE_PROGRESSIONS.get(genre, GENRE_PROGRESSIONS['pop'])
+        self.params = MOOD_PARAMS.get(mood, MOOD_PARAMS['upbeat'])
+        self.voices = [chord_voices(c, self.params['brightness']) for c in self.progression]
+        self.schedule = segment_schedule(self.num_samples, len(self.progression), sample_rate)
+
+        # Unique segments, rendered once and block-copied wherever they repeat
+        self._segments: Dict[Tuple, np.ndarray] = {}
+        self.segments_rendered = 0
+        self.peak = 0.0
+        self.gain = None
+
+    def _prepare(self, out: np.ndarray = None) -> None:
+        """
+        Render every unique segment and normalize them to OUTPUT_PEAK.
+        The track is made only of these segments, so their peak (tracked while
+        rendering) is the track peak and blocks can stream out pre-normalized.
+        With out, each segment is rendered straight into its first slot there.
+        """
+        if self.gain is not None:
+            return
+        for chord_idx, seg_start, seg_length in self.schedule:
+            slot = out[seg_start:seg_start + seg_length] if out is not None else None
+            self._segment(chord_idx, seg_length, slot)
+        self.gain = OUTPUT_PEAK / self.peak if self.peak > 0 else 0.0
+        gain = np.float32(self.gain)
+        for segment in self._segments.values():
+            segment *= gain
+            # Segments start and end near silence; short fades make every seam click-free
+            audio_dsp.fade_edges(segment, SEAM_FADE_SAMPLES)
+
+    def _segment(self, chord_idx: int, length: int, out: np.ndarray = None) -> np.ndarray:
+        """Rendered samples of one chord segment, shared by every repetition"""
+        key = (self.progression[chord_idx], length)
+        segment = self._segments.get(key)
+        if segment is None:
+            segment = self._render_segment(chord_idx, length, out)
+            self.peak = max(self.peak, audio_dsp.peak_abs(segment))
+            self._segments[key] = segment
+            self.segments_rendered += 1
+        return segment
+
+    def _render_segment(self, chord_idx: int, length: int, out: np.ndarray = None) -> np.ndarray:
+        """Synthesize one chord with its own envelope on a segment-local clock"""
+        chord_duration = length / self.sample_rate
+        if out is None:
+            chord_audio = np.zeros(length, dtype=np.float32)
+        else:
+            chord_audio = out
+            chord_audio.fill(0.0)
+        for freq, amplitude in self.voices[chord_idx]:
+            wavetable.bank.add_voice(chord_audio, TIMBRE, freq, amplitude, self.sample_rate)
+
+        t = audio_dsp.scratch.get('t', length, np.float64)
+        np.divide(audio_dsp.scratch.ramp(length), self.sample_rate, out=t)
+        wave = audio_dsp.scratch.get('wave', length)
+        envelope = audio_dsp.adsr_envelope(
+            t,
+            attack=chord_duration * self.params['attack'],
+            decay=chord_duration * self.params['decay'],
+            sustain=self.params['sustain'],
+            release=chord_duration * self.params['release'],
+            length=chord_duration,
+            out=wave
+        )
+        chord_audio *= envelope
+        return chord_audio
+
+    def _fill(self, out: np.ndarray, start: int, seg_idx: int) -> int:
+        """Copy samples start .. start + len(out) from the segments; returns the next seg_idx"""
+        end = start + len(out)
+        position = start
+        while position < end:
+            chord_idx, seg_start, seg_length = self.schedule[seg_idx]
+            if position >= seg_start + seg_length:
+                seg_idx += 1
+                continue
+            span_end = min(end, seg_start + seg_length)
+            segment = self._segment(chord_idx, seg_length)
+            out[position - start:span_end - start] = segment[position - seg_start:span_end - seg_start]
+            position = span_end
+        return seg_idx
+
+    def blocks(self) -> Iterator[np.ndarray]:
+        """
+        Yield the track as float32 blocks of at most block_size samples.
+        Blocks share one buffer: each is only valid until the next is requested.
+        """
+        self._prepare()
+        smoother = MovingAverageFilter(int(self.sample_rate * FILTER_SECONDS))
+        buffer = np.empty(self.block_size, dtype=np.float32)
+        seg_idx = 0
+        for block_start in range(0, self.num_samples, self.block_size):
+            block = buffer[:min(self.block_size, self.num_samples - block_start)]
+            seg_idx = self._fill(block, block_start, seg_idx)
+            yield smoother.process(block)
+
+    def render_into(self, out: np.ndarray) -> np.ndarray:
+        """Render the whole track into a preallocated float32 buffer of num_samples"""
+        self._prepare(out)
+        for chord_idx, seg_start, seg_length in self.schedule:
+            slot = out[seg_start:seg_start + seg_length]
+            segment = self._segment(chord_idx, seg_length)
+            if not np.shares_memory(segment, slot):
+                slot[:] = segment
+        # Filter last: the pass is in place and repeats are copied from earlier slots
+        smoother = MovingAverageFilter(int(self.sample_rate * FILTER_SECONDS))
+        for block_start in range(0, self.num_samples, self.block_size):
+            smoother.process(out[block_start:block_start + self.block_size])
+        return out
+
+
+def iter_audio_blocks(duration: float = 30, genre: str = 'pop', mood: str = 'upbeat',
+                      block_size: int = DEFAULT_BLOCK_SIZE,
+                      sample_rate: int = SAMPLE_RATE) -> Iterator[np.ndarray]:
+    """Generator of float32 audio blocks for the given parameters"""
+    return BlockRenderer(duration, genre, mood, sample_rate, block_size).blocks()
+
+
+def render_audio(duration: float = 30, genre: str = 'pop', mood: str = 'upbeat',
+                 block_size: int = DEFAULT_BLOCK_SIZE, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Render the whole track into a single float32 buffer"""
+    renderer = BlockRenderer(duration, genre, mood, sample_rate, block_size)
+    return renderer.render_into(np.empty(renderer.num_samples, dtype=np.float32))
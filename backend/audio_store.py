@@ -0,0 +1,285 @@
+"""
+Managed on-disk store for generated audio
+Files live in hash-prefix shard directories under a byte budget; the least
+recently used unpinned tracks are evicted together with their sidecars, and
+a persisted index means startup never has to walk the tree.
+Worker processes sharing a root coordinate through the filesystem: changes to
+the index happen under a lock file and re-read it first if another process
+wrote it, and recency is each file's atime, so every process evicts by the
+same order and honours the same pins.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: the lock is per process, so run one worker per store there
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024  # 1 GiB
+INDEX_FILENAME = 'audio_store_index.json'
+LOCK_FILENAME = 'audio_store.lock'
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.ogg', '.flac', '.m4a')
+SIDECAR_EXTENSIONS = ('.peaks',)  # derived files that live and die with their audio
+SHARD_CHARS = 2  # 256 shard directories
+
+
+class AudioStore:
+    """
+    Size-bounded LRU of audio files keyed by filename.
+    Pinned files (saved to a user's library) never count as eviction candidates.
+    """
+
+    def __init__(self, root: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(root, INDEX_FILENAME)
+        self.lock_path = os.path.join(root, LOCK_FILENAME)
+        # filename -> {size, pins: [owners], last_access}; a copy of the shared index
+        self._entries: Dict[str, Dict] = {}
+        self._total_bytes = 0
+        self._index_stamp: Optional[Tuple[int, int, int]] = None  # stat of the index we hold
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.evicted_bytes = 0
+
+        os.makedirs(root, exist_ok=True)
+        with self._locked():
+            if self._index_stamp is None:
+                self._migrate_flat_files_locked()
+        logger.info(f"✅ Audio store loaded: {len(self._entries)} files, {self._total_bytes} bytes")
+
+    @staticmethod
+    def shard_for(filename: str) -> str:
+        stem = os.path.splitext(filename)[0]
+        return hashlib.sha1(stem.encode('utf-8')).hexdigest()[:SHARD_CHARS]
+
+    def shard_dir(self, filename: str) -> str:
+        return os.path.join(self.root, self.shard_for(filename))
+
+    def path_for(self, filename: str, create: bool = False) -> str:
+        """Absolute path of filename (or one of its sidecars) inside its shard"""
+        if not filename or os.path.basename(filename) != filename or filename in ('.', '..'):
+            raise ValueError(f"Invalid audio filename: {filename!r}")
+        directory = self.shard_dir(filename)
+        if create:
+            os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, filename)
+
+    def sidecar_paths(self, filename: str) -> List[str]:
+        stem = os.path.splitext(filename)[0]
+        return [self.path_for(stem + extension) for extension in SIDECAR_EXTENSIONS]
+
+    def contains(self, filename: str) -> bool:
+        with self._locked():
+            return filename in self._entries
+
+    def touch(self, filename: str) -> bool:
+        """Mark a file as just used; False if it is unknown or vanished"""
+        with self._locked():
+            entry = self._entries.get(filename)
+            if entry is None:
+                return False
+            path = self.path_for(filename)
+            try:
+                # Recency lives in the atime so every process sees it without an
+                # index write; the mtime is left alone because ETags use it
+                now = time.time()
+                os.utime(path, (now, os.stat(path).st_mtime))
+            except FileNotFoundError:
+                # File vanished underneath us; forget it
+                self._forget_locked(filename)
+                self._save_index_locked()
+                return False
+            entry['last_access'] = now
+            return True
+
+    def add(self, filename: str) -> None:
+        """Register a finished file (and any sidecars) written at path_for(filename)"""
+        size = self._disk_size(filename)
+        with self._locked():
+            previous = self._entries.pop(filename, None)
+            if previous:
+                self._total_bytes -= previous['size']
+            self._entries[filename] = {
+                'size': size,
+                'pins': previous['pins'] if previous else [],
+                'last_access': time.time()
+            }
+            self._total_bytes += size
+            self._evict_locked(keep=filename)
+            self._save_index_locked()
+
+    def pin(self, filename: str, owner: str) -> bool:
+        """Keep filename out of eviction for owner; False if it is not in the store"""
+        with self._locked():
+            entry = self._entries.get(filename)
+            if entry is None:
+                return False
+            if owner not in entry['pins']:
+                entry['pins'].append(owner)
+                self._save_index_locked()
+            return True
+
+    def unpin(self, filename: str, owner: str) -> bool:
+        with self._locked():
+            entry = self._entries.get(filename)
+            if entry is None or owner not in entry['pins']:
+                return False
+            entry['pins'].remove(owner)
+            self._evict_locked()
+            self._save_index_locked()
+            return True
+
+    def is_pinned(self, filename: str) -> bool:
+        with self._locked():
+            entry = self._entries.get(filename)
+            return bool(entry and entry['pins'])
+
+    def stats(self) -> Dict:
+        with self._locked():
+            pinned = [entry for entry in self._entries.values() if entry['pins']]
+            return {
+                'files': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'pinned_files': len(pinned),
+                'pinned_bytes': sum(entry['size'] for entry in pinned),
+                'evictions': self.evictions,
+                'evicted_bytes': self.evicted_bytes
+            }
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Hold the store for this thread and process, with the index up to date"""
+        with self._lock:
+            fd = None
+            if fcntl is not None:
+                fd = os.open(self.lock_path, os.O_CREAT | os.O_RDWR, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                except BaseException:
+                    os.close(fd)
+                    raise
+            try:
+                self._refresh_locked()
+                yield
+            finally:
+                if fd is not None:
+                    os.close(fd)  # releases the flock
+
+    def _disk_size(self, filename: str) -> int:
+        size = os.path.getsize(self.path_for(filename))
+        for path in self.sidecar_paths(filename):
+            if os.path.exists(path):
+                size += os.path.getsize(path)
+        return size
+
+    def _forget_locked(self, filename: str) -> Dict:
+        entry = self._entries.pop(filename)
+        self._total_bytes -= entry['size']
+        return entry
+
+    def _evict_locked(self, keep: Optional[str] = None) -> None:
+        if self._total_bytes <= self.max_bytes:
+            return
+        # Any process may have served a file since the index was written, so
+        # order by atime; pinned entries and the file just added are skipped
+        candidates = []
+        for filename, entry in list(self._entries.items()):
+            if entry['pins'] or filename == keep:
+                continue
+            try:
+                entry['last_access'] = os.stat(self.path_for(filename)).st_atime
+            except FileNotFoundError:
+                self._forget_locked(filename)
+                continue
+            candidates.append((entry['last_access'], filename))
+        for _, filename in sorted(candidates):
+            if self._total_bytes <= self.max_bytes:
+                break
+            entry = self._forget_locked(filename)
+            self.evictions += 1
+            self.evicted_bytes += entry['size']
+            self._remove_files(filename)
+
+    def _remove_files(self, filename: str) -> None:
+        for path in [self.path_for(filename)] + self.sidecar_paths(filename):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"⚠️ Could not remove evicted file {path}: {e}")
+
+    def _index_stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.index_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _refresh_locked(self) -> None:
+        """Re-read the persisted index (no tree walk) if another process replaced it"""
+        stamp = self._index_stat()
+        if stamp is None or stamp == self._index_stamp:
+            return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Ignoring unreadable audio store index: {e}")
+            return
+
+        self._entries = {}
+        self._total_bytes = 0
+        for item in entries:
+            self._entries[item['filename']] = {
+                'size': item['size'],
+                'pins': item.get('pins', []),
+                'last_access': item.get('last_access', 0.0)
+            }
+            self._total_bytes += item['size']
+        self._index_stamp = stamp
+
+    def _migrate_flat_files_locked(self) -> None:
+        """One-off move of files from the old flat layout into shards (first start only)"""
+        moved = 0
+        with os.scandir(self.root) as it:
+            candidates = sorted((e for e in it if e.is_file() and e.name.endswith(AUDIO_EXTENSIONS)),
+                                key=lambda e: e.stat().st_mtime)
+        for entry in candidates:
+            target = self.path_for(entry.name, create=True)
+            os.replace(entry.path, target)
+            for extension in SIDECAR_EXTENSIONS:
+                sidecar = os.path.join(self.root, os.path.splitext(entry.name)[0] + extension)
+                if os.path.exists(sidecar):
+                    os.replace(sidecar, self.path_for(os.path.basename(sidecar)))
+            size = self._disk_size(entry.name)
+            self._entries[entry.name] = {'size': size, 'pins': [], 'last_access': entry.stat().st_mtime}
+            self._total_bytes += size
+            moved += 1
+        self._evict_locked()
+        self._save_index_locked()
+        if moved:
+            logger.info(f"✅ Moved {moved} audio files into the sharded layout")
+
+    def _save_index_locked(self) -> None:
+        entries = [{'filename': filename, **entry} for filename, entry in self._entries.items()]
+        tmp_path = self.index_path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, separators=(',', ':'))
+            os.replace(tmp_path, self.index_path)
+            self._index_stamp = self._index_stat()
+        except OSError as e:
+            logger.warning(f"⚠️ Failed to persist audio store index: {e}")
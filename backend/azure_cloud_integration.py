@@ -13,7 +13,9 @@ import json
 
 # Azure SDK imports
 from azure.identity import ClientSecretCredential
+from azure.identity.aio import ClientSecretCredential as AsyncClientSecretCredential
 from azure.storage.blob import BlobServiceClient, BlobClient
+from azure.storage.blob.aio import BlobServiceClient as AsyncBlobServiceClient
 from azure.keyvault.secrets import SecretClient
 import pyodbc
 
@@ -25,6 +27,12 @@ import tempfile
 import requests
 from pydub import AudioSegment
 
+from async_runtime import runtime
+from pagination import (
+    SQL_TIMESTAMP_PARAM, InvalidCursor, Position, keyset_predicate, sql_timestamp_text, timestamp_position
+)
+from sql_pool import get_pool
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -55,10 +63,15 @@ class AzureCloudIntegration:
         self.database_name = "PortalAIMusicDB"
         self.sql_username = "aimusic_admin"
         
+        # Async clients are bound to the shared runtime loop; created on first use there
+        self._async_credential = None
+        self._async_blob_service = None
+        
         # Initialize services
         self._init_storage()
         self._init_sql()
         self._init_openai()
+        runtime.register_cleanup(self.close_async_clients)
         
         logger.info("✅ Azure Cloud Integration initialized successfully")
     
@@ -118,10 +131,33 @@ class AzureCloudIntegration:
             logger.error(f"❌ Azure OpenAI initialization failed: {e}")
             self.openai_client = None
     
+    def _get_async_blob_service(self) -> AsyncBlobServiceClient:
+        """Async Blob client, created once on the runtime loop and reused for every upload"""
+        if self._async_blob_service is None:
+            self._async_credential = AsyncClientSecretCredential(
+                tenant_id=self.tenant_id,
+                client_id=self.client_id,
+                client_secret=self.client_secret
+            )
+            self._async_blob_service = AsyncBlobServiceClient(
+                account_url=f"https://{self.storage_account}.blob.core.windows.net",
+                credential=self._async_credential
+            )
+        return self._async_blob_service
+    
+    async def close_async_clients(self):
+        """Close the loop-bound clients (runtime shutdown)"""
+        if self._async_blob_service is not None:
+            await self._async_blob_service.close()
+            await self._async_credential.close()
+            self._async_blob_service = self._async_credential = None
+        if self.openai_client is not None:
+            await self.openai_client.close()
+    
     def _test_sql_connection(self):
         """Test SQL database connection"""
         try:
-            with pyodbc.connect(self.sql_connection_string, timeout=10) as conn:
+            with get_pool(self.sql_connection_string).connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("SELECT 1")
                 cursor.fetchone()
@@ -137,7 +173,7 @@ class AzureCloudIntegration:
                 raise Exception("Blob service not initialized")
             
             blob_name = f"audio/{datetime.now().strftime('%Y/%m/%d')}/{filename}"
-            blob_client = self.blob_service.get_blob_client(
+            blob_client = self._get_async_blob_service().get_blob_client(
                 container=self.container_name,
                 blob=blob_name
             )
@@ -249,7 +285,7 @@ class AzureCloudIntegration:
             if not self.sql_connection_string:
                 raise Exception("SQL connection not available")
             
-            with pyodbc.connect(self.sql_connection_string) as conn:
+            with get_pool(self.sql_connection_string).connection() as conn:
                 cursor = conn.cursor()
                 
                 # Insert track
@@ -277,34 +313,43 @@ class AzureCloudIntegration:
             logger.error(f"❌ Failed to save track to database: {e}")
             raise
     
-    def get_tracks_from_database(self, limit: int = 50, genre: str = None) -> List[Dict]:
-        """Get tracks from Azure SQL Database"""
+    def get_tracks_from_database(self, limit: int = 50, genre: str = None,
+                                 after: Optional[Position] = None) -> List[Dict]:
+        """Get tracks from Azure SQL Database, newest first, starting after the (created_at, id) position"""
         try:
             if not self.sql_connection_string:
                 return []
             
-            with pyodbc.connect(self.sql_connection_string) as conn:
+            with get_pool(self.sql_connection_string).connection() as conn:
                 cursor = conn.cursor()
                 
+                # created_at_key keeps the full DATETIME2(7) value for cursors
+                query = f"SELECT TOP (?) *, {sql_timestamp_text('created_at')} AS created_at_key FROM tracks WHERE 1 = 1"
+                params = [limit]
                 if genre and genre != 'all':
-                    query = "SELECT * FROM tracks WHERE genre = ? ORDER BY created_at DESC OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY"
-                    cursor.execute(query, (genre, limit))
-                else:
-                    query = "SELECT * FROM tracks ORDER BY created_at DESC OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY"
-                    cursor.execute(query, (limit,))
+                    query += " AND genre = ?"
+                    params.append(genre)
+                if after:
+                    # Keyset seek on IX_tracks_created_at instead of OFFSET, so deep pages stay cheap
+                    clause, clause_params = keyset_predicate('created_at', 'id', timestamp_position(after),
+                                                             key_param=SQL_TIMESTAMP_PARAM)
+                    query += f" AND {clause}"
+                    params.extend(clause_params)
+                query += " ORDER BY created_at DESC, id DESC"
+                cursor.execute(query, params)
                 
                 rows = cursor.fetchall()
                 tracks = []
                 
                 for row in rows:
                     track = {
-                        "id": row.id,
+                        "id": str(row.id),
                         "title": row.title,
                         "genre": row.genre,
                         "mood": row.mood,
                         "duration": row.duration,
                         "url": row.url,
-                        "created_at": row.created_at.isoformat() if row.created_at else None,
+                        "created_at": row.created_at_key,
                         "metadata": json.loads(row.metadata) if row.metadata else {},
                         "tags": ["database", "azure-sql"]
                     }
@@ -313,6 +358,8 @@ class AzureCloudIntegration:
                 logger.info(f"✅ Retrieved {len(tracks)} tracks from database")
                 return tracks
                 
+        except InvalidCursor:
+            raise  # the client's fault, answered with 400
         except Exception as e:
             logger.error(f"❌ Failed to get tracks from database: {e}")
             return []
@@ -412,9 +459,9 @@ def get_azure_demo_tracks():
     """Get demo tracks from Azure Storage"""
     return azure_integration.get_demo_tracks_from_storage()
 
-def get_azure_music_library(genre=None, limit=50):
-    """Get music library from Azure SQL"""
-    return azure_integration.get_tracks_from_database(limit=limit, genre=genre)
+def get_azure_music_library(genre=None, limit=50, after=None):
+    """Get music library from Azure SQL, keyset-paged after a (created_at, id) position"""
+    return azure_integration.get_tracks_from_database(limit=limit, genre=genre, after=after)
 
 def azure_health_check():
     """Get Azure services health status"""
@@ -12,6 +12,8 @@ import uuid
 import asyncio
 from typing import Optional, Dict, List, Any
 
+from sql_pool import get_pool
+
 # Azure imports
 try:
     import pyodbc
@@ -160,7 +162,7 @@ class AzureSQLManager:
     """Manages Azure SQL Database operations"""
     
     def __init__(self):
-        self.connection = None
+        self.pool = None
         self._initialize_database()
     
     def _initialize_database(self):
@@ -182,7 +184,8 @@ class AzureSQLManager:
                 f"Connection Timeout=30;"
             )
             
-            self.connection = pyodbc.connect(connection_string)
+            self.pool = get_pool(connection_string)
+            self.pool.prefill()
             print("✅ Azure SQL Database connected successfully")
             
             # Create tables if they don't exist
@@ -190,204 +193,202 @@ class AzureSQLManager:
             
         except Exception as e:
             print(f"❌ Failed to connect to Azure SQL: {e}", file=sys.stderr)
-            self.connection = None
+            self.pool = None
     
     def _create_tables(self):
         """Create database tables if they don't exist"""
-        if not self.connection:
+        if not self.pool:
             return
         
         try:
-            cursor = self.connection.cursor()
-            
-            # Users table
-            cursor.execute("""
-                IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='users' AND xtype='U')
-                CREATE TABLE users (
-                    id UNIQUEIDENTIFIER PRIMARY KEY DEFAULT NEWID(),
-                    email NVARCHAR(255) UNIQUE NOT NULL,
-                    plan NVARCHAR(50) DEFAULT 'free',
-                    quota_used INT DEFAULT 0,
-                    quota_limit INT DEFAULT 10,
-                    created_at DATETIME2 DEFAULT GETDATE(),
-                    updated_at DATETIME2 DEFAULT GETDATE()
-                )
-            """)
-            
-            # Tracks table
-            cursor.execute("""
-                IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='tracks' AND xtype='U')
-                CREATE TABLE tracks (
-                    id UNIQUEIDENTIFIER PRIMARY KEY DEFAULT NEWID(),
-                    user_id UNIQUEIDENTIFIER REFERENCES users(id),
-                    title NVARCHAR(255) NOT NULL,
-                    prompt NTEXT,
-                    genre NVARCHAR(100),
-                    mood NVARCHAR(100),
-                    duration INT,
-                    tempo INT,
-                    key_signature NVARCHAR(10),
-                    instruments NTEXT,
-                    effects NTEXT,
-                    structure NVARCHAR(255),
-                    audio_url NVARCHAR(500),
-                    blob_name NVARCHAR(255),
-                    file_size INT,
-                    created_at DATETIME2 DEFAULT GETDATE(),
-                    updated_at DATETIME2 DEFAULT GETDATE()
-                )
-            """)
-            
-            # User library table
-            cursor.execute("""
-                IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='user_library' AND xtype='U')
-                CREATE TABLE user_library (
-                    id UNIQUEIDENTIFIER PRIMARY KEY DEFAULT NEWID(),
-                    user_id UNIQUEIDENTIFIER REFERENCES users(id),
-                    track_id UNIQUEIDENTIFIER REFERENCES tracks(id),
-                    is_favorite BIT DEFAULT 0,
-                    playlist_id UNIQUEIDENTIFIER NULL,
-                    added_at DATETIME2 DEFAULT GETDATE()
-                )
-            """)
-            
-            # Playlists table
-            cursor.execute("""
-                IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='playlists' AND xtype='U')
-                CREATE TABLE playlists (
-                    id UNIQUEIDENTIFIER PRIMARY KEY DEFAULT NEWID(),
-                    user_id UNIQUEIDENTIFIER REFERENCES users(id),
-                    name NVARCHAR(255) NOT NULL,
-                    description NTEXT,
-                    is_public BIT DEFAULT 0,
-                    created_at DATETIME2 DEFAULT GETDATE(),
-                    updated_at DATETIME2 DEFAULT GETDATE()
-                )
-            """)
-            
-            self.connection.commit()
-            print("✅ Database tables created/verified successfully")
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                
+                # Users table
+                cursor.execute("""
+                    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='users' AND xtype='U')
+                    CREATE TABLE users (
+                        id UNIQUEIDENTIFIER PRIMARY KEY DEFAULT NEWID(),
+                        email NVARCHAR(255) UNIQUE NOT NULL,
+                        plan NVARCHAR(50) DEFAULT 'free',
+                        quota_used INT DEFAULT 0,
+                        quota_limit INT DEFAULT 10,
+                        created_at DATETIME2 DEFAULT GETDATE(),
+                        updated_at DATETIME2 DEFAULT GETDATE()
+                    )
+                """)
+                
+                # Tracks table
+                cursor.execute("""
+                    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='tracks' AND xtype='U')
+                    CREATE TABLE tracks (
+                        id UNIQUEIDENTIFIER PRIMARY KEY DEFAULT NEWID(),
+                        user_id UNIQUEIDENTIFIER REFERENCES users(id),
+                        title NVARCHAR(255) NOT NULL,
+                        prompt NTEXT,
+                        genre NVARCHAR(100),
+                        mood NVARCHAR(100),
+                        duration INT,
+                        tempo INT,
+                        key_signature NVARCHAR(10),
+                        instruments NTEXT,
+                        effects NTEXT,
+                        structure NVARCHAR(255),
+                        audio_url NVARCHAR(500),
+                        blob_name NVARCHAR(255),
+                        file_size INT,
+                        created_at DATETIME2 DEFAULT GETDATE(),
+                        updated_at DATETIME2 DEFAULT GETDATE()
+                    )
+                """)
+                
+                # User library table
+                cursor.execute("""
+                    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='user_library' AND xtype='U')
+                    CREATE TABLE user_library (
+                        id UNIQUEIDENTIFIER PRIMARY KEY DEFAULT NEWID(),
+                        user_id UNIQUEIDENTIFIER REFERENCES users(id),
+                        track_id UNIQUEIDENTIFIER REFERENCES tracks(id),
+                        is_favorite BIT DEFAULT 0,
+                        playlist_id UNIQUEIDENTIFIER NULL,
+                        added_at DATETIME2 DEFAULT GETDATE()
+                    )
+                """)
+                
+                # Playlists table
+                cursor.execute("""
+                    IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='playlists' AND xtype='U')
+                    CREATE TABLE playlists (
+                        id UNIQUEIDENTIFIER PRIMARY KEY DEFAULT NEWID(),
+                        user_id UNIQUEIDENTIFIER REFERENCES users(id),
+                        name NVARCHAR(255) NOT NULL,
+                        description NTEXT,
+                        is_public BIT DEFAULT 0,
+                        created_at DATETIME2 DEFAULT GETDATE(),
+                        updated_at DATETIME2 DEFAULT GETDATE()
+                    )
+                """)
+                
+                conn.commit()
+                print("✅ Database tables created/verified successfully")
             
         except Exception as e:
             print(f"❌ Failed to create database tables: {e}", file=sys.stderr)
-            if self.connection:
-                self.connection.rollback()
     
     def create_user(self, email: str, plan: str = 'free') -> Optional[str]:
         """Create a new user"""
-        if not self.connection:
+        if not self.pool:
             return None
         
         try:
-            cursor = self.connection.cursor()
-            user_id = str(uuid.uuid4())
-            
-            cursor.execute("""
-                INSERT INTO users (id, email, plan)
-                VALUES (?, ?, ?)
-            """, (user_id, email, plan))
-            
-            self.connection.commit()
-            print(f"✅ Created user: {email}")
-            return user_id
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                user_id = str(uuid.uuid4())
+                
+                cursor.execute("""
+                    INSERT INTO users (id, email, plan)
+                    VALUES (?, ?, ?)
+                """, (user_id, email, plan))
+                
+                conn.commit()
+                print(f"✅ Created user: {email}")
+                return user_id
             
         except Exception as e:
             print(f"❌ Failed to create user: {e}", file=sys.stderr)
-            if self.connection:
-                self.connection.rollback()
             return None
     
     def save_track(self, track_data: Dict[str, Any]) -> Optional[str]:
         """Save a generated track to database"""
-        if not self.connection:
+        if not self.pool:
             return None
         
         try:
-            cursor = self.connection.cursor()
-            track_id = str(uuid.uuid4())
-            
-            cursor.execute("""
-                INSERT INTO tracks (
-                    id, user_id, title, prompt, genre, mood, duration,
-                    tempo, key_signature, instruments, effects, structure,
-                    audio_url, blob_name, file_size
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                track_id,
-                track_data.get('user_id'),
-                track_data.get('title'),
-                track_data.get('prompt'),
-                track_data.get('genre'),
-                track_data.get('mood'),
-                track_data.get('duration'),
-                track_data.get('tempo'),
-                track_data.get('key'),
-                json.dumps(track_data.get('instruments', [])),
-                json.dumps(track_data.get('effects', [])),
-                track_data.get('structure'),
-                track_data.get('audio_url'),
-                track_data.get('blob_name'),
-                track_data.get('file_size')
-            ))
-            
-            self.connection.commit()
-            print(f"✅ Saved track: {track_data.get('title')}")
-            return track_id
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                track_id = str(uuid.uuid4())
+                
+                cursor.execute("""
+                    INSERT INTO tracks (
+                        id, user_id, title, prompt, genre, mood, duration,
+                        tempo, key_signature, instruments, effects, structure,
+                        audio_url, blob_name, file_size
+                    )
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    track_id,
+                    track_data.get('user_id'),
+                    track_data.get('title'),
+                    track_data.get('prompt'),
+                    track_data.get('genre'),
+                    track_data.get('mood'),
+                    track_data.get('duration'),
+                    track_data.get('tempo'),
+                    track_data.get('key'),
+                    json.dumps(track_data.get('instruments', [])),
+                    json.dumps(track_data.get('effects', [])),
+                    track_data.get('structure'),
+                    track_data.get('audio_url'),
+                    track_data.get('blob_name'),
+                    track_data.get('file_size')
+                ))
+                
+                conn.commit()
+                print(f"✅ Saved track: {track_data.get('title')}")
+                return track_id
             
         except Exception as e:
             print(f"❌ Failed to save track: {e}", file=sys.stderr)
-            if self.connection:
-                self.connection.rollback()
             return None
     
     def get_user_tracks(self, user_id: str, limit: int = 50) -> List[Dict[str, Any]]:
         """Get user's tracks from database"""
-        if not self.connection:
+        if not self.pool:
             return []
         
         try:
-            cursor = self.connection.cursor()
-            cursor.execute("""
-                SELECT 
-                    id, title, prompt, genre, mood, duration, tempo,
-                    key_signature, instruments, effects, structure,
-                    audio_url, created_at
-                FROM tracks
-                WHERE user_id = ?
-                ORDER BY created_at DESC
-                LIMIT ?
-            """, (user_id, limit))
-            
-            tracks = []
-            for row in cursor.fetchall():
-                tracks.append({
-                    'id': str(row[0]),
-                    'title': row[1],
-                    'prompt': row[2],
-                    'genre': row[3],
-                    'mood': row[4],
-                    'duration': row[5],
-                    'tempo': row[6],
-                    'key': row[7],
-                    'instruments': json.loads(row[8]) if row[8] else [],
-                    'effects': json.loads(row[9]) if row[9] else [],
-                    'structure': row[10],
-                    'url': row[11],
-                    'created_at': row[12].isoformat() if row[12] else None
-                })
-            
-            return tracks
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT 
+                        id, title, prompt, genre, mood, duration, tempo,
+                        key_signature, instruments, effects, structure,
+                        audio_url, created_at
+                    FROM tracks
+                    WHERE user_id = ?
+                    ORDER BY created_at DESC
+                    LIMIT ?
+                """, (user_id, limit))
+                
+                tracks = []
+                for row in cursor.fetchall():
+                    tracks.append({
+                        'id': str(row[0]),
+                        'title': row[1],
+                        'prompt': row[2],
+                        'genre': row[3],
+                        'mood': row[4],
+                        'duration': row[5],
+                        'tempo': row[6],
+                        'key': row[7],
+                        'instruments': json.loads(row[8]) if row[8] else [],
+                        'effects': json.loads(row[9]) if row[9] else [],
+                        'structure': row[10],
+                        'url': row[11],
+                        'created_at': row[12].isoformat() if row[12] else None
+                    })
+                
+                return tracks
             
         except Exception as e:
             print(f"❌ Failed to get user tracks: {e}", file=sys.stderr)
             return []
     
     def close(self):
-        """Close database connection"""
-        if self.connection:
-            self.connection.close()
-            print("✅ Database connection closed")
+        """Release the database pool (its connections are shared and closed at exit)"""
+        if self.pool:
+            self.pool = None
+            print("✅ Database connection released")
 
 class AzureIntegration:
     """Main Azure integration class"""
@@ -397,7 +398,7 @@ class AzureIntegration:
         self.database = AzureSQLManager()
         self.enabled = AZURE_AVAILABLE and (
             self.storage.blob_service_client is not None or 
-            self.database.connection is not None
+            self.database.pool is not None
         )
     
     def is_available(self) -> bool:
@@ -424,7 +425,7 @@ class AzureIntegration:
             }
             
             track_id = None
-            if self.database.connection:
+            if self.database.pool:
                 track_id = self.database.save_track(track_data)
             
             return {
@@ -443,7 +444,7 @@ class AzureIntegration:
     
     def get_user_music_library(self, user_id: str) -> List[Dict[str, Any]]:
         """Get user's music library from Azure SQL"""
-        if self.database.connection:
+        if self.database.pool:
             return self.database.get_user_tracks(user_id)
         return []
     
@@ -477,7 +478,7 @@ def test_azure_connectivity():
             print("❌ Azure Blob Storage: Not available")
         
         # Test database
-        if integration.database.connection:
+        if integration.database.pool:
             print("✅ Azure SQL Database: Connected")
         else:
             print("❌ Azure SQL Database: Not available")
@@ -10,6 +10,7 @@ import logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 import uuid
+from contextlib import ExitStack, contextmanager
 
 # Azure SDK imports
 try:
@@ -33,6 +34,7 @@ from azure_config import (
     DB_SCHEMA,
     FREE_MUSIC_APIS
 )
+from sql_pool import get_pool
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -43,7 +45,7 @@ class AzureIntegrationManager:
     
     def __init__(self):
         self.credential = None
-        self.sql_connection = None
+        self.sql_pool = get_pool(AZURE_SQL_CONFIG['connection_string'])
         self.blob_service_client = None
         self.secret_client = None
         self.openai_client = None
@@ -92,21 +94,20 @@ class AzureIntegrationManager:
             logger.error(f"❌ Failed to initialize Azure clients: {e}")
             self.initialized = False
     
+    @contextmanager
     def get_sql_connection(self):
-        """Get SQL database connection"""
+        """Check out a pooled SQL connection (None when Azure SQL is unavailable)"""
         if not AZURE_AVAILABLE:
-            return None
-            
-        try:
-            if not self.sql_connection or self.sql_connection.closed:
-                self.sql_connection = pyodbc.connect(
-                    AZURE_SQL_CONFIG['connection_string']
-                )
-                logger.info("✅ Azure SQL connection established")
-            return self.sql_connection
-        except Exception as e:
-            logger.error(f"❌ Failed to connect to Azure SQL: {e}")
-            return None
+            yield None
+            return
+            
+        with ExitStack() as stack:
+            try:
+                conn = stack.enter_context(self.sql_pool.connection())
+            except Exception as e:
+                logger.error(f"❌ Failed to connect to Azure SQL: {e}")
+                conn = None
+            yield conn
     
     async def initialize_database_schema(self):
         """Initialize database tables"""
@@ -114,21 +115,21 @@ class AzureIntegrationManager:
             return False
             
         try:
-            conn = self.get_sql_connection()
-            if not conn:
-                return False
+            with self.get_sql_connection() as conn:
+                if not conn:
+                    return False
+                    
+                cursor = conn.cursor()
                 
-            cursor = conn.cursor()
-            
-            for table_name, schema in DB_SCHEMA.items():
-                try:
-                    cursor.execute(schema)
-                    conn.commit()
-                    logger.info(f"✅ Table '{table_name}' created/verified")
-                except Exception as e:
-                    logger.warning(f"⚠️ Table '{table_name}' creation warning: {e}")
-            
-            return True
+                for table_name, schema in DB_SCHEMA.items():
+                    try:
+                        cursor.execute(schema)
+                        conn.commit()
+                        logger.info(f"✅ Table '{table_name}' created/verified")
+                    except Exception as e:
+                        logger.warning(f"⚠️ Table '{table_name}' creation warning: {e}")
+                
+                return True
             
         except Exception as e:
             logger.error(f"❌ Failed to initialize database schema: {e}")
@@ -200,34 +201,34 @@ class AzureIntegrationManager:
             return False
             
         try:
-            conn = self.get_sql_connection()
-            if not conn:
-                return False
+            with self.get_sql_connection() as conn:
+                if not conn:
+                    return False
+                    
+                cursor = conn.cursor()
                 
-            cursor = conn.cursor()
-            
-            insert_query = """
-                INSERT INTO tracks (id, user_id, title, prompt, genre, mood, duration, file_url, blob_name, metadata, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """
-            
-            cursor.execute(insert_query, (
-                track_data.get('id'),
-                track_data.get('user_id'),
-                track_data.get('title'),
-                track_data.get('prompt'),
-                track_data.get('genre'),
-                track_data.get('mood'),
-                track_data.get('duration'),
-                track_data.get('file_url'),
-                track_data.get('blob_name'),
-                json.dumps(track_data.get('metadata', {})),
-                datetime.now()
-            ))
-            
-            conn.commit()
-            logger.info(f"✅ Track saved to database: {track_data.get('id')}")
-            return True
+                insert_query = """
+                    INSERT INTO tracks (id, user_id, title, prompt, genre, mood, duration, file_url, blob_name, metadata, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """
+                
+                cursor.execute(insert_query, (
+                    track_data.get('id'),
+                    track_data.get('user_id'),
+                    track_data.get('title'),
+                    track_data.get('prompt'),
+                    track_data.get('genre'),
+                    track_data.get('mood'),
+                    track_data.get('duration'),
+                    track_data.get('file_url'),
+                    track_data.get('blob_name'),
+                    json.dumps(track_data.get('metadata', {})),
+                    datetime.now()
+                ))
+                
+                conn.commit()
+                logger.info(f"✅ Track saved to database: {track_data.get('id')}")
+                return True
             
         except Exception as e:
             logger.error(f"❌ Failed to save track to database: {e}")
@@ -239,39 +240,39 @@ class AzureIntegrationManager:
             return []
             
         try:
-            conn = self.get_sql_connection()
-            if not conn:
-                return []
+            with self.get_sql_connection() as conn:
+                if not conn:
+                    return []
+                    
+                cursor = conn.cursor()
                 
-            cursor = conn.cursor()
-            
-            query = """
-                SELECT id, title, genre, mood, duration, file_url, created_at, metadata
-                FROM tracks 
-                WHERE user_id = ?
-                ORDER BY created_at DESC
-                LIMIT ?
-            """
-            
-            cursor.execute(query, (user_id, limit))
-            rows = cursor.fetchall()
-            
-            tracks = []
-            for row in rows:
-                track = {
-                    'id': row[0],
-                    'title': row[1],
-                    'genre': row[2],
-                    'mood': row[3],
-                    'duration': row[4],
-                    'url': row[5],  # Using 'url' instead of 'audioUrl' for consistency
-                    'created_at': row[6].isoformat() if row[6] else None,
-                    'metadata': json.loads(row[7]) if row[7] else {}
-                }
-                tracks.append(track)
-            
-            logger.info(f"✅ Retrieved {len(tracks)} tracks for user {user_id}")
-            return tracks
+                query = """
+                    SELECT id, title, genre, mood, duration, file_url, created_at, metadata
+                    FROM tracks 
+                    WHERE user_id = ?
+                    ORDER BY created_at DESC
+                    LIMIT ?
+                """
+                
+                cursor.execute(query, (user_id, limit))
+                rows = cursor.fetchall()
+                
+                tracks = []
+                for row in rows:
+                    track = {
+                        'id': row[0],
+                        'title': row[1],
+                        'genre': row[2],
+                        'mood': row[3],
+                        'duration': row[4],
+                        'url': row[5],  # Using 'url' instead of 'audioUrl' for consistency
+                        'created_at': row[6].isoformat() if row[6] else None,
+                        'metadata': json.loads(row[7]) if row[7] else {}
+                    }
+                    tracks.append(track)
+                
+                logger.info(f"✅ Retrieved {len(tracks)} tracks for user {user_id}")
+                return tracks
             
         except Exception as e:
             logger.error(f"❌ Failed to get user tracks: {e}")
@@ -283,40 +284,40 @@ class AzureIntegrationManager:
             return self._get_fallback_demo_tracks()
             
         try:
-            conn = self.get_sql_connection()
-            if not conn:
-                return self._get_fallback_demo_tracks()
+            with self.get_sql_connection() as conn:
+                if not conn:
+                    return self._get_fallback_demo_tracks()
+                    
+                cursor = conn.cursor()
                 
-            cursor = conn.cursor()
-            
-            query = """
-                SELECT id, title, genre, duration, file_url, play_count
-                FROM demo_tracks 
-                WHERE featured = 1
-                ORDER BY play_count DESC, created_at DESC
-                LIMIT ?
-            """
-            
-            cursor.execute(query, (limit,))
-            rows = cursor.fetchall()
-            
-            demo_tracks = []
-            for row in rows:
-                track = {
-                    'id': row[0],
-                    'title': row[1],
-                    'genre': row[2],
-                    'duration': row[3],
-                    'url': row[4],  # Using 'url' instead of 'audioUrl'
-                    'play_count': row[5]
-                }
-                demo_tracks.append(track)
-            
-            if not demo_tracks:
-                return self._get_fallback_demo_tracks()
-            
-            logger.info(f"✅ Retrieved {len(demo_tracks)} demo tracks")
-            return demo_tracks
+                query = """
+                    SELECT id, title, genre, duration, file_url, play_count
+                    FROM demo_tracks 
+                    WHERE featured = 1
+                    ORDER BY play_count DESC, created_at DESC
+                    LIMIT ?
+                """
+                
+                cursor.execute(query, (limit,))
+                rows = cursor.fetchall()
+                
+                demo_tracks = []
+                for row in rows:
+                    track = {
+                        'id': row[0],
+                        'title': row[1],
+                        'genre': row[2],
+                        'duration': row[3],
+                        'url': row[4],  # Using 'url' instead of 'audioUrl'
+                        'play_count': row[5]
+                    }
+                    demo_tracks.append(track)
+                
+                if not demo_tracks:
+                    return self._get_fallback_demo_tracks()
+                
+                logger.info(f"✅ Retrieved {len(demo_tracks)} demo tracks")
+                return demo_tracks
             
         except Exception as e:
             logger.error(f"❌ Failed to get demo tracks: {e}")
@@ -384,24 +385,24 @@ class AzureIntegrationManager:
             return True  # Allow in demo mode
             
         try:
-            conn = self.get_sql_connection()
-            if not conn:
-                return False
+            with self.get_sql_connection() as conn:
+                if not conn:
+                    return False
+                    
+                cursor = conn.cursor()
                 
-            cursor = conn.cursor()
-            
-            # Update quota
-            update_query = """
-                UPDATE users 
-                SET quota_daily_used = quota_daily_used + ?
-                WHERE id = ?
-            """
-            
-            cursor.execute(update_query, (tracks_used, user_id))
-            conn.commit()
-            
-            logger.info(f"✅ Updated quota for user {user_id}")
-            return True
+                # Update quota
+                update_query = """
+                    UPDATE users 
+                    SET quota_daily_used = quota_daily_used + ?
+                    WHERE id = ?
+                """
+                
+                cursor.execute(update_query, (tracks_used, user_id))
+                conn.commit()
+                
+                logger.info(f"✅ Updated quota for user {user_id}")
+                return True
             
         except Exception as e:
             logger.error(f"❌ Failed to update user quota: {e}")
@@ -417,38 +418,38 @@ class AzureIntegrationManager:
             }
             
         try:
-            conn = self.get_sql_connection()
-            if not conn:
-                return {'daily_remaining': 50, 'daily_limit': 50, 'plan': 'free'}
+            with self.get_sql_connection() as conn:
+                if not conn:
+                    return {'daily_remaining': 50, 'daily_limit': 50, 'plan': 'free'}
+                    
+                cursor = conn.cursor()
                 
-            cursor = conn.cursor()
-            
-            query = """
-                SELECT quota_daily_limit, quota_daily_used, plan
-                FROM users 
-                WHERE id = ?
-            """
-            
-            cursor.execute(query, (user_id,))
-            row = cursor.fetchone()
-            
-            if row:
-                daily_limit, daily_used, plan = row
-                return {
-                    'daily_remaining': max(0, daily_limit - daily_used),
-                    'daily_limit': daily_limit,
-                    'daily_used': daily_used,
-                    'plan': plan
-                }
-            else:
-                # Create new user with default quota
-                await self.create_user(user_id, plan='free')
-                return {
-                    'daily_remaining': 50,
-                    'daily_limit': 50,
-                    'daily_used': 0,
-                    'plan': 'free'
-                }
+                query = """
+                    SELECT quota_daily_limit, quota_daily_used, plan
+                    FROM users 
+                    WHERE id = ?
+                """
+                
+                cursor.execute(query, (user_id,))
+                row = cursor.fetchone()
+                
+                if row:
+                    daily_limit, daily_used, plan = row
+                    return {
+                        'daily_remaining': max(0, daily_limit - daily_used),
+                        'daily_limit': daily_limit,
+                        'daily_used': daily_used,
+                        'plan': plan
+                    }
+                else:
+                    # Create new user with default quota
+                    await self.create_user(user_id, plan='free')
+                    return {
+                        'daily_remaining': 50,
+                        'daily_limit': 50,
+                        'daily_used': 0,
+                        'plan': 'free'
+                    }
                 
         except Exception as e:
             logger.error(f"❌ Failed to get user quota: {e}")
@@ -460,32 +461,32 @@ class AzureIntegrationManager:
             return True
             
         try:
-            conn = self.get_sql_connection()
-            if not conn:
-                return False
+            with self.get_sql_connection() as conn:
+                if not conn:
+                    return False
+                    
+                cursor = conn.cursor()
                 
-            cursor = conn.cursor()
-            
-            insert_query = """
-                INSERT INTO users (id, email, plan, quota_daily_limit, quota_daily_used, quota_reset_date, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """
-            
-            daily_limit = 50 if plan == 'free' else 500 if plan == 'creator' else 9999
-            
-            cursor.execute(insert_query, (
-                user_id,
-                email,
-                plan,
-                daily_limit,
-                0,
-                datetime.now().date(),
-                datetime.now()
-            ))
-            
-            conn.commit()
-            logger.info(f"✅ User created: {user_id}")
-            return True
+                insert_query = """
+                    INSERT INTO users (id, email, plan, quota_daily_limit, quota_daily_used, quota_reset_date, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """
+                
+                daily_limit = 50 if plan == 'free' else 500 if plan == 'creator' else 9999
+                
+                cursor.execute(insert_query, (
+                    user_id,
+                    email,
+                    plan,
+                    daily_limit,
+                    0,
+                    datetime.now().date(),
+                    datetime.now()
+                ))
+                
+                conn.commit()
+                logger.info(f"✅ User created: {user_id}")
+                return True
             
         except Exception as e:
             logger.error(f"❌ Failed to create user: {e}")
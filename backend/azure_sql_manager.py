@@ -7,29 +7,173 @@ Supports fine-tuning data, user management, and music generation tracking
 import pyodbc
 import json
 import logging
+import threading
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 import uuid
 
+from dedup import KIND_SOURCE, Deduplicator
+from pagination import (
+    SQL_TIMESTAMP_PARAM, InvalidCursor, Position, keyset_predicate, sql_timestamp_text, timestamp_position
+)
+from sql_pool import get_pool
+
 logger = logging.getLogger(__name__)
 
+DEDUP_SEED_BATCH = 5000  # rows fetched per round trip when seeding dedup
+
+# One seeded Deduplicator per database, shared by the short-lived managers
+_dedup_by_database: Dict[str, Deduplicator] = {}
+_dedup_lock = threading.Lock()
+
+UPSERT_BATCH_SIZE = 5000  # rows per staging load + MERGE
+
+# Bulk-load target for upserts; the primary key gives MERGE a sorted join input.
+# Pooled sessions outlive a failed upsert, so drop any leftover copy first.
+STAGING_TABLE_SQL = """
+    IF OBJECT_ID('tempdb..#staging_tracks') IS NOT NULL DROP TABLE #staging_tracks;
+    CREATE TABLE #staging_tracks (
+        source NVARCHAR(100) NOT NULL,
+        source_id NVARCHAR(255) NOT NULL,
+        title NVARCHAR(255) NOT NULL,
+        artist NVARCHAR(255),
+        genre NVARCHAR(100),
+        mood NVARCHAR(100),
+        duration INT,
+        audio_url NVARCHAR(500),
+        download_url NVARCHAR(500),
+        description NVARCHAR(MAX),
+        tags NVARCHAR(MAX),
+        license_type NVARCHAR(100),
+        license_url NVARCHAR(500),
+        metadata NVARCHAR(MAX),
+        PRIMARY KEY (source, source_id)
+    )
+"""
+
+STAGING_INSERT_SQL = """
+    INSERT INTO #staging_tracks (
+        source, source_id, title, artist, genre, mood, duration, audio_url,
+        download_url, description, tags, license_type, license_url, metadata
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Column sizes for setinputsizes / truncation, in STAGING_INSERT_SQL order (0 = MAX); duration is bound as int
+STAGING_COLUMN_SIZES = (100, 255, 255, 255, 100, 100, None, 500, 500, 0, 0, 100, 500, 0)
+
+# Insert new (source, source_id) pairs, update rows whose content changed
+# (EXCEPT compares NULLs as equal), and report how many of each happened.
+# HOLDLOCK keeps the key range locked from the match to the insert, so two
+# concurrent ingestions cannot both miss and both insert the same track.
+MERGE_STAGING_SQL = """
+    SET NOCOUNT ON;
+    DECLARE @actions TABLE (action NVARCHAR(10));
+    MERGE tracks WITH (HOLDLOCK) AS t
+    USING #staging_tracks AS s
+        -- source_id IS NOT NULL matches the filtered IX_tracks_source, so the join
+        -- and its range locks use the index instead of scanning tracks
+        ON t.source = s.source AND t.source_id = s.source_id AND t.source_id IS NOT NULL
+    WHEN MATCHED AND EXISTS (
+        SELECT s.title, s.artist, s.genre, s.mood, s.duration, s.audio_url, s.download_url,
+               s.description, s.tags, s.license_type, s.license_url, s.metadata
+        EXCEPT
+        SELECT t.title, t.artist, t.genre, t.mood, t.duration, t.audio_url, t.download_url,
+               t.description, t.tags, t.license_type, t.license_url, t.metadata
+    ) THEN UPDATE SET
+        title = s.title, artist = s.artist, genre = s.genre, mood = s.mood,
+        duration = s.duration, audio_url = s.audio_url, download_url = s.download_url,
+        description = s.description, tags = s.tags, license_type = s.license_type,
+        license_url = s.license_url, metadata = s.metadata, updated_at = GETUTCDATE()
+    WHEN NOT MATCHED BY TARGET THEN INSERT (
+        id, title, artist, genre, mood, duration, audio_url, download_url, description,
+        tags, source, source_id, license_type, license_url, metadata
+    ) VALUES (
+        NEWID(), s.title, s.artist, s.genre, s.mood, s.duration, s.audio_url, s.download_url,
+        s.description, s.tags, s.source, s.source_id, s.license_type, s.license_url, s.metadata
+    )
+    OUTPUT $action INTO @actions;
+    SELECT SUM(CASE WHEN action = 'INSERT' THEN 1 ELSE 0 END),
+           SUM(CASE WHEN action = 'UPDATE' THEN 1 ELSE 0 END)
+    FROM @actions;
+"""
+
+# Folds rows sharing (source, source_id), which concurrent per-row inserts
+# could create, into the oldest one so IX_tracks_source can be made unique.
+# References move to the kept row; user_tracks links it already has are dropped.
+MERGE_DUPLICATE_TRACKS_SQL = """
+    SET NOCOUNT ON;
+    IF OBJECT_ID('tempdb..#duplicate_tracks') IS NOT NULL DROP TABLE #duplicate_tracks;
+    SELECT id, keep_id INTO #duplicate_tracks FROM (
+        SELECT id, FIRST_VALUE(id) OVER (PARTITION BY source, source_id ORDER BY created_at, id) AS keep_id
+        FROM tracks WHERE source_id IS NOT NULL
+    ) ranked WHERE id <> keep_id;
+    WITH links AS (
+        SELECT ut.id, ROW_NUMBER() OVER (
+            PARTITION BY ut.user_id, COALESCE(d.keep_id, ut.track_id)
+            ORDER BY CASE WHEN d.id IS NULL THEN 0 ELSE 1 END, ut.created_at
+        ) AS n
+        FROM user_tracks ut LEFT JOIN #duplicate_tracks d ON ut.track_id = d.id
+        WHERE ut.track_id IN (SELECT id FROM #duplicate_tracks)
+           OR ut.track_id IN (SELECT keep_id FROM #duplicate_tracks)
+    )
+    DELETE FROM user_tracks WHERE id IN (SELECT id FROM links WHERE n > 1);
+    UPDATE x SET track_id = d.keep_id FROM user_tracks x JOIN #duplicate_tracks d ON x.track_id = d.id;
+    UPDATE x SET track_id = d.keep_id FROM ai_training_data x JOIN #duplicate_tracks d ON x.track_id = d.id;
+    UPDATE x SET track_id = d.keep_id FROM user_analytics x JOIN #duplicate_tracks d ON x.track_id = d.id;
+    UPDATE x SET result_track_id = d.keep_id FROM generation_requests x JOIN #duplicate_tracks d ON x.result_track_id = d.id;
+    DELETE t FROM tracks t JOIN #duplicate_tracks d ON t.id = d.id;
+    SELECT COUNT(*) FROM #duplicate_tracks;
+    DROP TABLE #duplicate_tracks;
+"""
+
+
+def _clip(value, size):
+    """Fit a string to its column; fast_executemany rejects right truncation"""
+    text = '' if value is None else str(value)
+    return text[:size] if size else text
+
+
+def _staging_row(track: Dict) -> tuple:
+    """Track -> #staging_tracks row, in STAGING_INSERT_SQL order"""
+    values = (
+        track.get('source', 'unknown'),
+        track.get('id', ''),
+        track.get('title', 'Unknown'),
+        track.get('artist', 'Unknown'),
+        track.get('genre', 'Various'),
+        track.get('mood', 'Neutral'),
+        int(track.get('duration') or 0),
+        track.get('url', ''),
+        track.get('download_url', ''),
+        track.get('description', ''),
+        json.dumps(track.get('tags', [])),
+        track.get('license', 'Unknown'),
+        track.get('license', ''),
+        json.dumps(track.get('metadata', {}))
+    )
+    return tuple(
+        value if size is None else _clip(value, size)
+        for value, size in zip(values, STAGING_COLUMN_SIZES)
+    )
+
+
 class AzureSQLManager:
     """Enhanced Azure SQL Database manager for AI Music Portal"""
     
     def __init__(self, connection_string: str):
         self.connection_string = connection_string
+        self.pool = get_pool(connection_string)
         self.is_connected = False
         self._test_connection()
     
     def _test_connection(self) -> bool:
         """Test database connection"""
         try:
-            with pyodbc.connect(self.connection_string, timeout=10) as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT 1")
-                cursor.fetchone()
+            # Checkout validates connections that sat idle, so a warm pool answers
+            # without a round trip and a cold one pays for the connect only once
+            with self.pool.connection():
                 self.is_connected = True
-                logger.info("✅ Azure SQL Database connected successfully")
+                logger.debug("✅ Azure SQL Database connected")
                 return True
         except Exception as e:
             logger.error(f"❌ Azure SQL connection failed: {e}")
@@ -39,7 +183,7 @@ class AzureSQLManager:
     def create_database_schema(self) -> bool:
         """Create complete database schema for AI Music Portal"""
         try:
-            with pyodbc.connect(self.connection_string) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 
                 # Users table
@@ -136,6 +280,8 @@ class AzureSQLManager:
                         result_track_id UNIQUEIDENTIFIER,
                         error_message NVARCHAR(MAX),
                         processing_time_ms INT,
+                        claimed_by NVARCHAR(255), -- worker id holding a processing request
+                        claimed_at DATETIME2,
                         created_at DATETIME2 DEFAULT GETUTCDATE(),
                         completed_at DATETIME2,
                         FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
@@ -207,11 +353,18 @@ class AzureSQLManager:
                     CREATE INDEX IX_tracks_created_at ON tracks(created_at DESC)
                 """)
                 
+                self._ensure_unique_track_source(conn, cursor)
+                
                 cursor.execute("""
                     IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name='IX_user_tracks_user_id')
                     CREATE INDEX IX_user_tracks_user_id ON user_tracks(user_id)
                 """)
                 
+                cursor.execute("""
+                    IF COL_LENGTH('generation_requests', 'claimed_by') IS NULL
+                    ALTER TABLE generation_requests ADD claimed_by NVARCHAR(255), claimed_at DATETIME2
+                """)
+                
                 cursor.execute("""
                     IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name='IX_generation_requests_user_status')
                     CREATE INDEX IX_generation_requests_user_status ON generation_requests(user_id, status)
@@ -225,95 +378,175 @@ class AzureSQLManager:
             logger.error(f"❌ Failed to create database schema: {e}")
             return False
     
+    def _ensure_unique_track_source(self, conn, cursor) -> None:
+        """
+        Upserts MERGE on (source, source_id), which must stay unique; generated
+        tracks have no source_id. Replaces the earlier non-unique index, folding
+        any duplicates it let in. Runs in its own transaction so a failure is
+        logged without undoing the rest of the schema.
+        """
+        cursor.execute("""
+            SELECT is_unique FROM sys.indexes
+            WHERE name = 'IX_tracks_source' AND object_id = OBJECT_ID('tracks')
+        """)
+        index = cursor.fetchone()
+        if index and index[0]:
+            return
+        conn.commit()
+        try:
+            cursor.execute(MERGE_DUPLICATE_TRACKS_SQL)
+            merged = cursor.fetchone()[0]
+            if index:
+                cursor.execute("DROP INDEX IX_tracks_source ON tracks")
+            cursor.execute("""
+                CREATE UNIQUE INDEX IX_tracks_source ON tracks(source, source_id)
+                WHERE source_id IS NOT NULL
+            """)
+            conn.commit()
+            if merged:
+                logger.info(f"✅ Merged {merged} duplicate (source, source_id) tracks")
+        except pyodbc.Error as e:
+            conn.rollback()
+            logger.error(f"❌ Could not make IX_tracks_source unique, upserts are not race-free: {e}")
+    
+    def _get_dedup(self, cursor) -> Deduplicator:
+        """Deduplicator for this database, seeded from the tracks table once per process"""
+        with _dedup_lock:
+            dedup = _dedup_by_database.get(self.connection_string)
+            if dedup is None:
+                dedup = Deduplicator()
+                cursor.execute(
+                    "SELECT source, source_id, title, artist, JSON_VALUE(metadata, '$.mbid') AS mbid FROM tracks"
+                )
+                seeded = 0
+                while True:
+                    rows = cursor.fetchmany(DEDUP_SEED_BATCH)
+                    if not rows:
+                        break
+                    dedup.seed({'source': row.source, 'id': row.source_id, 'title': row.title,
+                                'artist': row.artist, 'mbid': row.mbid} for row in rows)
+                    seeded += len(rows)
+                _dedup_by_database[self.connection_string] = dedup
+                logger.info(f"✅ Seeded track dedup with {seeded} database rows")
+            return dedup
+    
+    def _reset_dedup(self) -> None:
+        with _dedup_lock:
+            _dedup_by_database.pop(self.connection_string, None)
+    
     def insert_free_music_data(self, tracks_data: List[Dict]) -> int:
-        """Insert free music data into the database"""
+        """Insert free music data into the database; returns how many tracks were new"""
+        return self.upsert_free_music_data(tracks_data)['inserted']
+    
+    def upsert_free_music_data(self, tracks_data: List[Dict], batch_size: int = UPSERT_BATCH_SIZE) -> Dict[str, int]:
+        """
+        Bulk insert-or-update free music tracks on (source, source_id).
+        Each batch is bulk-loaded into a #staging_tracks temp table with
+        fast_executemany and applied with one MERGE. Tracks another source
+        already published (same MBID or normalized title/artist) are dropped
+        in memory first. Returns {'inserted', 'updated', 'skipped'}.
+        """
+        counts = {'inserted': 0, 'updated': 0, 'skipped': 0}
         if not self.is_connected:
             logger.error("❌ Database not connected")
-            return 0
+            return counts
         
-        inserted_count = 0
         try:
-            with pyodbc.connect(self.connection_string) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
+                dedup = self._get_dedup(cursor)
                 
+                # Last version of each (source, source_id) wins; a known source id is an
+                # update candidate for the MERGE, other known keys mean a cross-source duplicate
+                rows = {}
                 for track in tracks_data:
+                    if not track.get('id'):
+                        counts['skipped'] += 1
+                        continue
+                    kind = dedup.duplicate_of(track)
+                    if kind is not None and kind != KIND_SOURCE:
+                        counts['skipped'] += 1
+                        continue
                     try:
-                        # Check if track already exists
-                        cursor.execute(
-                            "SELECT id FROM tracks WHERE source = ? AND source_id = ?",
-                            (track.get('source'), track.get('id'))
-                        )
-                        
-                        if cursor.fetchone():
-                            continue  # Skip if already exists
-                        
-                        # Insert new track
-                        track_id = str(uuid.uuid4())
-                        cursor.execute("""
-                            INSERT INTO tracks (
-                                id, title, artist, genre, mood, duration, audio_url, 
-                                download_url, description, tags, source, source_id, 
-                                license_type, license_url, metadata
-                            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        """, (
-                            track_id,
-                            track.get('title', 'Unknown'),
-                            track.get('artist', 'Unknown'),
-                            track.get('genre', 'Various'),
-                            track.get('mood', 'Neutral'),
-                            track.get('duration', 0),
-                            track.get('url', ''),
-                            track.get('download_url', ''),
-                            track.get('description', ''),
-                            json.dumps(track.get('tags', [])),
-                            track.get('source', 'unknown'),
-                            track.get('id', ''),
-                            track.get('license', 'Unknown'),
-                            track.get('license', ''),
-                            json.dumps(track.get('metadata', {}))
-                        ))
-                        
-                        inserted_count += 1
-                        
-                    except Exception as e:
-                        logger.warning(f"⚠️ Failed to insert track {track.get('id')}: {e}")
+                        row = _staging_row(track)
+                    except (TypeError, ValueError) as e:
+                        # One malformed track (e.g. duration "3:45") must not sink the batch
+                        logger.warning(f"⚠️ Skipping track {track.get('id')}: {e}")
+                        counts['skipped'] += 1
                         continue
-                
-                conn.commit()
-                logger.info(f"✅ Inserted {inserted_count} tracks into database")
-                return inserted_count
+                    if (row[0], row[1]) in rows:
+                        counts['skipped'] += 1
+                    rows[(row[0], row[1])] = row
+                    dedup.add(track)
+                
+                cursor.execute(STAGING_TABLE_SQL)
+                cursor.fast_executemany = True
+                # NVARCHAR(MAX) columns must be bound as unbounded strings for fast_executemany
+                cursor.setinputsizes([
+                    (pyodbc.SQL_INTEGER, 0, 0) if size is None else (pyodbc.SQL_WVARCHAR, size, 0)
+                    for size in STAGING_COLUMN_SIZES
+                ])
+                
+                pending = list(rows.values())
+                for start in range(0, len(pending), batch_size):
+                    batch = pending[start:start + batch_size]
+                    cursor.execute("TRUNCATE TABLE #staging_tracks")
+                    cursor.executemany(STAGING_INSERT_SQL, batch)
+                    cursor.execute(MERGE_STAGING_SQL)
+                    inserted, updated = cursor.fetchone()
+                    inserted, updated = inserted or 0, updated or 0
+                    conn.commit()
+                    counts['inserted'] += inserted
+                    counts['updated'] += updated
+                    counts['skipped'] += len(batch) - inserted - updated  # matched but unchanged
+                
+                cursor.execute("DROP TABLE #staging_tracks")
+                logger.info(
+                    f"✅ Upserted free music data: {counts['inserted']} inserted, "
+                    f"{counts['updated']} updated, {counts['skipped']} skipped"
+                )
+                return counts
                 
         except Exception as e:
-            logger.error(f"❌ Failed to insert free music data: {e}")
-            return 0
+            logger.error(f"❌ Failed to upsert free music data: {e}")
+            self._reset_dedup()  # keys of rows that never landed were marked as known
+            return counts
     
-    def get_user_music_library(self, user_id: str, genre: str = None, limit: int = 50) -> List[Dict]:
-        """Get user's music library from database"""
+    def get_user_music_library(self, user_id: str, genre: str = None, limit: int = 50,
+                               after: Optional[Position] = None) -> List[Dict]:
+        """
+        Get user's music library from database, newest first.
+        after is the (created_at, id) of the last track of the previous page
+        (see pagination.decode_cursor); the page is a keyset seek on IX_tracks_created_at.
+        """
         if not self.is_connected:
             return []
         
         try:
-            with pyodbc.connect(self.connection_string) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 
                 query = """
-                    SELECT t.id, t.title, t.artist, t.genre, t.mood, t.duration, 
-                           t.audio_url, t.created_at, t.tags, ut.is_favorite
+                    SELECT TOP (?) t.id, t.title, t.artist, t.genre, t.mood, t.duration, 
+                           t.audio_url, {created_at_key} AS created_at_key, t.tags, ut.is_favorite
                     FROM tracks t
                     INNER JOIN user_tracks ut ON t.id = ut.track_id
                     WHERE ut.user_id = ?
-                """
+                """.format(created_at_key=sql_timestamp_text('t.created_at'))
                 
-                params = [user_id]
+                params = [limit, user_id]
                 
                 if genre and genre != 'all':
                     query += " AND t.genre = ?"
                     params.append(genre)
                 
-                query += " ORDER BY t.created_at DESC"
+                if after:
+                    clause, clause_params = keyset_predicate('t.created_at', 't.id', timestamp_position(after),
+                                                             key_param=SQL_TIMESTAMP_PARAM)
+                    query += f" AND {clause}"
+                    params.extend(clause_params)
                 
-                if limit:
-                    query = f"SELECT TOP {limit} * FROM ({query}) AS limited_results"
+                query += " ORDER BY t.created_at DESC, t.id DESC"
                 
                 cursor.execute(query, params)
                 rows = cursor.fetchall()
@@ -328,7 +561,7 @@ class AzureSQLManager:
                         'mood': row.mood,
                         'duration': row.duration,
                         'url': row.audio_url,
-                        'created_at': row.created_at.isoformat() if row.created_at else None,
+                        'created_at': row.created_at_key,
                         'tags': json.loads(row.tags) if row.tags else [],
                         'is_favorite': bool(row.is_favorite)
                     }
@@ -336,25 +569,28 @@ class AzureSQLManager:
                 
                 return tracks
                 
+        except InvalidCursor:
+            raise
         except Exception as e:
             logger.error(f"❌ Failed to get user music library: {e}")
             return []
     
-    def get_public_tracks(self, genre: str = None, limit: int = 50) -> List[Dict]:
-        """Get public tracks for music library"""
+    def get_public_tracks(self, genre: str = None, limit: int = 50,
+                          after: Optional[Position] = None) -> List[Dict]:
+        """Get public tracks for music library, newest first, starting after the (created_at, id) position"""
         if not self.is_connected:
             return []
         
         try:
-            with pyodbc.connect(self.connection_string) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 
                 query = """
                     SELECT TOP (?) id, title, artist, genre, mood, duration, 
-                           audio_url, created_at, tags, play_count
+                           audio_url, {created_at_key} AS created_at_key, tags, play_count
                     FROM tracks
                     WHERE is_public = 1
-                """
+                """.format(created_at_key=sql_timestamp_text('created_at'))
                 
                 params = [limit]
                 
@@ -362,7 +598,13 @@ class AzureSQLManager:
                     query += " AND genre = ?"
                     params.append(genre)
                 
-                query += " ORDER BY created_at DESC"
+                if after:
+                    clause, clause_params = keyset_predicate('created_at', 'id', timestamp_position(after),
+                                                             key_param=SQL_TIMESTAMP_PARAM)
+                    query += f" AND {clause}"
+                    params.extend(clause_params)
+                
+                query += " ORDER BY created_at DESC, id DESC"
                 
                 cursor.execute(query, params)
                 rows = cursor.fetchall()
@@ -377,7 +619,7 @@ class AzureSQLManager:
                         'mood': row.mood,
                         'duration': row.duration,
                         'url': row.audio_url,
-                        'created_at': row.created_at.isoformat() if row.created_at else None,
+                        'created_at': row.created_at_key,
                         'tags': json.loads(row.tags) if row.tags else [],
                         'play_count': row.play_count,
                         'is_favorite': False  # Default for public tracks
@@ -386,6 +628,8 @@ class AzureSQLManager:
                 
                 return tracks
                 
+        except InvalidCursor:
+            raise
         except Exception as e:
             logger.error(f"❌ Failed to get public tracks: {e}")
             return []
@@ -396,7 +640,7 @@ class AzureSQLManager:
             return None
         
         try:
-            with pyodbc.connect(self.connection_string) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 
                 request_id = str(uuid.uuid4())
@@ -432,20 +676,23 @@ class AzureSQLManager:
             logger.error(f"❌ Failed to save generation request: {e}")
             return None
     
-    def update_generation_status(self, request_id: str, status: str, track_id: str = None, error: str = None):
-        """Update generation request status"""
+    def update_generation_status(self, request_id: str, status: str, track_id: str = None, error: str = None,
+                                 processing_time_ms: int = None):
+        """Update generation request status; completed_at is only stamped once finished"""
         if not self.is_connected:
             return False
         
         try:
-            with pyodbc.connect(self.connection_string) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("""
                     UPDATE generation_requests 
-                    SET status = ?, result_track_id = ?, error_message = ?, completed_at = GETUTCDATE()
+                    SET status = ?, result_track_id = ?, error_message = ?,
+                        processing_time_ms = COALESCE(?, processing_time_ms),
+                        completed_at = CASE WHEN ? IN ('completed', 'failed') THEN GETUTCDATE() ELSE completed_at END
                     WHERE id = ?
-                """, (status, track_id, error, request_id))
+                """, (status, track_id, error, processing_time_ms, status, request_id))
                 
                 conn.commit()
                 return True
@@ -454,13 +701,109 @@ class AzureSQLManager:
             logger.error(f"❌ Failed to update generation status: {e}")
             return False
     
+    def claim_generation_request(self, request_id: str, worker_id: str) -> bool:
+        """Atomically move a pending request to processing for worker_id; False if it was not pending"""
+        if not self.is_connected:
+            return False
+        
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    UPDATE generation_requests
+                    SET status = 'processing', claimed_by = ?, claimed_at = GETUTCDATE()
+                    WHERE id = ? AND status = 'pending'
+                """, (worker_id, request_id))
+                claimed = cursor.rowcount == 1
+                conn.commit()
+                return claimed
+                
+        except Exception as e:
+            logger.error(f"❌ Failed to claim generation request: {e}")
+            return False
+    
+    def requeue_generation_request(self, request_id: str, claimed_by: Optional[str]) -> bool:
+        """Return a processing request to pending, only if claimed_by still holds it"""
+        if not self.is_connected:
+            return False
+        
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    UPDATE generation_requests
+                    SET status = 'pending', claimed_by = NULL, claimed_at = NULL
+                    WHERE id = ? AND status = 'processing'
+                        AND (claimed_by = ? OR (claimed_by IS NULL AND ? IS NULL))
+                """, (request_id, claimed_by, claimed_by))
+                requeued = cursor.rowcount == 1
+                conn.commit()
+                return requeued
+                
+        except Exception as e:
+            logger.error(f"❌ Failed to requeue generation request: {e}")
+            return False
+    
+    def get_generation_request(self, request_id: str) -> Optional[Dict]:
+        """Get a single generation request by id"""
+        if not self.is_connected:
+            return None
+        
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT * FROM generation_requests WHERE id = ?", (request_id,))
+                row = cursor.fetchone()
+                if not row:
+                    return None
+                columns = [column[0] for column in cursor.description]
+                return self._generation_row_to_dict(dict(zip(columns, row)))
+                
+        except Exception as e:
+            logger.error(f"❌ Failed to get generation request: {e}")
+            return None
+    
+    def get_generation_requests_by_status(self, statuses: List[str]) -> List[Dict]:
+        """Get generation requests in any of the given statuses, oldest first"""
+        if not self.is_connected or not statuses:
+            return []
+        
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                placeholders = ', '.join('?' for _ in statuses)
+                cursor.execute(f"""
+                    SELECT * FROM generation_requests
+                    WHERE status IN ({placeholders})
+                    ORDER BY created_at
+                """, tuple(statuses))
+                columns = [column[0] for column in cursor.description]
+                return [self._generation_row_to_dict(dict(zip(columns, row))) for row in cursor.fetchall()]
+                
+        except Exception as e:
+            logger.error(f"❌ Failed to get generation requests: {e}")
+            return []
+    
+    @staticmethod
+    def _generation_row_to_dict(request: Dict) -> Dict:
+        for key in ('id', 'user_id', 'result_track_id'):
+            if request.get(key) is not None:
+                request[key] = str(request[key])
+        request['instruments'] = json.loads(request['instruments']) if request.get('instruments') else []
+        request['custom_tags'] = json.loads(request['custom_tags']) if request.get('custom_tags') else []
+        request['vocals'] = bool(request.get('vocals'))
+        for key in ('created_at', 'completed_at', 'claimed_at'):
+            if request.get(key):
+                request[key] = request[key].isoformat()
+        return request
+    
     def get_database_stats(self) -> Dict:
         """Get database statistics"""
         if not self.is_connected:
             return {}
         
         try:
-            with pyodbc.connect(self.connection_string) as conn:
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 
                 stats = {}
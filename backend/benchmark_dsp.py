@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmark the vectorized DSP primitives against the original per-sample loops
+Run: python benchmark_dsp.py [duration_seconds]
+"""
+
+import sys
+import time
+import numpy as np
+
+import audio_dsp
+import generate_demo_music
+import wavetable
+
+SAMPLE_RATE = 44100
+MOOD = {'attack': 0.08, 'decay': 0.25, 'sustain': 0.75, 'release': 0.35}
+
+
+# Reference implementations kept verbatim from the pre-vectorized code
+
+def legacy_generate_adsr_envelope(t, duration, params):
+    attack_time = duration * params['attack']
+    decay_time = duration * params['decay']
+    sustain_level = params['sustain']
+    release_time = duration * params['release']
+    envelope = np.ones_like(t)
+    for i, time_ in enumerate(t):
+        if time_ < attack_time:
+            envelope[i] = time_ / attack_time
+        elif time_ < attack_time + decay_time:
+            decay_progress = (time_ - attack_time) / decay_time
+            envelope[i] = 1.0 - (1.0 - sustain_level) * decay_progress
+        elif time_ < duration - release_time:
+            envelope[i] = sustain_level
+        else:
+            release_progress = (time_ - (duration - release_time)) / release_time
+            envelope[i] = sustain_level * (1.0 - release_progress)
+    return envelope
+
+
+def legacy_generate_tone(frequency, duration, sample_rate=44100, volume=0.5):
+    frames = int(duration * sample_rate)
+    return [volume * np.sin(2 * np.pi * frequency * i / sample_rate) for i in range(frames)]
+
+
+def legacy_generate_chord(frequencies, duration, sample_rate=44100, volume=0.3):
+    frames = int(duration * sample_rate)
+    arr = []
+    for i in range(frames):
+        value = 0
+        for freq in frequencies:
+            value += volume * np.sin(2 * np.pi * freq * i / sample_rate)
+        arr.append(value / len(frequencies))
+    return arr
+
+
+def legacy_add_envelope(arr, attack=0.1, decay=0.1, sustain=0.7, release=0.2):
+    total_frames = len(arr)
+    attack_frames = int(attack * total_frames)
+    decay_frames = int(decay * total_frames)
+    release_frames = int(release * total_frames)
+    sustain_frames = total_frames - attack_frames - decay_frames - release_frames
+    result = []
+    for i, sample in enumerate(arr):
+        if i < attack_frames:
+            envelope = i / attack_frames
+        elif i < attack_frames + decay_frames:
+            envelope = 1.0 - (1.0 - sustain) * (i - attack_frames) / decay_frames
+        elif i < attack_frames + decay_frames + sustain_frames:
+            envelope = sustain
+        else:
+            envelope = sustain * (1.0 - (i - attack_frames - decay_frames - sustain_frames) / release_frames)
+        result.append(sample * envelope)
+    return result
+
+
+def legacy_pcm(audio_data):
+    import struct
+    return b''.join(
+        struct.pack('<h', int(max(-1.0, min(1.0, sample)) * 32767)) for sample in audio_data
+    )
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def compare(name, legacy, vectorized, duration):
+    (old, old_time), (new, new_time) = legacy, vectorized
+    if isinstance(old, bytes):
+        error = 0.0 if old == new else float('inf')
+    else:
+        error = float(np.max(np.abs(np.asarray(old) - np.asarray(new))))
+    print(f"{name:<22} {old_time * 1000 / duration:>10.2f} {new_time * 1000 / duration:>10.3f} "
+          f"{old_time / max(new_time, 1e-9):>9.0f}x {error:>10.2e}")
+
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 10.0
+    frames = int(duration * SAMPLE_RATE)
+    t = np.linspace(0, duration, frames, False)
+    chord = [261.63, 329.63, 392.00]
+
+    print(f"🎚️ DSP benchmark over {duration:.1f}s of audio ({frames} samples)")
+    print(f"{'primitive':<22} {'legacy ms/s':>10} {'numpy ms/s':>10} {'speedup':>10} {'max error':>10}")
+
+    compare(
+        "adsr_envelope",
+        timed(legacy_generate_adsr_envelope, t, duration, MOOD),
+        timed(audio_dsp.adsr_envelope, t, duration * MOOD['attack'], duration * MOOD['decay'],
+              MOOD['sustain'], duration * MOOD['release'], duration),
+        duration
+    )
+    compare(
+        "generate_tone",
+        timed(legacy_generate_tone, 440.0, duration),
+        timed(generate_demo_music.generate_tone, 440.0, duration),
+        duration
+    )
+    compare(
+        "generate_chord",
+        timed(legacy_generate_chord, chord, duration),
+        timed(generate_demo_music.generate_chord, chord, duration),
+        duration
+    )
+    samples = generate_demo_music.generate_chord(chord, duration)
+    compare(
+        "add_envelope",
+        timed(legacy_add_envelope, list(samples)),
+        timed(generate_demo_music.add_envelope, samples),
+        duration
+    )
+    harmonics = [1.0, 0.7, 0.49]
+    wavetable.bank.register('benchmark', harmonics)
+    compare(
+        "3-harmonic voice",
+        timed(lambda: sum(a * np.sin(2 * np.pi * 440.0 * (k + 1) * t) for k, a in enumerate(harmonics))),
+        timed(wavetable.bank.add_voice, np.zeros(frames, dtype=np.float32), 'benchmark', 440.0),
+        duration
+    )
+    compare(
+        "pcm16 conversion",
+        timed(legacy_pcm, list(samples)),
+        timed(lambda audio: audio_dsp.to_pcm16(audio).tobytes(), samples),
+        duration
+    )
+
+
+if __name__ == "__main__":
+    main()
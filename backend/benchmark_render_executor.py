@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Compare rendering on request threads with the process-pool render farm
+Reports render throughput and how long a trivial request (a stand-in for
+/health) waits while renders are running.
+Run: python benchmark_render_executor.py [jobs] [duration_seconds]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import render_executor
+
+
+def probe_latency(stop: threading.Event, samples: list) -> None:
+    """Time a tiny pure-Python task every 10ms until stopped"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        sum(range(1000))
+        samples.append(time.perf_counter() - start)
+        time.sleep(0.01)
+
+
+def run(label: str, render, jobs: int, duration: float, out_dir: str) -> None:
+    stop = threading.Event()
+    samples = []
+    probe = threading.Thread(target=probe_latency, args=(stop, samples))
+    probe.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=jobs) as threads:
+        paths = [os.path.join(out_dir, f"{label}_{i}.wav") for i in range(jobs)]
+        list(threads.map(lambda path: render(duration, 'pop', 'upbeat', path), paths))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    probe.join()
+    samples.sort()
+    p99 = samples[int(len(samples) * 0.99) - 1] if samples else 0.0
+    print(f"{label:<16} {jobs / elapsed:>10.2f} {samples[-1] * 1000 if samples else 0:>12.2f} {p99 * 1000:>10.2f}")
+
+
+def main():
+    jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 120.0
+    executor = render_executor.RenderExecutor(queue_depth=jobs)
+
+    print(f"⚙️ {jobs} renders of {duration:.0f}s on {executor.workers} workers")
+    print(f"{'mode':<16} {'tracks/s':>10} {'probe max ms':>12} {'p99 ms':>10}")
+    with tempfile.TemporaryDirectory() as out_dir:
+        # Start and warm the pool outside the measurement
+        executor.render_to_file(0.1, 'pop', 'upbeat', os.path.join(out_dir, 'warmup.wav'))
+        run("request threads", render_executor.render_to_file, jobs, duration, out_dir)
+        run("process pool", executor.render_to_file, jobs, duration, out_dir)
+    executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
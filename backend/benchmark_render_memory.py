@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Measure render memory with tracemalloc: float32 in-place pipeline vs the
+previous float64 path. Exits non-zero if peak memory is not at least halved.
+Run: python benchmark_render_memory.py [duration_seconds]
+"""
+
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+import audio_dsp
+import audio_renderer
+
+REQUIRED_REDUCTION = 2.0
+
+
+# Reference implementation of the pre-float32 renderer (float64 synthesis,
+# a fresh array per block and per filter call, plus the caller's astype copy)
+
+def legacy_chord_partials(chord, brightness, sample_rate=audio_renderer.SAMPLE_RATE):
+    partials = []
+    for i, freq in enumerate(chord):
+        for harmonic in range(1, 4):
+            harmonic_freq = freq * harmonic * brightness
+            if harmonic_freq < sample_rate / 2:
+                partials.append((harmonic_freq, (0.7 ** (harmonic - 1)) * (0.8 ** i)))
+    return partials
+
+
+def legacy_render_segment(renderer, chord_idx, length):
+    chord_duration = length / renderer.sample_rate
+    t = audio_dsp.sample_times(length, renderer.sample_rate)
+    chord_audio = np.zeros(length, dtype=np.float64)
+    partials = [legacy_chord_partials(c, renderer.params['brightness']) for c in renderer.progression]
+    for freq, amplitude in partials[chord_idx]:
+        audio_dsp.add_sine(chord_audio, freq, t, amplitude)
+    params = renderer.params
+    chord_audio *= audio_dsp.adsr_envelope(
+        t, chord_duration * params['attack'], chord_duration * params['decay'],
+        params['sustain'], chord_duration * params['release'], chord_duration
+    )
+    bound = max(sum(a for _, a in p) for p in partials)
+    chord_audio *= audio_renderer.OUTPUT_PEAK / bound
+    audio_dsp.fade_edges(chord_audio, audio_renderer.SEAM_FADE_SAMPLES)
+    return chord_audio.astype(np.float32)
+
+
+def legacy_render_audio(duration, genre, mood):
+    renderer = audio_renderer.BlockRenderer(duration, genre, mood)
+    segments = {}
+    window = int(renderer.sample_rate * audio_renderer.FILTER_SECONDS)
+    kernel = np.full(window, 1.0 / window, dtype=np.float32)
+    history = np.zeros(window - 1, dtype=np.float32)
+    audio = np.empty(renderer.num_samples, dtype=np.float32)
+    seg_idx = 0
+    for block_start in range(0, renderer.num_samples, renderer.block_size):
+        block_end = min(block_start + renderer.block_size, renderer.num_samples)
+        block = np.empty(block_end - block_start, dtype=np.float32)
+        position = block_start
+        while position < block_end:
+            chord_idx, seg_start, seg_length = renderer.schedule[seg_idx]
+            if position >= seg_start + seg_length:
+                seg_idx += 1
+                continue
+            span_end = min(block_end, seg_start + seg_length)
+            key = (chord_idx, seg_length)
+            if key not in segments:
+                segments[key] = legacy_render_segment(renderer, chord_idx, seg_length)
+            block[position - block_start:span_end - block_start] = \
+                segments[key][position - seg_start:span_end - seg_start]
+            position = span_end
+        padded = np.concatenate((history, block))
+        history = padded[len(padded) - (window - 1):].copy()
+        audio[block_start:block_end] = np.convolve(padded, kernel, mode='valid').astype(np.float32, copy=False)
+    return audio.astype(np.float32)  # generate_enhanced_music converted again before writing
+
+
+def measure(func, *args):
+    """(tracemalloc peak bytes, seconds) of one call"""
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, elapsed
+
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 30.0
+    args = (duration, 'pop', 'upbeat')
+    # Warm the per-thread scratch buffers, as a long-lived worker would be
+    audio_renderer.render_audio(*args)
+    legacy_render_audio(*args)
+
+    output_bytes = audio_renderer.total_samples(duration) * 4
+    legacy_peak, legacy_time = measure(legacy_render_audio, *args)
+    new_peak, new_time = measure(audio_renderer.render_audio, *args)
+    stream_peak, stream_time = measure(lambda: [None for _ in audio_renderer.iter_audio_blocks(*args)])
+
+    print(f"🧠 Render memory for {duration:.0f}s (output buffer {output_bytes / 1e6:.1f} MB)")
+    print(f"{'path':<24} {'peak MB':>10} {'time ms':>10}")
+    print(f"{'float64 (previous)':<24} {legacy_peak / 1e6:>10.1f} {legacy_time * 1000:>10.1f}")
+    print(f"{'float32 in-place':<24} {new_peak / 1e6:>10.1f} {new_time * 1000:>10.1f}")
+    print(f"{'float32 streaming':<24} {stream_peak / 1e6:>10.1f} {stream_time * 1000:>10.1f}")
+
+    reduction = legacy_peak / max(new_peak, 1)
+    if reduction < REQUIRED_REDUCTION:
+        print(f"❌ Peak memory only reduced {reduction:.2f}x (need {REQUIRED_REDUCTION:.1f}x)")
+        sys.exit(1)
+    print(f"✅ Peak memory reduced {reduction:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
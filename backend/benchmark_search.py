@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark the catalog search index on a synthetic catalog
+Run: python benchmark_search.py [tracks] [queries]
+Exits non-zero if p99 query latency is over the 5 ms budget.
+"""
+
+import random
+import sys
+import time
+
+import numpy as np
+
+from search_index import SearchIndex
+
+BUDGET_MS = 5.0
+GENRES = ['Electronic', 'Ambient', 'Jazz', 'Rock', 'Pop', 'Classical', 'Hip Hop', 'Folk',
+          'Cinematic', 'Acoustic', 'Metal', 'Reggae']
+MOODS = ['Energetic', 'Calm', 'Happy', 'Dark', 'Dramatic', 'Peaceful']
+SYLLABLES = ['ka', 'lo', 'mi', 'ra', 'ven', 'dus', 'tor', 'el', 'syn', 'qua', 'pho', 'ri',
+             'bel', 'no', 'x', 'ta', 'mon', 'ae', 'lu', 'gris']
+
+
+def make_words(rng: random.Random, count: int):
+    words = set()
+    while len(words) < count:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def make_catalog(n_tracks: int, seed: int = 7):
+    rng = random.Random(seed)
+    words = make_words(rng, 20000)
+    rng.shuffle(words)  # popularity rank independent of spelling
+    artists = make_words(rng, 3000)
+    tags = make_words(rng, 400)
+    # Zipf-like popularity so some terms are very common, as in real titles
+    weights = 1.0 / np.arange(1, len(words) + 1)
+    word_draws = iter(rng.choices(words, weights=weights, k=n_tracks * 12))
+    tracks = []
+    for i in range(n_tracks):
+        tracks.append({
+            'id': f"track_{i}",
+            'title': ' '.join(next(word_draws) for _ in range(rng.randint(1, 4))),
+            'artist': ' '.join(rng.choice(artists) for _ in range(rng.randint(1, 2))),
+            'genre': rng.choice(GENRES),
+            'mood': rng.choice(MOODS),
+            'tags': rng.sample(tags, rng.randint(1, 4)),
+            'description': ' '.join(next(word_draws) for _ in range(rng.randint(0, 8)))
+        })
+    return tracks
+
+
+def make_queries(tracks, n_queries: int, seed: int = 11):
+    rng = random.Random(seed)
+    queries = []
+    for i in range(n_queries):
+        track = rng.choice(tracks)
+        title_words = track['title'].split()
+        kind = i % 4
+        if kind == 0:
+            queries.append(('term', rng.choice(title_words), None))
+        elif kind == 1:
+            queries.append(('two terms', f"{rng.choice(title_words)} {track['artist'].split()[0]}", None))
+        elif kind == 2:
+            word = rng.choice(title_words)
+            queries.append(('prefix', word[:rng.randint(2, max(2, len(word) - 1))], None))
+        else:
+            queries.append(('genre filter', rng.choice(title_words), track['genre']))
+    return queries
+
+
+def percentile_ms(samples, q):
+    return float(np.percentile(samples, q)) * 1000
+
+
+def main():
+    n_tracks = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    n_queries = int(sys.argv[2]) if len(sys.argv) > 2 else 4000
+
+    tracks = make_catalog(n_tracks)
+    start = time.perf_counter()
+    index = SearchIndex(tracks)
+    build = time.perf_counter() - start
+    print(f"🔍 Search benchmark: {n_tracks} tracks indexed in {build:.2f}s {index.stats()}")
+
+    queries = make_queries(tracks, n_queries)
+    for kind, text, genre in queries[:200]:  # warm up
+        index.search(text, genre=genre, prefix=(kind == 'prefix'))
+
+    timings = {}
+    for kind, text, genre in queries:
+        start = time.perf_counter()
+        index.search(text, genre=genre, limit=20, prefix=(kind == 'prefix'))
+        timings.setdefault(kind, []).append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for track in tracks[:1000]:
+        index.add(dict(track, title=track['title'] + ' remastered'))
+    update_us = (time.perf_counter() - start) * 1000
+    print(f"incremental update: {update_us:.1f} µs/track")
+
+    print(f"{'query':<14} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    everything = []
+    for kind, samples in timings.items():
+        everything.extend(samples)
+        print(f"{kind:<14} {percentile_ms(samples, 50):>8.3f} {percentile_ms(samples, 95):>8.3f} "
+              f"{percentile_ms(samples, 99):>8.3f} {max(samples) * 1000:>8.3f}")
+    p99 = percentile_ms(everything, 99)
+    print(f"{'all':<14} {percentile_ms(everything, 50):>8.3f} {percentile_ms(everything, 95):>8.3f} "
+          f"{p99:>8.3f} {max(everything) * 1000:>8.3f}")
+
+    if p99 > BUDGET_MS:
+        print(f"❌ p99 {p99:.2f} ms is over the {BUDGET_MS} ms budget")
+        return 1
+    print(f"✅ p99 {p99:.2f} ms within the {BUDGET_MS} ms budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Append-only catalog storage
+Records are appended as NDJSON lines; a sidecar index of fixed-width
+(blake2b(key), offset, length, flags) entries is memory-mapped on open, so a
+lookup is one binary search plus one read, an append is O(1) and startup
+never parses the record file. Replaced and deleted records stay on disk
+until compaction.
+
+    python catalog_store.py stats <store>
+    python catalog_store.py get <store> <key>
+    python catalog_store.py compact <store>
+    python catalog_store.py import <store> <legacy.json>
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RECORDS_EXTENSION = '.ndjson'
+INDEX_EXTENSION = '.idx'
+
+# key hash, byte offset of the record line, its length (newline included), flags
+INDEX_ENTRY = struct.Struct('<8sQII')
+INDEX_DTYPE = np.dtype([('key', '<u8'), ('offset', '<u8'), ('length', '<u4'), ('flags', '<u4')])
+FLAG_TOMBSTONE = 1
+PENDING_MERGE = 4096  # appended entries kept in a dict before folding into the sorted arrays
+
+TOMBSTONE_FIELD = '_deleted'
+KEY_FIELD = '_key'  # stored only when the key differs from the record's id
+
+
+def key_hash(key: str) -> bytes:
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest()
+
+
+def _hash_int(digest: bytes) -> int:
+    return int.from_bytes(digest, 'little')
+
+
+def encode_record(record: Dict) -> bytes:
+    """One NDJSON line; keys are sorted so identical records encode identically"""
+    return json.dumps(record, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8') + b'\n'
+
+
+class CatalogStore:
+    """
+    Key -> JSON record store backed by <path>.ndjson and <path>.idx.
+    The last index entry for a key wins; a tombstone entry deletes it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.records_path = path + RECORDS_EXTENSION
+        self.index_path = path + INDEX_EXTENSION
+        self._lock = threading.RLock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._open()
+
+    def _open(self) -> None:
+        self._records = open(self.records_path, 'a+b')
+        self._index = open(self.index_path, 'a+b')
+        self._recover()
+        self._load_index()
+
+    def _recover(self) -> None:
+        """Repair the tail after a crash: drop torn writes, index records the index missed"""
+        index_size = os.path.getsize(self.index_path)
+        if index_size % INDEX_ENTRY.size:
+            index_size -= index_size % INDEX_ENTRY.size
+            self._index.truncate(index_size)
+
+        records_size = os.path.getsize(self.records_path)
+        indexed_end = 0
+        if index_size:
+            self._index.seek(index_size - INDEX_ENTRY.size)
+            _, offset, length, _ = INDEX_ENTRY.unpack(self._index.read(INDEX_ENTRY.size))
+            indexed_end = offset + length
+        if indexed_end > records_size:
+            # Index got ahead of the record file; rebuild it from the records
+            logger.warning(f"⚠️ Catalog index {self.index_path} is ahead of its records; rebuilding")
+            self._index.truncate(0)
+            indexed_end = 0
+        if indexed_end == records_size:
+            return
+
+        self._records.seek(indexed_end)
+        offset = indexed_end
+        entries = []
+        for line in self._records:
+            if not line.endswith(b'\n'):
+                break  # torn final write
+            record = json.loads(line)
+            key = record.get(KEY_FIELD, record.get('id'))
+            flags = FLAG_TOMBSTONE if record.get(TOMBSTONE_FIELD) else 0
+            entries.append(INDEX_ENTRY.pack(key_hash(str(key)), offset, len(line), flags))
+            offset += len(line)
+        if offset < records_size:
+            self._records.truncate(offset)
+        self._index.seek(0, os.SEEK_END)
+        self._index.write(b''.join(entries))
+        self._index.flush()
+        logger.info(f"✅ Recovered {len(entries)} catalog records into {self.index_path}")
+
+    def _load_index(self) -> None:
+        """Latest entry per key from the mmapped index, as sorted arrays for binary search"""
+        self._pending: Dict[int, Tuple[int, int, int]] = {}  # entries appended since the last load
+        size = os.path.getsize(self.index_path)
+        if not size:
+            self._keys = np.empty(0, dtype='<u8')
+            self._entries = np.empty(0, dtype=INDEX_DTYPE)
+            self._live = 0
+            return
+        with mmap.mmap(self._index.fileno(), size, access=mmap.ACCESS_READ) as view:
+            index = np.frombuffer(view, dtype=INDEX_DTYPE).copy()
+        # np.unique keeps the first occurrence, so look at the entries newest first
+        newest_first = index[::-1]
+        self._keys, positions = np.unique(newest_first['key'], return_index=True)
+        self._entries = newest_first[positions]
+        self._live = int(np.count_nonzero((self._entries['flags'] & FLAG_TOMBSTONE) == 0))
+
+    def _entry(self, key: str) -> Optional[Tuple[int, int, int]]:
+        """(offset, length, flags) of the latest entry for key"""
+        digest = _hash_int(key_hash(key))
+        pending = self._pending.get(digest)
+        if pending is not None:
+            return pending
+        i = int(np.searchsorted(self._keys, np.uint64(digest)))  # a plain int would upcast the array
+        if i < len(self._keys) and int(self._keys[i]) == digest:
+            entry = self._entries[i]
+            return int(entry['offset']), int(entry['length']), int(entry['flags'])
+        return None
+
+    def _read(self, offset: int, length: int) -> bytes:
+        """Caller holds the lock (appends move the shared file position)"""
+        self._records.seek(offset)
+        return self._records.read(length)
+
+    def get(self, key: str) -> Optional[Dict]:
+        """The current record for key, read with a single seek"""
+        with self._lock:
+            entry = self._entry(key)
+            if entry is None or entry[2] & FLAG_TOMBSTONE:
+                return None
+            record = json.loads(self._read(entry[0], entry[1]))
+        if str(record.get(KEY_FIELD, record.get('id'))) != key:
+            return None  # 64-bit hash collision with another key
+        record.pop(KEY_FIELD, None)
+        return record
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            entry = self._entry(key)
+            return entry is not None and not entry[2] & FLAG_TOMBSTONE
+
+    def __len__(self) -> int:
+        return self._live
+
+    def _append(self, key: str, line: bytes, flags: int) -> None:
+        self._records.seek(0, os.SEEK_END)
+        offset = self._records.tell()
+        self._records.write(line)
+        self._records.flush()  # the record is on disk before the index points at it
+        digest = key_hash(key)
+        self._index.write(INDEX_ENTRY.pack(digest, offset, len(line), flags))
+        self._index.flush()
+
+        previous = self._entry(key)
+        was_live = previous is not None and not previous[2] & FLAG_TOMBSTONE
+        self._live += (0 if flags & FLAG_TOMBSTONE else 1) - (1 if was_live else 0)
+        self._pending[_hash_int(digest)] = (offset, len(line), flags)
+        if len(self._pending) >= PENDING_MERGE:
+            self._merge_pending()
+
+    def put(self, record: Dict, key: Optional[str] = None) -> bool:
+        """
+        Append record under key (default: record['id']).
+        Returns False without writing when the stored record is identical.
+        """
+        key = str(key if key is not None else record['id'])
+        stored = dict(record)
+        if key != str(record.get('id')):
+            stored[KEY_FIELD] = key
+        line = encode_record(stored)
+        with self._lock:
+            entry = self._entry(key)
+            if entry is not None and not entry[2] & FLAG_TOMBSTONE and entry[1] == len(line) \
+                    and self._read(entry[0], entry[1]) == line:
+                return False
+            self._append(key, line, 0)
+            return True
+
+    def put_many(self, records: Iterable[Dict]) -> int:
+        """Append several records; returns how many were new or changed"""
+        return sum(1 for record in records if self.put(record))
+
+    def delete(self, key: str) -> bool:
+        """Tombstone key; False if it was not present"""
+        with self._lock:
+            if key not in self:
+                return False
+            self._append(key, encode_record({KEY_FIELD: key, TOMBSTONE_FIELD: True}), FLAG_TOMBSTONE)
+            return True
+
+    def _current_entries(self) -> np.ndarray:
+        """Latest entry per key, including appends not yet merged (unsorted)"""
+        if not self._pending:
+            return self._entries
+        pending = np.array([(digest, offset, length, flags) for digest, (offset, length, flags)
+                            in self._pending.items()], dtype=INDEX_DTYPE)
+        keep = ~np.isin(self._entries['key'], pending['key'])
+        return np.concatenate((self._entries[keep], pending))
+
+    def _merge_pending(self) -> None:
+        entries = np.sort(self._current_entries(), order='key')
+        self._entries, self._keys = entries, entries['key']
+        self._pending = {}
+
+    def _live_entries(self) -> np.ndarray:
+        """Current (non-deleted) entries in file order"""
+        entries = self._current_entries()
+        entries = entries[(entries['flags'] & FLAG_TOMBSTONE) == 0]
+        return np.sort(entries, order='offset')
+
+    def iter_records(self) -> Iterator[Dict]:
+        """Stream the current records in write order (memory: one record at a time)"""
+        with self._lock:
+            entries = self._live_entries()
+        for entry in entries:
+            with self._lock:
+                line = self._read(int(entry['offset']), int(entry['length']))
+            record = json.loads(line)
+            record.pop(KEY_FIELD, None)
+            yield record
+
+    def stats(self) -> Dict:
+        with self._lock:
+            records_bytes = os.path.getsize(self.records_path)
+            live_bytes = int(self._live_entries()['length'].sum())
+            return {
+                'records': self._live,
+                'index_entries': os.path.getsize(self.index_path) // INDEX_ENTRY.size,
+                'records_bytes': records_bytes,
+                'garbage_bytes': records_bytes - live_bytes
+            }
+
+    def compact(self) -> Dict:
+        """Rewrite only the current records, dropping replaced and deleted ones"""
+        with self._lock:
+            before = self.stats()
+            entries = self._live_entries()
+            tmp_records, tmp_index = self.records_path + '.compact', self.index_path + '.compact'
+            with open(tmp_records, 'wb') as records, open(tmp_index, 'wb') as index:
+                offset = 0
+                for entry in entries:
+                    line = self._read(int(entry['offset']), int(entry['length']))
+                    records.write(line)
+                    index.write(INDEX_ENTRY.pack(int(entry['key']).to_bytes(8, 'little'), offset, len(line), 0))
+                    offset += len(line)
+                records.flush()
+                os.fsync(records.fileno())
+                index.flush()
+                os.fsync(index.fileno())
+            self.close()
+            # Records first: a crash in between leaves an index that _recover rebuilds
+            os.replace(tmp_records, self.records_path)
+            os.replace(tmp_index, self.index_path)
+            self._open()
+            after = self.stats()
+        logger.info(f"✅ Compacted {self.path}: {before['records_bytes']} -> {after['records_bytes']} bytes")
+        return {'before': before, 'after': after}
+
+    def flush(self) -> None:
+        with self._lock:
+            self._records.flush()
+            self._index.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._records.close()
+            self._index.close()
+
+    def __enter__(self) -> "CatalogStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+_stores: Dict[str, CatalogStore] = {}
+_stores_lock = threading.Lock()
+
+
+def open_store(path: str) -> CatalogStore:
+    """Shared store per path, so every writer in the process sees one index"""
+    path = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = CatalogStore(path)
+        return store
+
+
+def import_json(store: CatalogStore, json_path: str, section: str = 'tracks') -> int:
+    """One-off import of a legacy pretty-printed catalog document"""
+    with open(json_path, 'r', encoding='utf-8') as f:
+        document = json.load(f)
+    records = document.get(section, []) if isinstance(document, dict) else document
+    return store.put_many(record for record in records if record.get('id'))
+
+
+def main(argv) -> int:
+    if len(argv) < 2 or argv[0] not in ('stats', 'get', 'compact', 'import'):
+        print(__doc__)
+        return 2
+    command, path = argv[0], argv[1]
+    with CatalogStore(path) as store:
+        if command == 'stats':
+            print(json.dumps(store.stats(), indent=2))
+        elif command == 'get':
+            record = store.get(argv[2])
+            print(json.dumps(record, indent=2, ensure_ascii=False) if record else "❌ Not found")
+            return 0 if record else 1
+        elif command == 'compact':
+            print(json.dumps(store.compact(), indent=2))
+        elif command == 'import':
+            print(f"✅ Imported {import_json(store, argv[2])} records into {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,218 @@
+"""
+Incremental, checkpointed sync of free music catalogs
+Each source keeps a checkpoint (crawl cursor, last-seen ids, ETag and
+Last-Modified) next to the catalog. A run resumes an interrupted crawl where
+it stopped; otherwise it walks the newest-first listing only until it reaches
+tracks already synced, and merges new or changed tracks into the catalog.
+"""
+
+import asyncio
+import copy
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, Optional
+
+from catalog_store import CatalogStore, import_json, open_store
+from dedup import CROSS_SOURCE
+
+logger = logging.getLogger(__name__)
+
+SYNC_STATE_VERSION = 1
+FLUSH_INTERVAL = 5.0  # seconds between catalog + checkpoint writes during a crawl
+FULL_RESYNC_INTERVAL = timedelta(days=7)  # periodic full crawl to pick up edits to older tracks
+HEAD_IDS = 50  # newest ids remembered as the high-water mark for incremental runs
+
+# Listing options that put the newest tracks first; sources without one are
+# always crawled in full (still resumable)
+NEWEST_FIRST = {
+    'jamendo': {'order': 'releasedate_desc'},
+    'freesound': {'sort': 'created_desc'}
+}
+
+SOURCES = ('jamendo', 'freesound', 'musicbrainz')
+
+MODE_FULL = 'full'
+MODE_INCREMENTAL = 'incremental'
+
+
+def _write_json_atomic(path: str, data) -> None:
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _content(track: Dict) -> Dict:
+    """Track fields that identify a change (timestamps are set at fetch time)"""
+    return {key: value for key, value in track.items() if key not in ('created_at', 'updated_at')}
+
+
+class CatalogSync:
+    """
+    Sync engine for FreeeMusicDataManager sources.
+    The catalog is an append-only CatalogStore; checkpoints live in a separate
+    state file and are only written after the tracks they cover.
+    """
+
+    def __init__(self, manager, catalog_path: str = 'free_music_data',
+                 state_path: str = 'free_music_sync_state.json',
+                 legacy_path: str = 'free_music_data.json'):
+        self.manager = manager
+        self.catalog_path = catalog_path
+        self.state_path = state_path
+        self.legacy_path = legacy_path
+        self.store: Optional[CatalogStore] = None
+        self.checkpoints: Dict[str, Dict] = {}
+        self._last_flush = 0.0
+        self._lock = asyncio.Lock()
+
+    def load(self) -> None:
+        """Open the catalog store and read the checkpoints (once)"""
+        if self.store is not None:
+            return
+        self.store = open_store(self.catalog_path)
+        if not len(self.store) and self.legacy_path and os.path.exists(self.legacy_path):
+            try:
+                imported = import_json(self.store, self.legacy_path)
+                logger.info(f"✅ Imported {imported} tracks from {self.legacy_path} into the catalog store")
+            except (OSError, ValueError) as e:
+                logger.warning(f"⚠️ Could not import legacy catalog {self.legacy_path}: {e}")
+        self.manager.get_catalog()  # index the catalog and seed dedup before merging into it
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('version') == SYNC_STATE_VERSION:
+                self.checkpoints = state.get('sources', {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Ignoring unreadable sync state {self.state_path}: {e}")
+
+    def flush(self) -> None:
+        """Flush the catalog, then write the checkpoints that point past it"""
+        self.store.flush()
+        _write_json_atomic(self.state_path, {
+            'version': SYNC_STATE_VERSION,
+            'sources': copy.deepcopy(self.checkpoints)
+        })
+        self._last_flush = time.monotonic()
+
+    def _maybe_flush(self) -> None:
+        if time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+            self.flush()
+
+    def merge(self, track: Dict) -> str:
+        """Add or update one track; returns 'added', 'updated', 'unchanged' or 'duplicate'"""
+        existing = self.store.get(track['id'])
+        if existing is None:
+            # New id, but possibly a track already in the catalog from another source
+            if self.manager.dedup.duplicate_of(track, kinds=CROSS_SOURCE):
+                return 'duplicate'
+            self.manager.dedup.add(track)
+            self.store.put(track)
+            self.manager.index_track(track)
+            return 'added'
+        if _content(existing) == _content(track):
+            return 'unchanged'
+        updated = dict(track, created_at=existing.get('created_at', track.get('created_at')),
+                       updated_at=datetime.utcnow().isoformat())
+        self.store.put(updated)
+        self.manager.index_track(updated)
+        return 'updated'
+
+    def _checkpoint(self, source: str, full: bool) -> Dict:
+        """Checkpoint for this run, choosing full or incremental mode unless a crawl is being resumed"""
+        checkpoint = self.checkpoints.setdefault(source, {'cursor': None})
+        if checkpoint.get('cursor'):
+            checkpoint.setdefault('mode', MODE_FULL)  # resume whatever was interrupted
+            checkpoint.setdefault('pending_head_ids', [])
+            return checkpoint
+        last_full = checkpoint.get('last_full_sync_at')
+        due = not last_full or datetime.utcnow() - datetime.fromisoformat(last_full) > FULL_RESYNC_INTERVAL
+        if full or source not in NEWEST_FIRST or not checkpoint.get('head_ids') or due:
+            checkpoint['mode'] = MODE_FULL
+            # A full crawl must not be short-circuited by a 304 on the first page
+            checkpoint.pop('etag', None)
+            checkpoint.pop('last_modified', None)
+        else:
+            checkpoint['mode'] = MODE_INCREMENTAL
+        checkpoint['pending_head_ids'] = []
+        return checkpoint
+
+    async def _sync_source(self, source: str, limit: Optional[int], full: bool) -> Dict:
+        checkpoint = self._checkpoint(source, full)
+        mode = checkpoint['mode']
+        resumed = bool(checkpoint.get('cursor'))
+        high_water = set(checkpoint.get('head_ids', [])) if mode == MODE_INCREMENTAL else set()
+        counts = {'mode': mode, 'resumed': resumed, 'added': 0, 'updated': 0, 'unchanged': 0, 'duplicate': 0}
+
+        tracks = self.manager.iter_source(source, limit, checkpoint=checkpoint, **NEWEST_FIRST.get(source, {}))
+        caught_up = False
+        try:
+            async for track in tracks:
+                if track['id'] in high_water:
+                    caught_up = True  # newest-first listing: everything from here on is synced
+                    break
+                if not resumed and len(checkpoint['pending_head_ids']) < HEAD_IDS:
+                    checkpoint['pending_head_ids'].append(track['id'])
+                counts[self.merge(track)] += 1
+                self._maybe_flush()
+        finally:
+            await tracks.aclose()
+
+        if caught_up:
+            checkpoint['cursor'] = None
+        if checkpoint.get('cursor') is None:
+            # Crawl finished: the newest ids of this run become the next high-water mark
+            head_ids = checkpoint['pending_head_ids'] + checkpoint.get('head_ids', [])
+            checkpoint['head_ids'] = list(dict.fromkeys(head_ids))[:HEAD_IDS]
+            checkpoint['pending_head_ids'] = []
+            if mode == MODE_FULL:
+                checkpoint['last_full_sync_at'] = datetime.utcnow().isoformat()
+            counts['complete'] = True
+        else:
+            counts['complete'] = False  # limit reached or the source failed; the next run resumes
+        checkpoint['last_synced_at'] = datetime.utcnow().isoformat()
+        return counts
+
+    async def sync(self, limits: Optional[Dict[str, Optional[int]]] = None, full: bool = False) -> Dict:
+        """
+        Sync sources concurrently ({source: max tracks this run, None for no cap}).
+        Returns per-source counts; the merged catalog is in self.store.
+        """
+        if limits is None:
+            limits = dict.fromkeys(SOURCES)
+        async with self._lock:
+            self.load()
+            started = datetime.utcnow().isoformat()
+            sources = list(limits)
+            results = await asyncio.gather(
+                *(self._sync_source(source, limits[source], full) for source in sources),
+                return_exceptions=True
+            )
+            self.flush()
+
+        stats = {'started_at': started, 'completed_at': datetime.utcnow().isoformat(),
+                 'total_tracks': len(self.store), 'sources': {}}
+        for source, result in zip(sources, results):
+            if isinstance(result, Exception):
+                logger.error(f"❌ {source.title()} sync failed: {result}")
+                result = {'error': str(result), 'complete': False}
+            stats['sources'][source] = result
+        logger.info(f"✅ Catalog sync finished: {len(self.store)} tracks in catalog")
+        return stats
+
+    def catalog_tracks(self) -> Iterator[Dict]:
+        """Stream every catalog track (one at a time; the catalog may not fit in memory)"""
+        self.load()
+        return self.store.iter_records()
+
+    def status(self) -> Dict:
+        self.load()
+        return {
+            source: {key: value for key, value in checkpoint.items() if key != 'pending_head_ids'}
+            for source, checkpoint in self.checkpoints.items()
+        }
@@ -0,0 +1,184 @@
+"""
+Ingestion-time deduplication of free music tracks
+Every track is reduced to a few 64-bit keys: its (source, id), its
+MusicBrainz id when it has one, and a fingerprint of its normalized title and
+artist. Keys seen during this process go in an exact set; keys seeded from an
+existing catalog or database go in a Bloom filter, so millions of known
+tracks cost a few bytes each. A track is a duplicate if any of its keys is
+already known, and is dropped before any network or database work.
+"""
+
+import hashlib
+import math
+import re
+import unicodedata
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Parenthesized/bracketed qualifiers that do not make a different recording
+_NOISE_BRACKETS = re.compile(
+    r'[\(\[][^\)\]]*\b(?:feat|ft|featuring|remaster(?:ed)?|radio edit|explicit|album version|original mix)\b[^\)\]]*[\)\]]'
+)
+_NOISE_SUFFIX = re.compile(r'\s+-\s+(?:\d{4}\s+)?(?:remaster(?:ed)?|radio edit|album version)(?:\s+\d{4})?\s*$')
+_FEATURING = re.compile(r'\s+(?:feat|ft|featuring)\b.*$')
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+_UNKNOWN = {'', 'unknown', 'various', 'various artists'}
+
+KIND_SOURCE = 'source'
+KIND_MBID = 'mbid'
+KIND_FINGERPRINT = 'fingerprint'
+CROSS_SOURCE = (KIND_MBID, KIND_FINGERPRINT)  # keys that match a track re-published by another source
+
+
+def _fold(text: str) -> str:
+    decomposed = unicodedata.normalize('NFKD', str(text or ''))
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower().strip()
+
+
+def normalize_title(title: str) -> str:
+    title = _NOISE_SUFFIX.sub('', _NOISE_BRACKETS.sub('', _fold(title)))
+    return _NON_WORD.sub(' ', _FEATURING.sub('', title)).strip()
+
+
+def normalize_artist(artist: str) -> str:
+    artist = _NON_WORD.sub(' ', _FEATURING.sub('', _fold(artist))).strip()
+    return artist[4:] if artist.startswith('the ') else artist
+
+
+def _key(kind: str, value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(f"{kind}:{value}".encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def track_keys(track: Dict) -> List[Tuple[str, int]]:
+    """(kind, key) pairs identifying a track; tracks without a usable title/artist get no fingerprint"""
+    keys = []
+    if track.get('id'):
+        keys.append((KIND_SOURCE, _key(KIND_SOURCE, f"{track.get('source', '')}:{track['id']}")))
+    mbid = track.get('mbid') or (track.get('metadata') or {}).get('mbid')
+    if mbid:
+        keys.append((KIND_MBID, _key(KIND_MBID, str(mbid).lower())))
+    title, artist = normalize_title(track.get('title')), normalize_artist(track.get('artist'))
+    if title not in _UNKNOWN and artist not in _UNKNOWN:
+        keys.append((KIND_FINGERPRINT, _key(KIND_FINGERPRINT, f"{artist}\x1f{title}")))
+    return keys
+
+
+class BloomFilter:
+    """
+    Scalable Bloom filter over 64-bit keys: a chain of bit arrays, each twice
+    the size of the last, so the false positive rate holds as it fills.
+    """
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 1e-4):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._layers: List[Tuple[np.ndarray, int, int, int]] = []  # (bits, m, k, capacity)
+        self._count = 0
+        self._layer_count = 0
+        self._grow()
+
+    def _grow(self) -> None:
+        capacity = self.capacity * (2 ** len(self._layers))
+        # Each new layer gets a tighter rate so the sum stays bounded
+        rate = self.error_rate * (0.5 ** (len(self._layers) + 1))
+        m = max(64, int(-capacity * math.log(rate) / (math.log(2) ** 2)))
+        k = max(1, round(m / capacity * math.log(2)))
+        self._layers.append((np.zeros((m + 7) // 8, dtype=np.uint8), m, k, capacity))
+        self._layer_count = 0
+
+    @staticmethod
+    def _positions(keys: np.ndarray, m: int, k: int) -> np.ndarray:
+        """k bit positions per key by double hashing the two 32-bit halves"""
+        h1 = keys & np.uint64(0xFFFFFFFF)
+        h2 = (keys >> np.uint64(32)) | np.uint64(1)
+        steps = np.arange(k, dtype=np.uint64)
+        return (h1[:, None] + steps[None, :] * h2[:, None]) % np.uint64(m)
+
+    def add_many(self, keys: Iterable[int]) -> None:
+        keys = np.fromiter(keys, dtype=np.uint64)
+        while len(keys):
+            bits, m, k, capacity = self._layers[-1]
+            room = capacity - self._layer_count
+            if room <= 0:
+                self._grow()
+                continue
+            chunk, keys = keys[:room], keys[room:]
+            positions = self._positions(chunk, m, k).ravel()
+            np.bitwise_or.at(bits, positions >> np.uint64(3), (1 << (positions & np.uint64(7))).astype(np.uint8))
+            self._layer_count += len(chunk)
+            self._count += len(chunk)
+
+    def add(self, key: int) -> None:
+        self.add_many((key,))
+
+    def __contains__(self, key: int) -> bool:
+        # Single probes in plain ints: cheaper than building numpy arrays per key
+        h1, h2 = key & 0xFFFFFFFF, (key >> 32) | 1
+        for bits, m, k, _ in self._layers:
+            view = bits.data
+            for i in range(k):
+                position = (h1 + i * h2) % m
+                if not view[position >> 3] & (1 << (position & 7)):
+                    break
+            else:
+                return True
+        return False
+
+    def __len__(self) -> int:
+        return self._count
+
+    def stats(self) -> Dict:
+        return {
+            'keys': self._count,
+            'layers': len(self._layers),
+            'bytes': sum(bits.nbytes for bits, _, _, _ in self._layers),
+            'error_rate': self.error_rate
+        }
+
+
+class Deduplicator:
+    """Known-track keys: an exact set for this process, a Bloom filter for seeded history"""
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 1e-4):
+        self._seen = set()
+        self._bloom = BloomFilter(capacity, error_rate)
+        self.duplicates = {KIND_SOURCE: 0, KIND_MBID: 0, KIND_FINGERPRINT: 0}
+
+    def seed(self, tracks: Iterable[Dict]) -> int:
+        """Load keys of already-stored tracks (catalog or database rows)"""
+        keys = [key for track in tracks for _, key in track_keys(track)]
+        self._bloom.add_many(keys)
+        return len(keys)
+
+    def _known(self, keys: List[Tuple[str, int]], kinds: Optional[Tuple[str, ...]] = None) -> Optional[str]:
+        for kind, key in keys:
+            if (kinds is None or kind in kinds) and (key in self._seen or key in self._bloom):
+                return kind
+        return None
+
+    def duplicate_of(self, track: Dict, kinds: Optional[Tuple[str, ...]] = None) -> Optional[str]:
+        """Which kind of key marks the track as already known (None: it is new); kinds limits the check"""
+        return self._known(track_keys(track), kinds)
+
+    def add(self, track: Dict) -> None:
+        self._seen.update(key for _, key in track_keys(track))
+
+    def check_and_add(self, track: Dict) -> Optional[str]:
+        """duplicate_of, remembering the track when it is new"""
+        keys = track_keys(track)
+        kind = self._known(keys)
+        if kind is None:
+            self._seen.update(key for _, key in keys)
+        else:
+            self.duplicates[kind] += 1
+        return kind
+
+    def filter(self, tracks: Iterable[Dict]) -> Iterator[Dict]:
+        """Yield only tracks not seen before (in this batch or earlier)"""
+        for track in tracks:
+            if self.check_and_add(track) is None:
+                yield track
+
+    def stats(self) -> Dict:
+        return {'exact_keys': len(self._seen), 'bloom': self._bloom.stats(), 'duplicates': dict(self.duplicates)}
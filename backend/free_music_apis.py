@@ -10,6 +10,8 @@ import os
 import time
 from typing import Dict, List, Optional
 
+from catalog_store import open_store
+
 class FreeMusicAPIs:
     """Integration with free music data APIs"""
     
@@ -264,12 +266,18 @@ class FreeMusicAPIs:
         
         return data
     
-    def save_music_data(self, data: Dict, filename: str = "free_music_data.json"):
-        """Save music data to JSON file"""
+    def save_music_data(self, data: Dict, filename: str = "free_music_apis_data"):
+        """Append music data to a catalog store; records are keyed by section and id"""
         try:
-            with open(filename, 'w') as f:
-                json.dump(data, f, indent=2)
-            print(f"💾 Music data saved to {filename}")
+            store = open_store(os.path.splitext(filename)[0])
+            written = 0
+            for section in ('genres', 'artists', 'samples', 'tracks'):
+                for record in data.get(section, []):
+                    if record.get('id'):
+                        written += store.put(record, key=f"{section}/{record['id']}")
+            store.put({'id': 'metadata', **data.get('metadata', {})}, key='_metadata')
+            store.flush()
+            print(f"💾 Music data saved to {store.records_path} ({written} new or changed records)")
             
             # Print summary
             print(f"\n📊 Data Summary:")
@@ -9,15 +9,32 @@ import json
 import logging
 import asyncio
 import aiohttp
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
+from itertools import islice
 import os
-from typing import Dict, List, Optional
+import threading
+from typing import AsyncIterator, Dict, List, Optional
 import time
 
+from async_runtime import run_async, runtime
+from catalog_store import open_store
+from catalog_sync import CatalogSync
+from dedup import Deduplicator
+from keyword_classifier import (MUSICBRAINZ_GENRES, description_mood, jamendo_genre, jamendo_mood,
+                                tag_genre, tags_text)
+from music_catalog import MusicCatalog
+from search_index import SearchIndex
+from token_bucket import AsyncTokenBucket
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+STREAM_QUEUE_SIZE = 1000  # tracks buffered between crawlers and the consumer
+CATALOG_PATH = 'free_music_data'  # catalog store (free_music_data.ndjson + .idx)
+NOT_MODIFIED = object()  # conditional page request answered with 304
+
 class FreeeMusicDataManager:
     """Manages free music data from multiple APIs and sources"""
     
@@ -26,6 +43,14 @@ class FreeeMusicDataManager:
         self.data_cache = {}
         self.downloaded_tracks = []
         
+        # Indexed views of every known track (saved catalog + anything ingested since)
+        self.catalog = MusicCatalog()
+        self.search_index = SearchIndex()
+        # Keys of every saved track, so re-published or re-fetched tracks are dropped on ingest
+        self.dedup = Deduplicator()
+        self._catalog_loaded = False
+        self._catalog_lock = threading.Lock()
+        
         # API Configurations
         self.apis = {
             'jamendo': {
@@ -53,241 +78,375 @@ class FreeeMusicDataManager:
             }
         }
         
+        # One bucket per source, enforcing its configured requests per second
+        self.rate_limiters = {
+            name: AsyncTokenBucket(config['rate_limit']) for name, config in self.apis.items()
+        }
+        
+        # The aiohttp session lives on the shared runtime loop; close it at shutdown
+        runtime.register_cleanup(self.close_session)
+        
         logger.info("✅ Free Music Data Manager initialized")
     
+    def _load_catalog(self) -> None:
+        """Index the saved catalog store on first use"""
+        with self._catalog_lock:
+            if not self._catalog_loaded:
+                if os.path.exists(CATALOG_PATH + '.idx'):
+                    tracks = list(open_store(CATALOG_PATH).iter_records())
+                    self.catalog.add_many(tracks)
+                    self.search_index.add_many(tracks)
+                    self.dedup.seed(tracks)
+                    logger.info(f"✅ Indexed {len(tracks)} catalog tracks")
+                self._catalog_loaded = True
+    
+    def get_catalog(self) -> MusicCatalog:
+        """The sorted/filtered catalog, loaded from the saved catalog store on first use"""
+        self._load_catalog()
+        return self.catalog
+    
+    def get_search_index(self) -> SearchIndex:
+        """The full-text index over the same tracks"""
+        self._load_catalog()
+        return self.search_index
+    
+    def index_track(self, track: Dict) -> None:
+        """Make a newly ingested or updated track visible to browsing and search"""
+        self.catalog.add(track)
+        self.search_index.add(track)
+    
     async def init_session(self):
-        """Initialize aiohttp session for async requests"""
-        if not self.session:
+        """Initialize the shared aiohttp session (reused across downloads)"""
+        if not self.session or self.session.closed:
             timeout = aiohttp.ClientTimeout(total=10)
-            self.session = aiohttp.ClientSession(timeout=timeout)
+            connector = aiohttp.TCPConnector(limit_per_host=4, ttl_dns_cache=300)
+            self.session = aiohttp.ClientSession(timeout=timeout, connector=connector)
     
     async def close_session(self):
         """Close aiohttp session"""
         if self.session:
             await self.session.close()
+            self.session = None
     
-    async def fetch_jamendo_tracks(self, limit=100) -> List[Dict]:
-        """Fetch tracks from Jamendo API"""
+    @asynccontextmanager
+    async def _get(self, source: str, url: str, **kwargs):
+        """GET against one source, waiting for its rate limiter first"""
+        await self.rate_limiters[source].acquire()
+        async with self.session.get(url, **kwargs) as response:
+            yield response
+    
+    async def _fetch_page(self, source: str, url: str, params: Dict = None, headers: Dict = None,
+                          validators: Optional[Dict] = None):
+        """
+        One rate-limited JSON page from a source, or None if the request failed.
+        With validators (a checkpoint holding etag/last_modified) the request is
+        conditional: NOT_MODIFIED comes back on 304 and fresh validators are stored on 200.
+        """
+        headers = dict(headers or {})
+        if validators is not None:
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+        async with self._get(source, url, params=params, headers=headers or None) as response:
+            if response.status == 304 and validators is not None:
+                return NOT_MODIFIED
+            if response.status == 200:
+                if validators is not None:
+                    validators['etag'] = response.headers.get('ETag')
+                    validators['last_modified'] = response.headers.get('Last-Modified')
+                return await response.json()
+            logger.error(f"❌ {source.title()} API error: {response.status}")
+            return None
+    
+    @staticmethod
+    def _resume_cursor(checkpoint: Optional[Dict], start: Dict) -> Dict:
+        """Where a crawl starts: the checkpoint's saved cursor, else start (recorded as in progress)"""
+        if checkpoint is None:
+            return dict(start)
+        if not checkpoint.get('cursor'):
+            checkpoint['cursor'] = dict(start)
+        return dict(checkpoint['cursor'])
+    
+    @staticmethod
+    def _save_cursor(checkpoint: Optional[Dict], cursor: Optional[Dict], last_ids: List[str] = None) -> None:
+        """Record progress after a fully yielded page; cursor=None marks the crawl finished"""
+        if checkpoint is not None:
+            checkpoint['cursor'] = cursor
+            if last_ids:
+                checkpoint['last_ids'] = last_ids
+    
+    async def iter_jamendo_tracks(self, limit: Optional[int] = None, page_size: int = 200,
+                                  order: str = 'popularity_total', checkpoint: Optional[Dict] = None) -> AsyncIterator[Dict]:
+        """
+        Walk Jamendo's track listing by offset, yielding normalized tracks (limit=None: everything).
+        With a checkpoint dict the crawl resumes from, and keeps updating, its saved offset.
+        """
+        await self.init_session()
+        url = f"{self.apis['jamendo']['base_url']}/tracks"
+        page_size = min(page_size, 200)  # API maximum
+        offset = self._resume_cursor(checkpoint, {'offset': 0})['offset']
+        yielded = 0
+        logger.info(f"🎵 Fetching {limit or 'all'} tracks from Jamendo (offset {offset})...")
+        
         try:
-            await self.init_session()
-            
-            url = f"{self.apis['jamendo']['base_url']}/tracks"
-            params = {
-                'client_id': self.apis['jamendo']['client_id'],
-                'format': 'json',
-                'limit': min(limit, 200),
-                'include': 'musicinfo+stats+licenses',
-                'order': 'popularity_total',
-                'tags': 'electronic,ambient,rock,pop,jazz'
-            }
-            
-            logger.info(f"🎵 Fetching {limit} tracks from Jamendo...")
-            
-            async with self.session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    tracks = data.get('results', [])
-                    
-                    # Transform to our format
-                    transformed_tracks = []
-                    for track in tracks:
-                        transformed_track = {
-                            'id': f"jamendo_{track.get('id')}",
-                            'title': track.get('name', 'Unknown'),
-                            'artist': track.get('artist_name', 'Unknown'),
-                            'genre': self._extract_genre(track.get('musicinfo', {})),
-                            'mood': self._extract_mood(track.get('musicinfo', {})),
-                            'duration': track.get('duration', 0),
-                            'url': track.get('audio', ''),
-                            'download_url': track.get('audiodownload', ''),
-                            'license': track.get('license_ccurl', ''),
-                            'tags': track.get('musicinfo', {}).get('tags', {}).get('genres', []),
-                            'created_at': datetime.utcnow().isoformat(),
-                            'source': 'jamendo',
-                            'popularity': track.get('stats', {}).get('rate', 0)
-                        }
-                        transformed_tracks.append(transformed_track)
-                    
-                    logger.info(f"✅ Successfully fetched {len(transformed_tracks)} tracks from Jamendo")
-                    return transformed_tracks
-                else:
-                    logger.error(f"❌ Jamendo API error: {response.status}")
-                    return []
-                    
+            while limit is None or yielded < limit:
+                params = {
+                    'client_id': self.apis['jamendo']['client_id'],
+                    'format': 'json',
+                    'limit': page_size if limit is None else min(page_size, limit - yielded),
+                    'offset': offset,
+                    'include': 'musicinfo+stats+licenses',
+                    'order': order,
+                    'tags': 'electronic,ambient,rock,pop,jazz'
+                }
+                validators = checkpoint if checkpoint is not None and offset == 0 else None
+                data = await self._fetch_page('jamendo', url, params, validators=validators)
+                if data is NOT_MODIFIED:
+                    self._save_cursor(checkpoint, None)
+                    break
+                if data is None:
+                    break
+                tracks = data.get('results', [])
+                for track in self._normalize_jamendo_page(tracks):
+                    yield track
+                yielded += len(tracks)
+                offset += len(tracks)
+                last_page = len(tracks) < params['limit']
+                self._save_cursor(checkpoint, None if last_page else {'offset': offset},
+                                  [f"jamendo_{track.get('id')}" for track in tracks])
+                if last_page:
+                    break
         except Exception as e:
             logger.error(f"❌ Jamendo fetch failed: {e}")
-            return []
+        logger.info(f"✅ Successfully fetched {yielded} tracks from Jamendo")
     
-    async def fetch_freesound_tracks(self, limit=50) -> List[Dict]:
-        """Fetch audio samples from Freesound"""
+    async def iter_freesound_tracks(self, limit: Optional[int] = None, page_size: int = 150,
+                                    sort: str = 'downloads_desc', checkpoint: Optional[Dict] = None) -> AsyncIterator[Dict]:
+        """
+        Follow Freesound's next-page links, yielding normalized tracks (limit=None: everything).
+        With a checkpoint dict the crawl resumes from, and keeps updating, its saved page link.
+        """
+        await self.init_session()
+        first_url = f"{self.apis['freesound']['base_url']}/search/text/"
+        first_params = {
+            'query': 'music OR song OR melody OR beat',
+            'filter': 'duration:[10.0 TO 300.0] AND type:wav',
+            'sort': sort,
+            'page_size': min(page_size, 150) if limit is None else min(page_size, 150, limit),
+            'fields': 'id,name,username,duration,download,url,license,tags,description'
+        }
+        url = self._resume_cursor(checkpoint, {'url': None})['url']
+        yielded = 0
+        logger.info(f"🎵 Fetching {limit or 'all'} audio samples from Freesound...")
+        
         try:
-            await self.init_session()
-            
-            url = f"{self.apis['freesound']['base_url']}/search/text/"
-            params = {
-                'query': 'music OR song OR melody OR beat',
-                'filter': 'duration:[10.0 TO 300.0] AND type:wav',
-                'sort': 'downloads_desc',
-                'page_size': min(limit, 150),
-                'fields': 'id,name,username,duration,download,url,license,tags,description'
-            }
-            
-            logger.info(f"🎵 Fetching {limit} audio samples from Freesound...")
-            
-            async with self.session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    sounds = data.get('results', [])
-                    
-                    # Transform to our format
-                    transformed_tracks = []
-                    for sound in sounds:
-                        transformed_track = {
-                            'id': f"freesound_{sound.get('id')}",
-                            'title': sound.get('name', 'Unknown'),
-                            'artist': sound.get('username', 'Unknown'),
-                            'genre': self._classify_genre_from_tags(sound.get('tags', [])),
-                            'mood': self._classify_mood_from_description(sound.get('description', '')),
-                            'duration': int(sound.get('duration', 0)),
-                            'url': sound.get('url', ''),
-                            'download_url': sound.get('download', ''),
-                            'license': sound.get('license', ''),
-                            'tags': sound.get('tags', []),
-                            'created_at': datetime.utcnow().isoformat(),
-                            'source': 'freesound',
-                            'description': sound.get('description', '')
-                        }
-                        transformed_tracks.append(transformed_track)
-                    
-                    logger.info(f"✅ Successfully fetched {len(transformed_tracks)} audio samples from Freesound")
-                    return transformed_tracks
+            while limit is None or yielded < limit:
+                if url:
+                    # Page links already carry every query parameter
+                    data = await self._fetch_page('freesound', url)
+                else:
+                    data = await self._fetch_page('freesound', first_url, first_params, validators=checkpoint)
+                if data is NOT_MODIFIED:
+                    self._save_cursor(checkpoint, None)
+                    break
+                if data is None:
+                    break
+                sounds = data.get('results', [])
+                for track in self._normalize_freesound_page(sounds):
+                    if limit is not None and yielded >= limit:
+                        break  # the cursor stays on this page, so a resume re-reads its tail
+                    yield track
+                    yielded += 1
                 else:
-                    logger.error(f"❌ Freesound API error: {response.status}")
-                    return []
-                    
+                    url = data.get('next')
+                    self._save_cursor(checkpoint, {'url': url} if url else None,
+                                      [f"freesound_{sound.get('id')}" for sound in sounds])
+                    if not url:
+                        break
         except Exception as e:
             logger.error(f"❌ Freesound fetch failed: {e}")
-            return []
+        logger.info(f"✅ Successfully fetched {yielded} audio samples from Freesound")
     
-    async def fetch_musicbrainz_data(self, limit=50) -> List[Dict]:
-        """Fetch metadata from MusicBrainz"""
+    async def iter_musicbrainz_data(self, limit: Optional[int] = None, page_size: int = 100,
+                                    checkpoint: Optional[Dict] = None) -> AsyncIterator[Dict]:
+        """
+        Page through a MusicBrainz release search by offset, yielding normalized tracks.
+        With a checkpoint dict the crawl resumes from, and keeps updating, its saved offset.
+        """
+        await self.init_session()
+        url = f"{self.apis['musicbrainz']['base_url']}/release"
+        headers = {
+            'User-Agent': 'AI-Music-Portal/1.0 (contact@ai-music-portal.com)'
+        }
+        page_size = min(page_size, 100)  # API maximum
+        offset = self._resume_cursor(checkpoint, {'offset': 0})['offset']
+        yielded = 0
+        logger.info(f"🎵 Fetching {limit or 'all'} releases from MusicBrainz (offset {offset})...")
+        
         try:
-            await self.init_session()
-            
-            # Search for popular releases
-            url = f"{self.apis['musicbrainz']['base_url']}/release"
-            params = {
-                'query': 'tag:electronic OR tag:ambient OR tag:rock OR tag:pop',
-                'fmt': 'json',
-                'limit': min(limit, 100)
-            }
-            
-            headers = {
-                'User-Agent': 'AI-Music-Portal/1.0 (contact@ai-music-portal.com)'
-            }
-            
-            logger.info(f"🎵 Fetching {limit} releases from MusicBrainz...")
-            
-            async with self.session.get(url, params=params, headers=headers) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    releases = data.get('releases', [])
-                    
-                    # Transform to our format
-                    transformed_tracks = []
-                    for release in releases:
-                        transformed_track = {
-                            'id': f"musicbrainz_{release.get('id')}",
-                            'title': release.get('title', 'Unknown'),
-                            'artist': self._extract_artist_from_release(release),
-                            'genre': self._extract_genre_from_tags(release.get('tags', [])),
-                            'mood': 'Various',
-                            'duration': 180,  # Default duration
-                            'url': '',  # MusicBrainz doesn't provide audio URLs
-                            'license': 'Various',
-                            'tags': [tag.get('name', '') for tag in release.get('tags', [])],
-                            'created_at': datetime.utcnow().isoformat(),
-                            'source': 'musicbrainz',
-                            'metadata': {
-                                'mbid': release.get('id'),
-                                'country': release.get('country'),
-                                'date': release.get('date')
-                            }
-                        }
-                        transformed_tracks.append(transformed_track)
-                    
-                    logger.info(f"✅ Successfully fetched {len(transformed_tracks)} releases from MusicBrainz")
-                    return transformed_tracks
-                else:
-                    logger.error(f"❌ MusicBrainz API error: {response.status}")
-                    return []
-                    
+            while limit is None or yielded < limit:
+                params = {
+                    'query': 'tag:electronic OR tag:ambient OR tag:rock OR tag:pop',
+                    'fmt': 'json',
+                    'limit': page_size if limit is None else min(page_size, limit - yielded),
+                    'offset': offset
+                }
+                data = await self._fetch_page('musicbrainz', url, params, headers)
+                if data is None:
+                    break
+                releases = data.get('releases', [])
+                for release in releases:
+                    yield self._normalize_musicbrainz_release(release)
+                yielded += len(releases)
+                offset += len(releases)
+                last_page = not releases or offset >= data.get('count', 0)
+                self._save_cursor(checkpoint, None if last_page else {'offset': offset},
+                                  [f"musicbrainz_{release.get('id')}" for release in releases])
+                if last_page:
+                    break
         except Exception as e:
             logger.error(f"❌ MusicBrainz fetch failed: {e}")
-            return []
+        logger.info(f"✅ Successfully fetched {yielded} releases from MusicBrainz")
     
-    def _extract_genre(self, musicinfo: Dict) -> str:
-        """Extract genre from Jamendo musicinfo"""
-        vocalinstrumental = musicinfo.get('vocalinstrumental', [])
-        tags = musicinfo.get('tags', {})
-        
-        if 'electronic' in str(tags).lower():
-            return 'Electronic'
-        elif 'rock' in str(tags).lower():
-            return 'Rock'
-        elif 'pop' in str(tags).lower():
-            return 'Pop'
-        elif 'jazz' in str(tags).lower():
-            return 'Jazz'
-        elif 'ambient' in str(tags).lower():
-            return 'Ambient'
-        else:
-            return 'Various'
+    def iter_source(self, source: str, limit: Optional[int] = None, **options) -> AsyncIterator[Dict]:
+        """Paginated iterator for one source by name; options go to its iter_* method"""
+        factories = {
+            'jamendo': self.iter_jamendo_tracks,
+            'freesound': self.iter_freesound_tracks,
+            'musicbrainz': self.iter_musicbrainz_data
+        }
+        return factories[source](limit, **options)
     
-    def _extract_mood(self, musicinfo: Dict) -> str:
-        """Extract mood from Jamendo musicinfo"""
-        tags_str = str(musicinfo.get('tags', {})).lower()
-        
-        if any(word in tags_str for word in ['energetic', 'upbeat', 'fast']):
-            return 'Energetic'
-        elif any(word in tags_str for word in ['calm', 'peaceful', 'slow']):
-            return 'Calm'
-        elif any(word in tags_str for word in ['dark', 'mysterious']):
-            return 'Mysterious'
-        elif any(word in tags_str for word in ['happy', 'cheerful', 'positive']):
-            return 'Happy'
-        else:
-            return 'Neutral'
+    def source_iterators(self, limits: Dict[str, Optional[int]]) -> Dict[str, AsyncIterator[Dict]]:
+        """Paginated iterators for the requested sources ({source: limit})"""
+        return {source: self.iter_source(source, limit) for source, limit in limits.items()}
     
-    def _classify_genre_from_tags(self, tags: List[str]) -> str:
-        """Classify genre based on tags"""
-        tags_str = ' '.join(tags).lower()
+    async def stream_free_music_data(self, limits: Dict[str, Optional[int]],
+                                     queue_size: int = STREAM_QUEUE_SIZE) -> AsyncIterator[Dict]:
+        """
+        Crawl several sources concurrently and yield their tracks as they arrive.
+        A bounded queue keeps memory flat: crawlers pause while the consumer is
+        behind, and stop when the consumer stops iterating.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        done = object()
         
-        if any(word in tags_str for word in ['electronic', 'synth', 'digital']):
-            return 'Electronic'
-        elif any(word in tags_str for word in ['rock', 'guitar', 'metal']):
-            return 'Rock'
-        elif any(word in tags_str for word in ['ambient', 'atmosphere', 'drone']):
-            return 'Ambient'
-        elif any(word in tags_str for word in ['classical', 'orchestra', 'piano']):
-            return 'Classical'
-        else:
-            return 'Various'
-    
-    def _classify_mood_from_description(self, description: str) -> str:
-        """Classify mood from description"""
-        desc_lower = description.lower()
+        async def crawl(source: str, tracks: AsyncIterator[Dict]) -> None:
+            try:
+                async for track in tracks:
+                    await queue.put(track)
+            except asyncio.CancelledError:
+                raise  # the consumer is gone; nobody waits for the end marker
+            except Exception as e:
+                logger.error(f"❌ {source.title()} crawl failed: {e}")
+            finally:
+                await tracks.aclose()
+            await queue.put(done)
         
-        if any(word in desc_lower for word in ['energetic', 'upbeat', 'fast', 'exciting']):
-            return 'Energetic'
-        elif any(word in desc_lower for word in ['calm', 'peaceful', 'relaxing', 'soft']):
-            return 'Calm'
-        elif any(word in desc_lower for word in ['dark', 'mysterious', 'spooky']):
-            return 'Mysterious'
-        elif any(word in desc_lower for word in ['happy', 'cheerful', 'joyful']):
-            return 'Happy'
-        else:
-            return 'Neutral'
+        crawlers = [
+            asyncio.create_task(crawl(source, tracks))
+            for source, tracks in self.source_iterators(limits).items()
+        ]
+        running = len(crawlers)
+        try:
+            while running:
+                item = await queue.get()
+                if item is done:
+                    running -= 1
+                else:
+                    yield item
+        finally:
+            for crawler in crawlers:
+                crawler.cancel()
+            await asyncio.gather(*crawlers, return_exceptions=True)
+    
+    async def fetch_jamendo_tracks(self, limit=100) -> List[Dict]:
+        """Fetch tracks from Jamendo API"""
+        return [track async for track in self.iter_jamendo_tracks(limit)]
+    
+    async def fetch_freesound_tracks(self, limit=50) -> List[Dict]:
+        """Fetch audio samples from Freesound"""
+        return [track async for track in self.iter_freesound_tracks(limit)]
+    
+    async def fetch_musicbrainz_data(self, limit=50) -> List[Dict]:
+        """Fetch metadata from MusicBrainz"""
+        return [track async for track in self.iter_musicbrainz_data(limit)]
+    
+    def _normalize_jamendo_page(self, tracks: List[Dict]) -> List[Dict]:
+        """Jamendo tracks -> our track format, classifying the page's tags in one batch"""
+        texts = [tags_text(track.get('musicinfo', {}).get('tags', {})) for track in tracks]
+        return [
+            self._normalize_jamendo_track(track, genre, mood)
+            for track, genre, mood in zip(tracks, jamendo_genre.classify_many(texts),
+                                          jamendo_mood.classify_many(texts))
+        ]
+    
+    def _normalize_freesound_page(self, sounds: List[Dict]) -> List[Dict]:
+        """Freesound sounds -> our track format, classifying the page in one batch"""
+        genres = tag_genre.classify_many(tags_text(sound.get('tags', [])) for sound in sounds)
+        moods = description_mood.classify_many(sound.get('description') or '' for sound in sounds)
+        return [
+            self._normalize_freesound_sound(sound, genre, mood)
+            for sound, genre, mood in zip(sounds, genres, moods)
+        ]
+    
+    def _normalize_jamendo_track(self, track: Dict, genre: str, mood: str) -> Dict:
+        """Jamendo track -> our track format"""
+        return {
+            'id': f"jamendo_{track.get('id')}",
+            'title': track.get('name', 'Unknown'),
+            'artist': track.get('artist_name', 'Unknown'),
+            'genre': genre,
+            'mood': mood,
+            'duration': track.get('duration', 0),
+            'url': track.get('audio', ''),
+            'download_url': track.get('audiodownload', ''),
+            'license': track.get('license_ccurl', ''),
+            'tags': track.get('musicinfo', {}).get('tags', {}).get('genres', []),
+            'created_at': datetime.utcnow().isoformat(),
+            'source': 'jamendo',
+            'popularity': track.get('stats', {}).get('rate', 0)
+        }
+    
+    def _normalize_freesound_sound(self, sound: Dict, genre: str, mood: str) -> Dict:
+        """Freesound sound -> our track format"""
+        return {
+            'id': f"freesound_{sound.get('id')}",
+            'title': sound.get('name', 'Unknown'),
+            'artist': sound.get('username', 'Unknown'),
+            'genre': genre,
+            'mood': mood,
+            'duration': int(sound.get('duration', 0)),
+            'url': sound.get('url', ''),
+            'download_url': sound.get('download', ''),
+            'license': sound.get('license', ''),
+            'tags': sound.get('tags', []),
+            'created_at': datetime.utcnow().isoformat(),
+            'source': 'freesound',
+            'description': sound.get('description', '')
+        }
+    
+    def _normalize_musicbrainz_release(self, release: Dict) -> Dict:
+        """MusicBrainz release -> our track format"""
+        return {
+            'id': f"musicbrainz_{release.get('id')}",
+            'title': release.get('title', 'Unknown'),
+            'artist': self._extract_artist_from_release(release),
+            'genre': self._extract_genre_from_tags(release.get('tags', [])),
+            'mood': 'Various',
+            'duration': 180,  # Default duration
+            'url': '',  # MusicBrainz doesn't provide audio URLs
+            'license': 'Various',
+            'tags': [tag.get('name', '') for tag in release.get('tags', [])],
+            'created_at': datetime.utcnow().isoformat(),
+            'source': 'musicbrainz',
+            'metadata': {
+                'mbid': release.get('id'),
+                'country': release.get('country'),
+                'date': release.get('date')
+            }
+        }
     
     def _extract_artist_from_release(self, release: Dict) -> str:
         """Extract artist name from MusicBrainz release"""
@@ -300,7 +459,7 @@ class FreeeMusicDataManager:
         """Extract genre from MusicBrainz tags"""
         for tag in tags:
             tag_name = tag.get('name', '').lower()
-            if tag_name in ['electronic', 'rock', 'pop', 'jazz', 'classical', 'ambient']:
+            if tag_name in MUSICBRAINZ_GENRES:
                 return tag_name.title()
         return 'Various'
     
@@ -320,32 +479,31 @@ class FreeeMusicDataManager:
         freesound_limit = int(total_limit * 0.3)  # 30% from Freesound
         musicbrainz_limit = int(total_limit * 0.2)  # 20% from MusicBrainz
         
+        # Sources are crawled concurrently, each throttled by its own token bucket,
+        # so wall time is that of the slowest source
+        limits = {
+            'jamendo': jamendo_limit,
+            'freesound': freesound_limit,
+            'musicbrainz': musicbrainz_limit
+        }
+        download_stats['sources'] = dict.fromkeys(limits, 0)
+        download_stats['duplicates'] = 0
+        self._load_catalog()  # seeds dedup with the saved catalog
+        run_dedup = Deduplicator(capacity=max(1024, total_limit))  # duplicates within this download
         try:
-            # Fetch from Jamendo
-            jamendo_tracks = await self.fetch_jamendo_tracks(jamendo_limit)
-            all_tracks.extend(jamendo_tracks)
-            download_stats['sources']['jamendo'] = len(jamendo_tracks)
-            
-            # Add delay to respect rate limits
-            await asyncio.sleep(1)
-            
-            # Fetch from Freesound
-            freesound_tracks = await self.fetch_freesound_tracks(freesound_limit)
-            all_tracks.extend(freesound_tracks)
-            download_stats['sources']['freesound'] = len(freesound_tracks)
-            
-            # Add delay to respect rate limits
-            await asyncio.sleep(1)
-            
-            # Fetch from MusicBrainz
-            musicbrainz_tracks = await self.fetch_musicbrainz_data(musicbrainz_limit)
-            all_tracks.extend(musicbrainz_tracks)
-            download_stats['sources']['musicbrainz'] = len(musicbrainz_tracks)
-            
+            async for track in self.stream_free_music_data(limits):
+                # Same source id, MBID or title/artist as a saved track or one fetched earlier in this run
+                if self.dedup.duplicate_of(track) or run_dedup.check_and_add(track):
+                    download_stats['duplicates'] += 1
+                    continue
+                all_tracks.append(track)
+                self.index_track(track)
+                download_stats['sources'][track['source']] += 1
         except Exception as e:
             logger.error(f"❌ Error during music data download: {e}")
-        finally:
-            await self.close_session()
+        download_stats['rate_limits'] = {
+            source: self.rate_limiters[source].stats() for source in limits
+        }
         
         download_stats['total_downloaded'] = len(all_tracks)
         download_stats['completed_at'] = datetime.utcnow().isoformat()
@@ -360,23 +518,17 @@ class FreeeMusicDataManager:
             'stats': download_stats
         }
     
-    def save_music_data_to_file(self, filename='free_music_data.json'):
-        """Save downloaded music data to JSON file"""
+    def save_music_data_to_file(self, filename=CATALOG_PATH):
+        """Append downloaded music data to the catalog store (unchanged tracks are skipped)"""
         try:
-            data = {
-                'metadata': {
-                    'download_date': datetime.utcnow().isoformat(),
-                    'total_tracks': len(self.downloaded_tracks),
-                    'sources': list(set(track.get('source') for track in self.downloaded_tracks))
-                },
-                'tracks': self.downloaded_tracks
-            }
-            
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            store = open_store(os.path.splitext(filename)[0])
+            written = store.put_many(self.downloaded_tracks)
+            store.flush()
+            for track in self.downloaded_tracks:
+                self.dedup.add(track)
             
-            logger.info(f"✅ Music data saved to {filename}")
-            return filename
+            logger.info(f"✅ Music data saved to {store.records_path} ({written} new or changed tracks)")
+            return store.records_path
             
         except Exception as e:
             logger.error(f"❌ Failed to save music data: {e}")
@@ -384,6 +536,12 @@ class FreeeMusicDataManager:
     
     def get_sample_tracks_for_demo(self, count=10) -> List[Dict]:
         """Get sample tracks for demo purposes"""
+        if not self.downloaded_tracks and os.path.exists(CATALOG_PATH + '.idx'):
+            # Nothing downloaded by this process; read the first few from the saved catalog
+            samples = list(islice(open_store(CATALOG_PATH).iter_records(), count))
+            if samples:
+                return samples
+        
         if not self.downloaded_tracks:
             # Return default demo tracks if no data downloaded
             return [
@@ -405,12 +563,28 @@ class FreeeMusicDataManager:
 
 # Global instance
 free_music_manager = FreeeMusicDataManager()
+catalog_sync = CatalogSync(free_music_manager, catalog_path=CATALOG_PATH)
 
 # Async wrapper functions for Flask integration
 async def download_free_music_data(limit=300):
     """Download free music data - async wrapper"""
     return await free_music_manager.download_all_free_music_data(limit)
 
+async def sync_free_music_data(limit=None, full=False):
+    """
+    Incremental catalog sync: fetch only new or changed tracks (resuming any
+    interrupted crawl) and merge them into the saved catalog.
+    limit caps the tracks fetched this run, split across sources like a download.
+    """
+    limits = dict.fromkeys(('jamendo', 'freesound', 'musicbrainz'))
+    if limit is not None:
+        limits = {'jamendo': int(limit * 0.5), 'freesound': int(limit * 0.3), 'musicbrainz': int(limit * 0.2)}
+    stats = await catalog_sync.sync(limits, full=full)
+    return {
+        'total_tracks': stats['total_tracks'],
+        'stats': stats
+    }
+
 def get_free_music_samples(count=10):
     """Get free music samples for demo"""
     return free_music_manager.get_sample_tracks_for_demo(count)
@@ -421,16 +595,8 @@ def save_downloaded_music_data():
 
 # Sync function for immediate use
 def download_music_data_sync(limit=100):
-    """Synchronous wrapper for downloading music data"""
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        result = loop.run_until_complete(
-            free_music_manager.download_all_free_music_data(limit)
-        )
-        return result
-    finally:
-        loop.close()
+    """Synchronous wrapper for downloading music data (runs on the shared async runtime)"""
+    return run_async(free_music_manager.download_all_free_music_data(limit))
 
 if __name__ == "__main__":
     # Test the music data manager
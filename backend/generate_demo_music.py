@@ -6,73 +6,53 @@ Creates Electronic Dreams, Acoustic Serenity, and Jazz Fusion demo tracks
 
 import numpy as np
 import wave
-import struct
 import os
 
+import audio_dsp
+
 def generate_tone(frequency, duration, sample_rate=44100, volume=0.5):
     """Generate a simple tone"""
     frames = int(duration * sample_rate)
-    arr = []
-    for i in range(frames):
-        value = volume * np.sin(2 * np.pi * frequency * i / sample_rate)
-        arr.append(value)
-    return arr
+    t = audio_dsp.sample_times(frames, sample_rate)
+    return audio_dsp.sine(frequency, t, volume)
 
 def generate_chord(frequencies, duration, sample_rate=44100, volume=0.3):
     """Generate a chord by combining multiple frequencies"""
     frames = int(duration * sample_rate)
-    arr = []
-    for i in range(frames):
-        value = 0
-        for freq in frequencies:
-            value += volume * np.sin(2 * np.pi * freq * i / sample_rate)
-        value /= len(frequencies)  # Normalize
-        arr.append(value)
-    return arr
+    t = audio_dsp.sample_times(frames, sample_rate)
+    return audio_dsp.chord(frequencies, t, volume)
 
 def add_envelope(arr, attack=0.1, decay=0.1, sustain=0.7, release=0.2):
     """Add ADSR envelope to the sound"""
+    arr = np.asarray(arr, dtype=np.float64)
     total_frames = len(arr)
     attack_frames = int(attack * total_frames)
     decay_frames = int(decay * total_frames)
     release_frames = int(release * total_frames)
-    sustain_frames = total_frames - attack_frames - decay_frames - release_frames
-    
-    result = []
-    for i, sample in enumerate(arr):
-        if i < attack_frames:
-            # Attack phase
-            envelope = i / attack_frames
-        elif i < attack_frames + decay_frames:
-            # Decay phase
-            envelope = 1.0 - (1.0 - sustain) * (i - attack_frames) / decay_frames
-        elif i < attack_frames + decay_frames + sustain_frames:
-            # Sustain phase
-            envelope = sustain
-        else:
-            # Release phase
-            envelope = sustain * (1.0 - (i - attack_frames - decay_frames - sustain_frames) / release_frames)
-        
-        result.append(sample * envelope)
     
-    return result
+    envelope = audio_dsp.adsr_envelope(
+        np.arange(total_frames, dtype=np.float64),
+        attack=attack_frames,
+        decay=decay_frames,
+        sustain=sustain,
+        release=release_frames,
+        length=total_frames
+    )
+    return arr * envelope
 
 def save_wav(filename, audio_data, sample_rate=44100):
     """Save audio data as WAV file"""
+    pcm = audio_dsp.to_pcm16(np.asarray(audio_data, dtype=np.float64))
     with wave.open(filename, 'w') as wav_file:
         nchannels = 1
         sampwidth = 2
         framerate = sample_rate
-        nframes = len(audio_data)
+        nframes = len(pcm)
         comptype = "NONE"
         compname = "not compressed"
         
         wav_file.setparams((nchannels, sampwidth, framerate, nframes, comptype, compname))
-        
-        for sample in audio_data:
-            # Clamp the sample to prevent overflow
-            clamped_sample = max(-1.0, min(1.0, sample))
-            wav_file.writeframes(struct.pack('<h', int(clamped_sample * 32767)))
+        wav_file.writeframes(pcm.tobytes())
 
 def generate_electronic_dreams():
     """Generate Electronic Dreams - Electronic/Synth track"""
@@ -86,36 +66,30 @@ def generate_electronic_dreams():
         [130.81, 164.81, 196.00],  # C minor
     ]
     
-    audio = []
+    # Add some detuning for electronic feel
+    detuned_chords = [[f + np.random.uniform(-2, 2) for f in chord] for chord in chords]
     
-    # Main progression
-    for i in range(2):  # Repeat twice
-        for chord in chords:
-            # Add some detuning for electronic feel
-            detuned_chord = [f + np.random.uniform(-2, 2) for f in chord]
-            chord_audio = generate_chord(detuned_chord, 1.0, volume=0.2)
-            chord_audio = add_envelope(chord_audio, attack=0.05, decay=0.1, sustain=0.8, release=0.05)
-            audio.extend(chord_audio)
+    def render_chord(j):
+        chord_audio = generate_chord(detuned_chords[j], 1.0, volume=0.2)
+        return add_envelope(chord_audio, attack=0.05, decay=0.1, sustain=0.8, release=0.05)
+    
+    # Main progression, repeated twice from the same rendered chords
+    audio = audio_dsp.tile_segments(list(range(len(chords))) * 2, render_chord)
     
     # Add electronic lead melody
     lead_notes = [523.25, 587.33, 659.25, 698.46, 783.99, 698.46, 659.25, 587.33]  # C5 to G5
+    duration = 0.5
+    t = audio_dsp.sample_times(int(44100 * duration))
+    vibrato = 1 + 0.05 * np.sin(2 * np.pi * 6 * t)
     for note in lead_notes:
         # Add vibrato
-        note_audio = []
-        duration = 0.5
-        for i in range(int(44100 * duration)):
-            vibrato = 1 + 0.05 * np.sin(2 * np.pi * 6 * i / 44100)
-            value = 0.15 * np.sin(2 * np.pi * note * vibrato * i / 44100)
-            note_audio.append(value)
-        
+        note_audio = 0.15 * np.sin(2 * np.pi * note * vibrato * t)
         note_audio = add_envelope(note_audio, attack=0.01, decay=0.1, sustain=0.9, release=0.0)
         
         # Overlay on the chord progression
         start_pos = len(audio) - len(note_audio)
         if start_pos >= 0:
-            for i, sample in enumerate(note_audio):
-                if start_pos + i < len(audio):
-                    audio[start_pos + i] += sample
+            audio_dsp.mix_into(audio, note_audio, start_pos)
     
     return audio
 
@@ -131,22 +105,22 @@ def generate_acoustic_serenity():
         [196.00, 246.94, 293.66],  # G major
     ]
     
-    audio = []
+    def render_note(note):
+        if note is None:
+            # Add some silence between chords
+            return np.zeros(int(44100 * 0.2))
+        note_audio = generate_tone(note, 0.4, volume=0.15)
+        return add_envelope(note_audio, attack=0.02, decay=0.2, sustain=0.6, release=0.18)
     
-    # Gentle arpeggiated chords
+    # Gentle arpeggiated chords, each distinct note rendered once
+    sequence = []
     for i in range(3):  # Repeat 3 times for longer track
         for chord in chords:
             # Arpeggiate the chord
-            for note in chord:
-                note_audio = generate_tone(note, 0.4, volume=0.15)
-                note_audio = add_envelope(note_audio, attack=0.02, decay=0.2, sustain=0.6, release=0.18)
-                audio.extend(note_audio)
-            
-            # Add some silence between chords
-            silence = [0] * int(44100 * 0.2)
-            audio.extend(silence)
+            sequence.extend(chord)
+            sequence.append(None)
     
-    return audio
+    return audio_dsp.tile_segments(sequence, render_note)
 
 def generate_jazz_fusion():
     """Generate Jazz Fusion - Complex jazz harmonies"""
@@ -160,30 +134,27 @@ def generate_jazz_fusion():
         [196.00, 246.94, 293.66, 369.99],  # G major 7
     ]
     
-    audio = []
-    
     # Walking bass line
     bass_notes = [98.00, 110.00, 123.47, 130.81, 146.83, 164.81, 174.61, 196.00]
     
-    for i in range(2):  # Repeat twice
-        for j, chord in enumerate(chords):
-            # Bass note
-            bass_note = bass_notes[j % len(bass_notes)]
-            bass_audio = generate_tone(bass_note, 1.0, volume=0.15)
-            bass_audio = add_envelope(bass_audio, attack=0.01, decay=0.1, sustain=0.8, release=0.09)
-            
-            # Jazz chord
-            chord_audio = generate_chord(chord, 1.0, volume=0.1)
-            chord_audio = add_envelope(chord_audio, attack=0.1, decay=0.1, sustain=0.7, release=0.1)
-            
-            # Combine bass and chord
-            combined = []
-            for k in range(max(len(bass_audio), len(chord_audio))):
-                bass_val = bass_audio[k] if k < len(bass_audio) else 0
-                chord_val = chord_audio[k] if k < len(chord_audio) else 0
-                combined.append(bass_val + chord_val)
-            
-            audio.extend(combined)
+    def render_bar(bar):
+        chord, bass_note = bar
+        # Bass note
+        bass_audio = generate_tone(bass_note, 1.0, volume=0.15)
+        bass_audio = add_envelope(bass_audio, attack=0.01, decay=0.1, sustain=0.8, release=0.09)
+        
+        # Jazz chord
+        chord_audio = generate_chord(chord, 1.0, volume=0.1)
+        chord_audio = add_envelope(chord_audio, attack=0.1, decay=0.1, sustain=0.7, release=0.1)
+        
+        # Combine bass and chord
+        combined = np.zeros(max(len(bass_audio), len(chord_audio)))
+        audio_dsp.mix_into(combined, bass_audio)
+        audio_dsp.mix_into(combined, chord_audio)
+        return combined
+    
+    bars = [(tuple(chord), bass_notes[j % len(bass_notes)]) for j, chord in enumerate(chords)]
+    audio = audio_dsp.tile_segments(bars * 2, render_bar)  # Repeat twice
     
     # Add improvised melody line
     melody_notes = [392.00, 440.00, 493.88, 523.25, 587.33, 523.25, 493.88, 440.00]
@@ -195,9 +166,7 @@ def generate_jazz_fusion():
         
         # Overlay on existing audio
         start_pos = int(len(audio) * 0.3) + i * int(44100 * 0.5)
-        for j, sample in enumerate(note_audio):
-            if start_pos + j < len(audio):
-                audio[start_pos + j] += sample
+        audio_dsp.mix_into(audio, note_audio, start_pos)
     
     return audio
 
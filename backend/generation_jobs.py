@@ -0,0 +1,312 @@
+"""
+Asynchronous music generation jobs backed by the generation_requests table
+Requests are recorded as pending and answered with 202 right away; a small
+dispatcher pool renders them in the background and records the outcome.
+A job is rendered only by the worker whose pending -> processing update
+claimed it, so requeued or doubly queued ids are harmless.
+"""
+
+import json
+import logging
+import os
+import queue
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_PENDING = 'pending'
+JOB_PROCESSING = 'processing'
+JOB_COMPLETED = 'completed'
+JOB_FAILED = 'failed'
+FINISHED_STATUSES = (JOB_COMPLETED, JOB_FAILED)
+
+STALE_AFTER = 3600.0  # seconds a processing claim is honoured when its owner cannot be checked
+
+
+class SQLiteJobStore:
+    """
+    Local stand-in for the Azure generation_requests table, for offline runs.
+    Method names and arguments match AzureSQLManager so either can back a
+    GenerationJobRunner.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS generation_requests (
+            id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            prompt TEXT NOT NULL DEFAULT '',
+            genre TEXT,
+            mood TEXT,
+            duration INTEGER,
+            tempo INTEGER,
+            key_signature TEXT,
+            instruments TEXT, -- JSON array
+            vocals INTEGER DEFAULT 0,
+            structure TEXT,
+            lyrics_style TEXT,
+            custom_tags TEXT, -- JSON array
+            status TEXT DEFAULT 'pending', -- pending, processing, completed, failed
+            result_track_id TEXT,
+            error_message TEXT,
+            processing_time_ms INTEGER,
+            claimed_by TEXT, -- worker id holding a processing request
+            claimed_at TEXT,
+            created_at TEXT,
+            completed_at TEXT
+        );
+        CREATE INDEX IF NOT EXISTS IX_generation_requests_user_status
+            ON generation_requests(user_id, status);
+        CREATE INDEX IF NOT EXISTS IX_generation_requests_status
+            ON generation_requests(status);
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self.is_connected = True
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(generation_requests)")}
+            for column in ('claimed_by', 'claimed_at'):
+                if column not in columns:  # databases created before claims
+                    conn.execute(f"ALTER TABLE generation_requests ADD COLUMN {column} TEXT")
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread; sqlite3 connections are not shareable"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def save_generation_request(self, user_id: str, generation_params: Dict) -> Optional[str]:
+        """Record a pending request and return its id"""
+        request_id = str(uuid.uuid4())
+        try:
+            with self._connect() as conn:
+                conn.execute("""
+                    INSERT INTO generation_requests (
+                        id, user_id, prompt, genre, mood, duration, tempo,
+                        key_signature, instruments, vocals, structure,
+                        lyrics_style, custom_tags, status, created_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    request_id,
+                    user_id,
+                    generation_params.get('prompt', ''),
+                    generation_params.get('genre', ''),
+                    generation_params.get('mood', ''),
+                    generation_params.get('duration', 30),
+                    generation_params.get('tempo', 120),
+                    generation_params.get('key', 'C'),
+                    json.dumps(generation_params.get('instruments', [])),
+                    int(bool(generation_params.get('vocals', False))),
+                    generation_params.get('structure', ''),
+                    generation_params.get('lyricsStyle', ''),
+                    json.dumps(generation_params.get('customTags', [])),
+                    JOB_PENDING,
+                    datetime.utcnow().isoformat()
+                ))
+            return request_id
+        except sqlite3.Error as e:
+            logger.error(f"❌ Failed to save generation request: {e}")
+            return None
+
+    def update_generation_status(self, request_id: str, status: str, track_id: str = None,
+                                 error: str = None, processing_time_ms: int = None) -> bool:
+        """Move a request to status; finished statuses also stamp completed_at"""
+        completed_at = datetime.utcnow().isoformat() if status in FINISHED_STATUSES else None
+        try:
+            with self._connect() as conn:
+                conn.execute("""
+                    UPDATE generation_requests
+                    SET status = ?, result_track_id = ?, error_message = ?,
+                        processing_time_ms = COALESCE(?, processing_time_ms),
+                        completed_at = COALESCE(?, completed_at)
+                    WHERE id = ?
+                """, (status, track_id, error, processing_time_ms, completed_at, request_id))
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"❌ Failed to update generation status: {e}")
+            return False
+
+    def claim_generation_request(self, request_id: str, worker_id: str) -> bool:
+        """Atomically move a pending request to processing for worker_id; False if it was not pending"""
+        try:
+            with self._connect() as conn:
+                cursor = conn.execute("""
+                    UPDATE generation_requests
+                    SET status = ?, claimed_by = ?, claimed_at = ?
+                    WHERE id = ? AND status = ?
+                """, (JOB_PROCESSING, worker_id, datetime.utcnow().isoformat(), request_id, JOB_PENDING))
+            return cursor.rowcount == 1
+        except sqlite3.Error as e:
+            logger.error(f"❌ Failed to claim generation request: {e}")
+            return False
+
+    def requeue_generation_request(self, request_id: str, claimed_by: Optional[str]) -> bool:
+        """Return a processing request to pending, only if claimed_by still holds it"""
+        try:
+            with self._connect() as conn:
+                cursor = conn.execute("""
+                    UPDATE generation_requests
+                    SET status = ?, claimed_by = NULL, claimed_at = NULL
+                    WHERE id = ? AND status = ? AND (claimed_by = ? OR (claimed_by IS NULL AND ? IS NULL))
+                """, (JOB_PENDING, request_id, JOB_PROCESSING, claimed_by, claimed_by))
+            return cursor.rowcount == 1
+        except sqlite3.Error as e:
+            logger.error(f"❌ Failed to requeue generation request: {e}")
+            return False
+
+    def get_generation_request(self, request_id: str) -> Optional[Dict]:
+        row = self._connect().execute(
+            "SELECT * FROM generation_requests WHERE id = ?", (request_id,)
+        ).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def get_generation_requests_by_status(self, statuses: List[str]) -> List[Dict]:
+        placeholders = ', '.join('?' for _ in statuses)
+        rows = self._connect().execute(
+            f"SELECT * FROM generation_requests WHERE status IN ({placeholders}) ORDER BY created_at",
+            tuple(statuses)
+        ).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> Dict:
+        request = dict(row)
+        request['instruments'] = json.loads(request['instruments'] or '[]')
+        request['custom_tags'] = json.loads(request['custom_tags'] or '[]')
+        request['vocals'] = bool(request['vocals'])
+        return request
+
+
+class GenerationJobRunner:
+    """
+    Background dispatcher for generation requests.
+    render(request) does the work and returns the result track id; it runs on
+    one of the dispatcher threads, never on an HTTP request thread. Call
+    start() in the process that serves requests (not at import, which may run
+    in a reloader parent or a pre-fork master); it also recovers requests a
+    previous process left behind.
+    """
+
+    def __init__(self, store, render: Callable[[Dict], str], workers: int = 2,
+                 stale_after: float = STALE_AFTER):
+        self.store = store
+        self.render = render
+        self.workers = max(1, workers)
+        self.stale_after = stale_after
+        # host:pid:token, set by start() in the process that runs the jobs; the
+        # token tells this process from an earlier one that had the same pid
+        self.worker_id: Optional[str] = None
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"generation-job-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        self.recover()
+
+    def _owner_is_gone(self, request: Dict) -> bool:
+        """Whether a processing request's claim can be taken over"""
+        owner = request.get('claimed_by')
+        if not owner:
+            return True  # processing since before claims were recorded
+        claimed_at = request.get('claimed_at')
+        if claimed_at and (datetime.utcnow() - datetime.fromisoformat(claimed_at)).total_seconds() > self.stale_after:
+            return True
+        try:
+            host, pid, _ = owner.rsplit(':', 2)
+            pid = int(pid)
+        except ValueError:
+            return True
+        if host != socket.gethostname():
+            return False  # another machine's worker; only staleness frees it
+        if pid == os.getpid():
+            return owner != self.worker_id
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        except OSError:
+            pass  # exists but is not ours to signal
+        return False
+
+    def recover(self) -> int:
+        """Queue pending requests, and processing ones whose worker died or went stale"""
+        try:
+            unfinished = self.store.get_generation_requests_by_status([JOB_PENDING, JOB_PROCESSING])
+        except Exception as e:
+            logger.error(f"❌ Could not load unfinished generation requests: {e}")
+            return 0
+        recovered = 0
+        for request in unfinished:
+            if request['status'] == JOB_PROCESSING:
+                if not self._owner_is_gone(request):
+                    continue
+                if not self.store.requeue_generation_request(request['id'], request.get('claimed_by')):
+                    continue  # someone else recovered or finished it first
+            self._queue.put(request['id'])
+            recovered += 1
+        if recovered:
+            logger.info(f"🔄 Requeued {recovered} unfinished generation requests")
+        return recovered
+
+    def submit(self, user_id: str, generation_params: Dict) -> Optional[str]:
+        """Record a request and queue it; returns the job id or None if it was not recorded"""
+        request_id = self.store.save_generation_request(user_id, generation_params)
+        if request_id:
+            self._queue.put(request_id)
+        return request_id
+
+    def get(self, request_id: str) -> Optional[Dict]:
+        return self.store.get_generation_request(request_id)
+
+    def queued(self) -> int:
+        return self._queue.qsize()
+
+    def _work(self) -> None:
+        while True:
+            request_id = self._queue.get()
+            try:
+                self._run(request_id)
+            except Exception as e:
+                logger.error(f"❌ Generation job {request_id} crashed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _run(self, request_id: str) -> None:
+        if not self.store.claim_generation_request(request_id, self.worker_id):
+            return  # finished, or claimed by another thread or process
+        request = self.store.get_generation_request(request_id)
+        start = time.perf_counter()
+        try:
+            track_id = self.render(request)
+        except Exception as e:
+            logger.error(f"❌ Generation job {request_id} failed: {e}")
+            self.store.update_generation_status(
+                request_id, JOB_FAILED, error=str(e),
+                processing_time_ms=int((time.perf_counter() - start) * 1000)
+            )
+            return
+        self.store.update_generation_status(
+            request_id, JOB_COMPLETED, track_id=track_id,
+            processing_time_ms=int((time.perf_counter() - start) * 1000)
+        )
+        logger.info(f"✅ Generation job {request_id} completed")
@@ -0,0 +1,56 @@
+"""
+HTTP delivery of audio files
+Byte ranges (206), strong ETags, conditional requests and cache headers so
+players can seek with small range requests instead of re-downloading
+"""
+
+import mimetypes
+import os
+import re
+from typing import Optional
+
+from flask import Response, send_file
+from werkzeug.security import safe_join
+
+AUDIO_MIMETYPES = {
+    '.wav': 'audio/wav',
+    '.mp3': 'audio/mpeg',
+    '.ogg': 'audio/ogg',
+    '.flac': 'audio/flac',
+    '.m4a': 'audio/mp4',
+    '.aac': 'audio/aac',
+}
+
+# Renders are named after the hash of everything that determines their bytes
+CONTENT_ADDRESSED = re.compile(r'^render_([0-9a-f]{64})\.[a-z0-9]+$')
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'public, no-cache'  # cache, but check the ETag before reuse
+
+
+def audio_mimetype(filename: str) -> str:
+    extension = os.path.splitext(filename)[1].lower()
+    return AUDIO_MIMETYPES.get(extension) or mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+
+def send_media(directory: str, filename: str, as_attachment: bool = False) -> Optional[Response]:
+    """
+    Conditional, range-capable response for directory/filename, or None if the
+    file does not exist or the name escapes directory.
+    """
+    path = safe_join(directory, filename)
+    if path is None or not os.path.isfile(path):
+        return None
+
+    content_hash = CONTENT_ADDRESSED.match(filename)
+    response = send_file(
+        path,
+        mimetype=audio_mimetype(filename),
+        as_attachment=as_attachment,
+        conditional=True,  # Range/If-Range, If-None-Match, If-Modified-Since
+        # The content hash is a strong validator; otherwise use mtime/size/name
+        etag=content_hash.group(1) if content_hash else True
+    )
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if content_hash else REVALIDATE_CACHE_CONTROL
+    return response
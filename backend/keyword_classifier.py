@@ -0,0 +1,88 @@
+"""
+Table-driven keyword classification for genre and mood
+The genre and mood vocabularies are tables of (label, keywords) compiled once
+into classifiers. A text is normalized once, checked label by label with
+early exit, and the answer is memoized, since tag sets repeat heavily across
+a catalog; batches are classified per distinct text. Matching keeps the
+semantics of the original if/elif chains: keywords match anywhere in the
+lowercased text and the first label in table order wins.
+"""
+
+from functools import lru_cache
+from typing import Iterable, List, Sequence, Tuple
+
+Rules = Sequence[Tuple[str, Sequence[str]]]
+
+# Jamendo musicinfo tags
+JAMENDO_GENRE_RULES: Rules = (
+    ('Electronic', ('electronic',)),
+    ('Rock', ('rock',)),
+    ('Pop', ('pop',)),
+    ('Jazz', ('jazz',)),
+    ('Ambient', ('ambient',))
+)
+
+JAMENDO_MOOD_RULES: Rules = (
+    ('Energetic', ('energetic', 'upbeat', 'fast')),
+    ('Calm', ('calm', 'peaceful', 'slow')),
+    ('Mysterious', ('dark', 'mysterious')),
+    ('Happy', ('happy', 'cheerful', 'positive'))
+)
+
+# Freesound tags and descriptions
+TAG_GENRE_RULES: Rules = (
+    ('Electronic', ('electronic', 'synth', 'digital')),
+    ('Rock', ('rock', 'guitar', 'metal')),
+    ('Ambient', ('ambient', 'atmosphere', 'drone')),
+    ('Classical', ('classical', 'orchestra', 'piano'))
+)
+
+DESCRIPTION_MOOD_RULES: Rules = (
+    ('Energetic', ('energetic', 'upbeat', 'fast', 'exciting')),
+    ('Calm', ('calm', 'peaceful', 'relaxing', 'soft')),
+    ('Mysterious', ('dark', 'mysterious', 'spooky')),
+    ('Happy', ('happy', 'cheerful', 'joyful'))
+)
+
+# MusicBrainz tags are matched whole, first listed tag wins
+MUSICBRAINZ_GENRES = frozenset({'electronic', 'rock', 'pop', 'jazz', 'classical', 'ambient'})
+
+
+def tags_text(tags) -> str:
+    """Flatten tags (a string, list, or dict of lists as Jamendo sends them) into one lowercase string"""
+    if isinstance(tags, dict):
+        return ' '.join(tags_text(value) for value in tags.values())
+    if isinstance(tags, (list, tuple)):
+        return ' '.join(tags_text(value) for value in tags)
+    return str(tags).lower() if tags else ''
+
+
+class KeywordClassifier:
+    """Labels a text with the first rule whose keywords occur in it, or default"""
+
+    def __init__(self, rules: Rules, default: str, cache_size: int = 65536):
+        self.rules = tuple((label, tuple(keyword.lower() for keyword in keywords)) for label, keywords in rules)
+        self.default = default
+        self.classify = lru_cache(maxsize=cache_size)(self._classify)
+
+    def _classify(self, text: str) -> str:
+        # Plain substring tests: CPython's `in` beats a combined re alternation
+        # several times over on texts of this size
+        text = text.lower()
+        for label, keywords in self.rules:
+            for keyword in keywords:
+                if keyword in text:
+                    return label
+        return self.default
+
+    def classify_many(self, texts: Iterable[str]) -> List[str]:
+        """Classify a batch, scanning each distinct text once"""
+        texts = list(texts)
+        labels = {text: self.classify(text) for text in dict.fromkeys(texts)}
+        return [labels[text] for text in texts]
+
+
+jamendo_genre = KeywordClassifier(JAMENDO_GENRE_RULES, 'Various')
+jamendo_mood = KeywordClassifier(JAMENDO_MOOD_RULES, 'Neutral')
+tag_genre = KeywordClassifier(TAG_GENRE_RULES, 'Various')
+description_mood = KeywordClassifier(DESCRIPTION_MOOD_RULES, 'Neutral')
@@ -0,0 +1,178 @@
+"""
+Indexed in-memory music catalog
+Tracks are held by id with secondary indexes on genre, mood and each
+(genre, mood) pair, and every index keeps presorted orderings (date, name, duration, popularity) that are
+maintained with bisect.insort as tracks arrive. A filtered, sorted page is a
+slice of one of those lists, so it costs O(page size) and the total is exact.
+"""
+
+import threading
+from bisect import bisect_left, bisect_right, insort
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from pagination import Position
+
+# sortBy -> (key function, newest/largest first)
+ORDERINGS: Dict[str, Tuple[Callable[[Dict], object], bool]] = {
+    'date': (lambda track: str(track.get('created_at') or ''), True),
+    'name': (lambda track: str(track.get('title') or '').lower(), False),
+    'duration': (lambda track: float(track.get('duration') or 0), True),
+    'popularity': (lambda track: float(track.get('popularity') or track.get('plays') or 0), True),
+}
+SORTED_ORDERINGS = tuple(ORDERINGS)  # the lists actually kept per index
+ORDERINGS['plays'] = ORDERINGS['popularity']  # the library UI calls it plays
+
+FACETS = ('genre', 'mood')
+PAIR = 'genre+mood'  # index key facet for tracks with both; the value is (genre, mood)
+ALL = None  # index key for the unfiltered orderings
+
+IndexKey = Tuple[Optional[str], object]
+
+
+def facet_value(track: Dict, facet: str) -> str:
+    return str(track.get(facet) or '').strip().lower()
+
+
+class MusicCatalog:
+    """
+    Tracks by id plus sorted (key, id) lists for every ordering, both over the
+    whole catalog, per genre / per mood value and per (genre, mood) pair, so
+    every filter reads a single list. Lists are ascending; orderings
+    that want largest first are read from the end.
+    """
+
+    def __init__(self, tracks: Iterable[Dict] = ()):
+        self._tracks: Dict[str, Dict] = {}
+        # (facet, value) -> ordering -> sorted [(key, id)]; (ALL, ALL) is the whole catalog
+        self._orders: Dict[IndexKey, Dict[str, List[Tuple]]] = {}
+        self._lock = threading.RLock()
+        self.add_many(tracks)
+
+    def __len__(self) -> int:
+        return len(self._tracks)
+
+    def __contains__(self, track_id: str) -> bool:
+        return track_id in self._tracks
+
+    def get(self, track_id: str) -> Optional[Dict]:
+        return self._tracks.get(track_id)
+
+    def _index_keys(self, track: Dict) -> List[IndexKey]:
+        keys: List[IndexKey] = [(ALL, ALL)]
+        values = [facet_value(track, facet) for facet in FACETS]
+        for facet, value in zip(FACETS, values):
+            if value:
+                keys.append((facet, value))
+        if all(values):
+            keys.append((PAIR, tuple(values)))
+        return keys
+
+    def _unindex(self, track_id: str, track: Dict) -> None:
+        for index_key in self._index_keys(track):
+            orders = self._orders[index_key]
+            for name, entries in orders.items():
+                entry = (ORDERINGS[name][0](track), track_id)
+                i = bisect_left(entries, entry)
+                if i < len(entries) and entries[i] == entry:
+                    del entries[i]
+            if not orders['date']:
+                del self._orders[index_key]
+
+    def add(self, track: Dict) -> None:
+        """Insert or replace a track, keeping every index sorted"""
+        track_id = str(track['id'])
+        with self._lock:
+            previous = self._tracks.get(track_id)
+            if previous is not None:
+                self._unindex(track_id, previous)
+            self._tracks[track_id] = track
+            for index_key in self._index_keys(track):
+                orders = self._orders.get(index_key)
+                if orders is None:
+                    orders = self._orders[index_key] = {name: [] for name in SORTED_ORDERINGS}
+                for name, entries in orders.items():
+                    insort(entries, (ORDERINGS[name][0](track), track_id))
+
+    def add_many(self, tracks: Iterable[Dict]) -> int:
+        """Bulk insert: append to the orderings and sort each touched list once"""
+        batch = {str(track['id']): track for track in tracks if track.get('id')}
+        with self._lock:
+            for track_id, track in batch.items():
+                previous = self._tracks.get(track_id)
+                if previous is not None:
+                    self._unindex(track_id, previous)
+            touched = set()
+            for track_id, track in batch.items():
+                self._tracks[track_id] = track
+                keys = {name: ORDERINGS[name][0](track) for name in SORTED_ORDERINGS}
+                for index_key in self._index_keys(track):
+                    orders = self._orders.get(index_key)
+                    if orders is None:
+                        orders = self._orders[index_key] = {name: [] for name in keys}
+                    for name, entries in orders.items():
+                        entries.append((keys[name], track_id))
+                    touched.add(index_key)
+            for index_key in touched:
+                for entries in self._orders[index_key].values():
+                    entries.sort()
+        return len(batch)
+
+    def remove(self, track_id: str) -> bool:
+        with self._lock:
+            track = self._tracks.pop(track_id, None)
+            if track is None:
+                return False
+            self._unindex(track_id, track)
+            return True
+
+    def facet_counts(self, facet: str) -> Dict[str, int]:
+        """Tracks per genre or mood value"""
+        with self._lock:
+            return {value: len(orders['date']) for (name, value), orders in self._orders.items() if name == facet}
+
+    def page(self, genre: Optional[str] = None, mood: Optional[str] = None, sort_by: str = 'date',
+             offset: int = 0, limit: int = 50, after: Optional[Position] = None) -> Tuple[List[Dict], int]:
+        """
+        One page of tracks matching genre/mood (None or 'all' for any) in sort_by order,
+        starting offset tracks in, or strictly after the (sort key, id) position `after`.
+        Returns (tracks, total matches).
+        """
+        if sort_by not in ORDERINGS:
+            raise ValueError(f"Unknown sort order: {sort_by}")
+        name = 'popularity' if sort_by == 'plays' else sort_by
+        descending = ORDERINGS[name][1]
+        filters = [(facet, value.strip().lower()) for facet, value in (('genre', genre), ('mood', mood))
+                   if value and value.strip().lower() != 'all']
+        if not filters:
+            index_key = (ALL, ALL)
+        elif len(filters) == 1:
+            index_key = filters[0]
+        else:
+            index_key = (PAIR, tuple(value for _, value in filters))
+        offset, limit = max(0, offset), max(0, limit)
+
+        with self._lock:
+            entries = self._orders.get(index_key, {}).get(name, [])
+            # Window of entries still to come, as [lo, hi) of the ascending list
+            lo, hi = 0, len(entries)
+            if after is not None:
+                try:
+                    position = (after[0], str(after[1]))
+                    if descending:
+                        hi = bisect_left(entries, position)
+                    else:
+                        lo = bisect_right(entries, position)
+                except TypeError:
+                    raise ValueError(f"Cursor position does not match sortBy={sort_by}")
+            total = len(entries)
+            if descending:
+                start, stop = max(lo, hi - offset - limit), max(lo, hi - offset)
+                ids = [track_id for _, track_id in reversed(entries[start:stop])]
+            else:
+                ids = [track_id for _, track_id in entries[lo + offset:min(hi, lo + offset + limit)]]
+            return [self._tracks[track_id] for track_id in ids], total
+
+    def position(self, track: Dict, sort_by: str) -> Position:
+        """Where a track sits in sort_by order, for building a cursor"""
+        name = 'popularity' if sort_by == 'plays' else sort_by
+        return ORDERINGS[name][0](track), str(track['id'])
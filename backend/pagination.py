@@ -0,0 +1,116 @@
+"""
+Opaque cursor tokens for keyset pagination
+A cursor records the sort order plus the (sort key, id) of the last row a
+client saw. The next page starts strictly after that row, using the same
+ordering the index is built on, so page 100 costs what page 1 does.
+Tokens are shared by the in-memory catalog and the SQL queries.
+"""
+
+import base64
+import binascii
+import json
+import re
+from datetime import datetime, timezone
+from typing import Any, Callable, List, Optional, Tuple
+
+CURSOR_VERSION = 1
+
+Position = Tuple[Any, str]  # (sort key, track id) of the last row returned
+
+# JSON type of the sort key each order issues cursors with
+CURSOR_KEY_TYPES = {
+    'date': str,
+    'name': str,
+    'duration': (int, float),
+    'popularity': (int, float),
+    'plays': (int, float)
+}
+
+
+class InvalidCursor(ValueError):
+    """Malformed token, or a token issued for a different sort order"""
+
+
+def encode_cursor(sort_by: str, key: Any, track_id: str) -> str:
+    payload = json.dumps([CURSOR_VERSION, sort_by, key, str(track_id)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: str, sort_by: str) -> Position:
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        version, cursor_sort, key, track_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError, UnicodeError, binascii.Error):
+        raise InvalidCursor("Invalid cursor")
+    if version != CURSOR_VERSION:
+        raise InvalidCursor("Cursor version is no longer supported")
+    if cursor_sort != sort_by:
+        raise InvalidCursor(f"Cursor was issued for sortBy={cursor_sort}, not {sort_by}")
+    # A well-formed token with the wrong key type was not issued by us
+    expected = CURSOR_KEY_TYPES.get(sort_by)
+    if (expected and (isinstance(key, bool) or not isinstance(key, expected))) or not isinstance(track_id, str):
+        raise InvalidCursor(f"Cursor position does not match sortBy={sort_by}")
+    return key, track_id
+
+
+# DATETIME2(7) keys travel as text: pyodbc datetimes stop at microseconds, so a
+# key read as a datetime never compares equal to the stored value again and
+# rows tied with the cursor row would be skipped
+SQL_TIMESTAMP_PARAM = "CAST(? AS DATETIME2(7))"
+
+_ISO_TIMESTAMP = re.compile(r'(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})(\.\d{1,7})?(Z|[+-]\d{2}:\d{2})?')
+
+
+def sql_timestamp_text(column: str) -> str:
+    """SELECT expression for a DATETIME2 column as ISO text with all seven fractional digits"""
+    return f"CONVERT(varchar(27), {column}, 126)"
+
+
+def keyset_predicate(key_column: str, id_column: str, after: Position,
+                     descending: bool = True, key_param: str = '?') -> Tuple[str, List]:
+    """
+    WHERE fragment selecting rows strictly after `after` in
+    ORDER BY key_column, id_column (both DESC when descending).
+    Written as an OR so SQL Server can seek on an index over key_column;
+    key_param is the placeholder expression the key is bound through.
+    """
+    op = '<' if descending else '>'
+    key, track_id = after
+    clause = f"({key_column} {op} {key_param} OR ({key_column} = {key_param} AND {id_column} {op} ?))"
+    return clause, [key, key, track_id]
+
+
+def timestamp_position(after: Position) -> Position:
+    """
+    Cursor position with its created_at key checked and normalized to naive
+    UTC ISO text, for binding with SQL_TIMESTAMP_PARAM
+    """
+    key, track_id = after
+    match = _ISO_TIMESTAMP.fullmatch(str(key))
+    if not match:
+        raise InvalidCursor("Cursor position is not a timestamp")
+    seconds, fraction, zone = match.groups()
+    try:
+        timestamp = datetime.fromisoformat(seconds + ('+00:00' if zone == 'Z' else zone or ''))
+    except ValueError:
+        raise InvalidCursor("Cursor position is not a timestamp")
+    if timestamp.tzinfo is not None:
+        # created_at columns hold naive UTC (GETUTCDATE())
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp.isoformat() + (fraction or ''), track_id
+
+
+def by_created_at(row: dict) -> Position:
+    return row.get('created_at'), str(row['id'])
+
+
+def next_cursor(rows: List[dict], limit: int, sort_by: str,
+                position: Callable[[dict], Position] = by_created_at) -> Tuple[List[dict], Optional[str]]:
+    """
+    Trim rows fetched with limit + 1 to one page; the cursor is set only
+    when the extra row shows there is another page.
+    """
+    if limit <= 0 or len(rows) <= limit:
+        return rows[:limit], None
+    key, track_id = position(rows[limit - 1])
+    return rows[:limit], encode_cursor(sort_by, key, track_id)
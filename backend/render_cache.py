@@ -0,0 +1,70 @@
+"""
+Content-addressed cache for rendered audio
+Deterministic generation parameters hash to a stable filename so repeated
+presets are served as a file lookup instead of a new render
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from audio_store import AudioStore
+
+logger = logging.getLogger(__name__)
+
+
+class RenderCache:
+    """Maps render parameters to files in an AudioStore, which owns size and eviction"""
+
+    def __init__(self, store: AudioStore):
+        self.store = store
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(genre: str, mood: str, duration: int, instruments: List[str] = None,
+                 template: str = None, engine_version: str = '', audio_format: str = '') -> str:
+        """Canonical hash of everything that determines the rendered bytes"""
+        canonical = {
+            'genre': (genre or '').strip().lower(),
+            'mood': (mood or '').strip().lower(),
+            'duration': int(duration),
+            'instruments': sorted(set(instruments or [])),
+            'template': template or None,
+            'engine_version': engine_version,
+            'format': audio_format
+        }
+        payload = json.dumps(canonical, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def filename_for(key: str, extension: str = '.wav') -> str:
+        return f"render_{key}{extension}"
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Filename of a cached render, or None on a miss"""
+        filename = self.filename_for(key)
+        found = self.store.touch(filename)
+        with self._lock:
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return filename if found else None
+
+    def add(self, key: str, filename: str) -> None:
+        """Register a finished file that was written at store.path_for(filename)"""
+        self.store.add(filename)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'store': self.store.stats()
+            }
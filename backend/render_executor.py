@@ -0,0 +1,169 @@
+"""
+Process-pool render farm for CPU-bound synthesis
+Renders run in warm worker processes and hand back finished file paths, so
+Flask request threads only wait on a future instead of competing for the GIL
+"""
+
+import atexit
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 120.0  # seconds a caller waits for one render
+
+
+class RenderQueueFull(Exception):
+    """Every render slot is taken; the caller should retry later"""
+
+
+class RenderTimeout(Exception):
+    """A render did not finish within its timeout; pending is the job if it is still running"""
+
+    def __init__(self, message: str, pending: Optional[Future] = None):
+        super().__init__(message)
+        self.pending = pending
+
+
+def _warm_worker() -> None:
+    """Pool initializer: pay imports and table builds once per worker, not per job"""
+    import numpy  # noqa: F401
+    import scipy.io.wavfile  # noqa: F401
+    import audio_renderer
+    import waveform_index  # noqa: F401
+    audio_renderer.render_audio(duration=0.1)
+
+
+def render_to_file(duration: float, genre: str, mood: str, filepath: str) -> str:
+    """Worker job: render a track and atomically write it as a float32 WAV plus its peaks"""
+    from scipy.io.wavfile import write
+    import audio_renderer
+    import waveform_index
+
+    audio = audio_renderer.render_audio(duration, genre, mood)
+    # Peaks first, so the sidecar already exists once the audio file appears
+    waveform_index.write_peaks(waveform_index.peaks_path(filepath),
+                               waveform_index.build_peaks(audio, audio_renderer.SAMPLE_RATE))
+    # Unique per job: a timed-out render can still be running when the next one starts
+    part_path = f"{filepath}.{os.getpid()}.{uuid.uuid4().hex}.part"
+    try:
+        write(part_path, audio_renderer.SAMPLE_RATE, audio)
+        os.replace(part_path, filepath)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+    return filepath
+
+
+class RenderExecutor:
+    """
+    Bounded front door to a ProcessPoolExecutor.
+    queue_depth caps queued plus running jobs; submissions beyond it fail fast
+    with RenderQueueFull instead of piling up behind the workers.
+    """
+
+    def __init__(self, workers: Optional[int] = None, queue_depth: Optional[int] = None,
+                 timeout: float = DEFAULT_TIMEOUT):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.queue_depth = max(1, queue_depth or self.workers * 4)
+        self.timeout = timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(self.queue_depth)
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # Created on first use so importing the app (and Flask's reloader) never forks
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+                logger.info(f"✅ Render pool started with {self.workers} workers")
+            return self._pool
+
+    def submit(self, func: Callable, *args) -> Future:
+        """Queue func(*args) on a worker or raise RenderQueueFull"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise RenderQueueFull(f"Render queue is full ({self.queue_depth} jobs)")
+        with self._lock:
+            self.submitted += 1
+        try:
+            try:
+                future = self._get_pool().submit(func, *args)
+            except BrokenProcessPool:
+                # A worker died (OOM, signal); start a fresh pool and retry once
+                logger.error("❌ Render pool broken, restarting it")
+                self.shutdown()
+                future = self._get_pool().submit(func, *args)
+        except Exception:
+            with self._lock:
+                self.submitted -= 1
+            self._slots.release()
+            raise
+        future.add_done_callback(self._job_done)
+        return future
+
+    def _job_done(self, future: Future) -> None:
+        self._slots.release()
+        with self._lock:
+            if future.cancelled() or future.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def render_to_file(self, duration: float, genre: str, mood: str, filepath: str,
+                       timeout: Optional[float] = None) -> str:
+        """Render in the pool and block the calling thread until the file exists"""
+        future = self.submit(render_to_file, duration, genre, mood, filepath)
+        try:
+            return future.result(timeout=timeout or self.timeout)
+        except FutureTimeoutError:
+            # Queued jobs are dropped; a job already running cannot be stopped and
+            # finishes in the background, so it travels with the error
+            cancelled = future.cancel()
+            with self._lock:
+                self.timed_out += 1
+            raise RenderTimeout(f"Render did not finish within {timeout or self.timeout:g}s",
+                                pending=None if cancelled else future)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'started': self._pool is not None,
+                'queue_depth': self.queue_depth,
+                'in_flight': self.submitted - self.completed - self.failed,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def create_executor_from_env() -> RenderExecutor:
+    """RenderExecutor configured by RENDER_WORKERS, RENDER_QUEUE_DEPTH and RENDER_TIMEOUT"""
+    executor = RenderExecutor(
+        workers=int(os.environ.get('RENDER_WORKERS', 0)) or None,
+        queue_depth=int(os.environ.get('RENDER_QUEUE_DEPTH', 0)) or None,
+        timeout=float(os.environ.get('RENDER_TIMEOUT', DEFAULT_TIMEOUT))
+    )
+    atexit.register(executor.shutdown)
+    return executor
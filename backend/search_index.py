@@ -0,0 +1,323 @@
+"""
+Full-text search over the music catalog
+An in-memory inverted index: every normalized term maps to a posting list of
+(document, weighted term frequency) kept in growable arrays that numpy reads
+in place, so BM25 scoring is a handful of vectorized operations per term.
+The last query term is expanded by prefix for typeahead, a genre filter is
+applied to each posting list before scoring, and tracks can be added or
+replaced at any time as they are ingested.
+"""
+
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Term frequency weight per track field
+FIELD_WEIGHTS = {
+    'title': 3.0,
+    'artist': 2.0,
+    'tags': 1.5,
+    'genre': 1.0,
+    'mood': 1.0,
+    'description': 1.0
+}
+
+MAX_EXPANSIONS = 50  # completions of a prefix that are scored, most frequent first
+MAX_PREFIX_SCAN = 1000  # vocabulary entries examined per prefix
+AVGDL_DRIFT = 0.05  # precomputed impacts are refreshed once the average length moves this much
+
+STOPWORDS = frozenset({'a', 'an', 'and', 'by', 'for', 'in', 'of', 'on', 'or', 'the', 'to', 'with'})
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def normalize(text: str) -> str:
+    """Lowercase and strip accents ("Beyoncé" -> "beyonce")"""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text: str, keep_stopwords: bool = False) -> List[str]:
+    tokens = _TOKEN_RE.findall(normalize(text))
+    if keep_stopwords:
+        return tokens
+    return [token for token in tokens if token not in STOPWORDS]
+
+
+def _field_text(value) -> str:
+    if isinstance(value, (list, tuple)):
+        return ' '.join(str(item) for item in value)
+    return str(value) if value else ''
+
+
+class _Postings:
+    """Documents containing a term and the term's weighted frequency in each"""
+
+    __slots__ = ('docs', 'tfs', 'live', 'impacts', 'generation')
+
+    def __init__(self):
+        self.docs = array('i')
+        self.tfs = array('f')
+        self.live = 0  # document frequency, not counting replaced/removed documents
+        self.impacts: Optional[np.ndarray] = None  # BM25 tf component per posting, filled at query time
+        self.generation = -1
+
+
+class SearchIndex:
+    """
+    BM25 inverted index over tracks. Document numbers are assigned in
+    insertion order; replacing or removing a track tombstones its old
+    document, and the index is rebuilt once tombstones outnumber live tracks.
+    """
+
+    def __init__(self, tracks: Iterable[Dict] = ()):
+        self._lock = threading.RLock()
+        self._reset()
+        self.add_many(tracks)
+
+    def _reset(self) -> None:
+        self._tracks: Dict[str, Dict] = {}
+        self._doc_of: Dict[str, int] = {}
+        self._doc_ids: List[str] = []
+        self._doc_terms: List[Tuple[str, ...]] = []
+        self._lengths = array('f')
+        self._alive = array('b')
+        self._genres = array('i')
+        self._genre_codes: Dict[str, int] = {}
+        self._postings: Dict[str, _Postings] = {}
+        self._vocab: List[str] = []  # sorted, for prefix expansion
+        self._total_length = 0.0
+        self._dead = 0
+        self._avgdl_basis = 0.0  # average document length the cached impacts were computed with
+        self._generation = 0
+
+    def __len__(self) -> int:
+        return len(self._tracks)
+
+    def __contains__(self, track_id: str) -> bool:
+        return track_id in self._tracks
+
+    def _terms(self, track: Dict) -> Counter:
+        weighted = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in tokenize(_field_text(track.get(field))):
+                weighted[term] += weight
+        return weighted
+
+    def _genre_code(self, genre) -> int:
+        name = normalize(str(genre or '')).strip()
+        code = self._genre_codes.get(name)
+        if code is None:
+            code = self._genre_codes[name] = len(self._genre_codes)
+        return code
+
+    def _unindex(self, track_id: str) -> None:
+        doc = self._doc_of.pop(track_id)
+        self._alive[doc] = 0
+        self._total_length -= self._lengths[doc]
+        for term in self._doc_terms[doc]:
+            self._postings[term].live -= 1
+        self._doc_terms[doc] = ()
+        self._dead += 1
+
+    def _index(self, track_id: str, track: Dict) -> None:
+        doc = len(self._doc_ids)
+        weighted = self._terms(track)
+        for term, tf in weighted.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = _Postings()
+                insort(self._vocab, term)
+            postings.docs.append(doc)
+            postings.tfs.append(tf)
+            postings.live += 1
+        length = float(sum(weighted.values()))
+        self._doc_ids.append(track_id)
+        self._doc_terms.append(tuple(weighted))
+        self._lengths.append(length)
+        self._alive.append(1)
+        self._genres.append(self._genre_code(track.get('genre')))
+        self._doc_of[track_id] = doc
+        self._tracks[track_id] = track
+        self._total_length += length
+
+    def add(self, track: Dict) -> None:
+        """Index a track, replacing any earlier version with the same id"""
+        track_id = str(track['id'])
+        with self._lock:
+            if track_id in self._doc_of:
+                self._unindex(track_id)
+            self._index(track_id, track)
+            self._maybe_compact()
+
+    def add_many(self, tracks: Iterable[Dict]) -> int:
+        count = 0
+        with self._lock:
+            for track in tracks:
+                if not track.get('id'):
+                    continue
+                track_id = str(track['id'])
+                if track_id in self._doc_of:
+                    self._unindex(track_id)
+                self._index(track_id, track)
+                count += 1
+            self._maybe_compact()
+        return count
+
+    def remove(self, track_id: str) -> bool:
+        with self._lock:
+            if track_id not in self._doc_of:
+                return False
+            self._unindex(track_id)
+            del self._tracks[track_id]
+            self._maybe_compact()
+            return True
+
+    def _maybe_compact(self) -> None:
+        if self._dead > max(1024, len(self._tracks)):
+            tracks = list(self._tracks.values())
+            self._reset()
+            for track in tracks:
+                self._index(str(track['id']), track)
+
+    def _expand(self, prefix: str) -> List[str]:
+        """Vocabulary terms starting with prefix, most frequent first"""
+        start = bisect_left(self._vocab, prefix)
+        candidates = []
+        for term in self._vocab[start:start + MAX_PREFIX_SCAN]:
+            if not term.startswith(prefix):
+                break
+            if self._postings[term].live:
+                candidates.append(term)
+        ranked = heapq.nlargest(MAX_EXPANSIONS, candidates, key=lambda term: self._postings[term].live)
+        if len(candidates) > MAX_EXPANSIONS and prefix in self._postings and prefix not in ranked \
+                and self._postings[prefix].live:
+            ranked[-1] = prefix  # the word as typed always counts
+        return ranked
+
+    def _query_terms(self, query: str, prefix: bool) -> List[List[str]]:
+        """Per query token, the index terms that satisfy it (the last one by prefix)"""
+        tokens = tokenize(query, keep_stopwords=True)
+        groups = []
+        for position, token in enumerate(tokens):
+            if prefix and position == len(tokens) - 1:
+                groups.append(self._expand(token))
+            elif token not in STOPWORDS:
+                groups.append([token] if token in self._postings else [])
+        return groups
+
+    def search(self, query: str, genre: Optional[str] = None, limit: int = 20,
+               prefix: bool = True) -> Tuple[List[Tuple[Dict, float]], int]:
+        """
+        Tracks matching every query term (the last one as a prefix when
+        prefix=True), ranked by BM25. genre (None or 'all' for any) restricts
+        the posting lists before scoring. Returns ([(track, score)], total matches).
+        """
+        with self._lock:
+            groups = self._query_terms(query, prefix)
+            if not groups or not all(groups):
+                return [], 0
+            genre_code = None
+            if genre and genre.strip().lower() != 'all':
+                genre_code = self._genre_codes.get(normalize(genre).strip())
+                if genre_code is None:
+                    return [], 0
+
+            n_docs = len(self._doc_ids)
+            live = len(self._tracks)
+            lengths = np.frombuffer(self._lengths, dtype=np.float32)
+            self._check_avgdl()
+            # Documents still eligible: live, in the genre, and (after each group) matching every term so far
+            allowed = np.frombuffer(self._alive, dtype=np.int8).astype(bool)
+            if genre_code is not None:
+                allowed &= np.frombuffer(self._genres, dtype=np.int32) == genre_code
+            scores = np.zeros(n_docs, dtype=np.float32)
+
+            # Rarest group first, so the common terms only score documents that already match
+            groups.sort(key=lambda terms: sum(self._postings[term].live for term in terms))
+            for terms in groups:
+                hit = np.zeros(n_docs, dtype=bool)
+                for term in terms:
+                    postings = self._postings[term]
+                    docs = np.frombuffer(postings.docs, dtype=np.int32)
+                    impacts = self._impacts(postings, docs, lengths)
+                    keep = allowed[docs]
+                    docs, impacts = docs[keep], impacts[keep]
+                    if not len(docs):
+                        continue
+                    idf = math.log(1.0 + (live - postings.live + 0.5) / (postings.live + 0.5))
+                    scores[docs] += np.float32(idf) * impacts
+                    hit[docs] = True
+                allowed = hit
+
+            candidates = np.flatnonzero(allowed)
+            total = len(candidates)
+            if not total or limit <= 0:
+                return [], total
+            candidate_scores = scores[candidates]
+            if total > limit:
+                top = np.argpartition(-candidate_scores, limit - 1)[:limit]
+                candidates, candidate_scores = candidates[top], candidate_scores[top]
+            order = np.lexsort((candidates, -candidate_scores))
+            return [
+                (self._tracks[self._doc_ids[doc]], round(float(score), 4))
+                for doc, score in zip(candidates[order], candidate_scores[order])
+            ], total
+
+    def _check_avgdl(self) -> None:
+        live = len(self._tracks)
+        avgdl = self._total_length / live if live else 1.0
+        if not self._avgdl_basis or abs(avgdl - self._avgdl_basis) > AVGDL_DRIFT * self._avgdl_basis:
+            self._avgdl_basis = avgdl or 1.0
+            self._generation += 1
+
+    def _impacts(self, postings: _Postings, docs: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+        """
+        tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl)) for every posting,
+        cached per term and extended as postings are appended
+        """
+        cached = postings.impacts if postings.generation == self._generation else None
+        done = 0 if cached is None else len(cached)
+        if done == len(docs):
+            return cached
+        tfs = np.frombuffer(postings.tfs, dtype=np.float32)[done:]
+        norm = np.float32(K1) * (np.float32(1.0 - B) + np.float32(B / self._avgdl_basis) * lengths[docs[done:]])
+        fresh = tfs * np.float32(K1 + 1.0) / (tfs + norm)
+        postings.impacts = fresh if cached is None else np.concatenate((cached, fresh))
+        postings.generation = self._generation
+        return postings.impacts
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Dict]:
+        """Typeahead: completions of the last word of prefix, with how many tracks contain each"""
+        tokens = tokenize(prefix, keep_stopwords=True)
+        if not tokens:
+            return []
+        head = ' '.join(tokens[:-1])
+        with self._lock:
+            completions = self._expand(tokens[-1])[:limit]
+            return [
+                {'text': f"{head} {term}" if head else term, 'tracks': self._postings[term].live}
+                for term in completions
+            ]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'tracks': len(self._tracks),
+                'documents': len(self._doc_ids),
+                'tombstones': self._dead,
+                'terms': len(self._vocab),
+                'postings': sum(len(postings.docs) for postings in self._postings.values())
+            }
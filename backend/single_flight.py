@@ -0,0 +1,177 @@
+"""
+Single-flight request coalescing
+Concurrent calls with the same key share one execution: the first caller
+runs it, duplicates wait on its future. An optional lock directory extends
+this across worker processes on the same host.
+"""
+
+import errno
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to exclusive-create lock files
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+STALE_LOCK_SECONDS = 600  # only used by the exclusive-create fallback
+POLL_SECONDS = 0.05
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls by key.
+    func must be idempotent and re-check for finished work itself: when another
+    process held the lock, it runs again after that process is done. If func
+    raises an exception whose `pending` attribute is a future still running
+    (work that timed out but could not be stopped), waiters get the same
+    exception and the flight, lock included, stays held until that future
+    settles, so no duplicate of the work can start meanwhile.
+    """
+
+    def __init__(self, lock_dir: Optional[str] = None):
+        self.lock_dir = lock_dir
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.suppressed = 0
+        self.cross_process_waits = 0
+        self.failures = 0
+        self.held_for_pending = 0
+        if lock_dir:
+            os.makedirs(lock_dir, exist_ok=True)
+
+    def do(self, key: str, func: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run func once per key among concurrent callers; returns (result, shared)"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self.leaders += 1
+            else:
+                self.suppressed += 1
+
+        if not leader:
+            return future.result(), True
+
+        release = None
+        deferred = False
+        try:
+            release = self._acquire(key)
+            result = func()
+        except BaseException as e:
+            with self._lock:
+                self.failures += 1
+            future.set_exception(e)
+            pending = getattr(e, 'pending', None)
+            if isinstance(pending, Future) and not pending.done():
+                with self._lock:
+                    self.held_for_pending += 1
+                deferred = True
+                pending.add_done_callback(lambda _: self._finish(key, release))
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            if not deferred:
+                self._finish(key, release)
+
+    def _finish(self, key: str, release: Optional[Callable[[], None]]) -> None:
+        try:
+            if release is not None:
+                release()
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            calls = self.leaders + self.suppressed
+            return {
+                'in_flight': len(self._calls),
+                'leaders': self.leaders,
+                'suppressed': self.suppressed,
+                'cross_process_waits': self.cross_process_waits,
+                'failures': self.failures,
+                'held_for_pending': self.held_for_pending,
+                'suppression_rate': round(self.suppressed / calls, 4) if calls else 0.0
+            }
+
+    def _acquire(self, key: str) -> Optional[Callable[[], None]]:
+        """Take the cross-process lock for key; returns its release function"""
+        if not self.lock_dir:
+            return None
+        path = os.path.join(self.lock_dir, f"{key}.lock")
+        if fcntl is not None:
+            return self._acquire_flock(path)
+        return self._acquire_lock_file(path)
+
+    def _acquire_flock(self, path: str) -> Callable[[], None]:
+        while True:
+            fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o644)
+            try:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    with self._lock:
+                        self.cross_process_waits += 1
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                # The holder unlinks the file before unlocking; if the inode we
+                # locked is no longer at path, someone else may lock a new one
+                try:
+                    current = os.stat(path).st_ino == os.fstat(fd).st_ino
+                except FileNotFoundError:
+                    current = False
+            except BaseException:
+                os.close(fd)
+                raise
+            if not current:
+                os.close(fd)
+                continue
+
+            def release() -> None:
+                try:
+                    os.unlink(path)
+                finally:
+                    os.close(fd)  # also releases the flock
+            return release
+
+    def _acquire_lock_file(self, path: str) -> Callable[[], None]:
+        waited = False
+        while True:
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+                break
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+            if not waited:
+                waited = True
+                with self._lock:
+                    self.cross_process_waits += 1
+            try:
+                if time.time() - os.path.getmtime(path) > STALE_LOCK_SECONDS:
+                    logger.warning(f"⚠️ Removing stale lock file {path}")
+                    os.unlink(path)
+                    continue
+            except FileNotFoundError:
+                continue
+            time.sleep(POLL_SECONDS)
+
+        def release() -> None:
+            os.close(fd)
+            os.unlink(path)
+        return release
@@ -0,0 +1,287 @@
+"""
+Pooled Azure SQL connections
+Opening a connection to Azure SQL costs a TCP + TLS handshake and a login
+round trip, so every SQL access path checks connections out of one pool per
+connection string instead of calling pyodbc.connect per call. Connections are
+validated when they have sat idle, reaped when idle for too long (down to the
+minimum size), and a thread that already holds a connection gets the same one
+back for nested checkouts.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+POOL_MIN_SIZE = 1
+POOL_MAX_SIZE = 10
+CHECKOUT_TIMEOUT = 30.0  # seconds to wait for a free connection before giving up
+VALIDATE_AFTER = 30.0    # connections idle longer than this are pinged on checkout
+IDLE_TIMEOUT = 300.0     # idle connections above min_size are closed after this
+REAP_INTERVAL = 60.0
+CONNECT_TIMEOUT = 30     # login timeout handed to pyodbc.connect
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the checkout timeout"""
+
+
+class ConnectionPool:
+    """
+    Bounded pool of DB-API connections made by connect().
+    Use `with pool.connection() as conn:`; like `with pyodbc.connect(...)`, the
+    block commits on success and rolls back on error, and the connection goes
+    back to the pool instead of being closed.
+    """
+
+    def __init__(self, connect: Callable[[], Any], min_size: int = POOL_MIN_SIZE, max_size: int = POOL_MAX_SIZE,
+                 checkout_timeout: float = CHECKOUT_TIMEOUT, validate_after: float = VALIDATE_AFTER,
+                 idle_timeout: float = IDLE_TIMEOUT, name: str = 'sql'):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError(f"Invalid pool size: min {min_size}, max {max_size}")
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.validate_after = validate_after
+        self.idle_timeout = idle_timeout
+        self.name = name
+        self._idle: List[Tuple[Any, float]] = []  # (connection, returned_at); most recently used last
+        self._size = 0                           # open connections, idle or checked out
+        self._cond = threading.Condition()
+        self._local = threading.local()
+        self._reaper: Optional[threading.Thread] = None
+        self._closed = False
+        self.checkouts = 0
+        self.reused = 0
+        self.created = 0
+        self.discarded = 0
+        self.validation_failures = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _open(self) -> Any:
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.created += 1
+        return conn
+
+    def _discard(self, conn: Any) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self.discarded += 1
+            self._cond.notify()
+
+    @staticmethod
+    def _is_alive(conn: Any) -> bool:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _checkout(self) -> Any:
+        self._ensure_reaper()
+        started = time.monotonic()
+        deadline = started + self.checkout_timeout
+        waited = False
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolTimeout(f"Connection pool '{self.name}' is closed")
+                    if self._idle:
+                        # LIFO: hot connections stay hot, cold ones age out to the reaper
+                        conn, returned_at = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        conn = returned_at = None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolTimeout(f"No connection free in pool '{self.name}' "
+                                          f"after {self.checkout_timeout:g}s ({self.max_size} in use)")
+                    waited = True
+                    self._cond.wait(remaining)
+                wait = time.monotonic() - started
+                self.checkouts += 1
+                if waited:
+                    self.waits += 1
+                    self.wait_seconds += wait
+                    self.max_wait_seconds = max(self.max_wait_seconds, wait)
+
+            if conn is None:
+                return self._open()
+            if time.monotonic() - returned_at < self.validate_after or self._is_alive(conn):
+                with self._cond:
+                    self.reused += 1
+                return conn
+            logger.warning(f"⚠️ Dropping dead connection from pool '{self.name}'")
+            with self._cond:
+                self.validation_failures += 1
+            self._discard(conn)
+
+    def _release(self, conn: Any) -> None:
+        with self._cond:
+            if not self._closed:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+                return
+        self._discard(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Check out a connection for this thread (nested checkouts share it)"""
+        lease = getattr(self._local, 'lease', None)
+        if lease is not None:
+            lease[1] += 1
+            try:
+                yield lease[0]
+            finally:
+                lease[1] -= 1
+            return
+
+        conn = self._checkout()
+        self._local.lease = [conn, 1]
+        healthy = True
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            try:
+                conn.rollback()
+            except Exception:
+                healthy = False  # the session is gone; don't hand it out again
+            raise
+        finally:
+            self._local.lease = None
+            if healthy:
+                self._release(conn)
+            else:
+                self._discard(conn)
+
+    def prefill(self) -> None:
+        """Open connections up to min_size now; raises if the database is unreachable"""
+        while True:
+            with self._cond:
+                if self._size >= max(self.min_size, 1):
+                    return
+                self._size += 1
+            self._release(self._open())
+
+    def reap(self) -> int:
+        """Close connections idle for longer than idle_timeout, keeping min_size open"""
+        cutoff = time.monotonic() - self.idle_timeout
+        expired = []
+        with self._cond:
+            # Oldest first; _idle is ordered by return time
+            while self._idle and self._idle[0][1] < cutoff and self._size - len(expired) > self.min_size:
+                expired.append(self._idle.pop(0)[0])
+        for conn in expired:
+            self._discard(conn)
+        if expired:
+            logger.info(f"🧹 Closed {len(expired)} idle connection(s) in pool '{self.name}'")
+        return len(expired)
+
+    def _ensure_reaper(self) -> None:
+        if self._reaper is not None or self.idle_timeout <= 0:
+            return
+        with self._cond:
+            if self._reaper is not None:
+                return
+
+            def run() -> None:
+                while not self._closed:
+                    time.sleep(min(REAP_INTERVAL, self.idle_timeout))
+                    try:
+                        self.reap()
+                    except Exception as e:
+                        logger.warning(f"⚠️ Pool reaper error: {e}")
+
+            self._reaper = threading.Thread(target=run, name=f"{self.name}-pool-reaper", daemon=True)
+            self._reaper.start()
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'checkouts': self.checkouts,
+                'reused': self.reused,
+                'created': self.created,
+                'discarded': self.discarded,
+                'validation_failures': self.validation_failures,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'wait_seconds_total': round(self.wait_seconds, 4),
+                'wait_seconds_max': round(self.max_wait_seconds, 4)
+            }
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._discard(conn)
+
+
+# One pool per connection string, shared by every manager in the process
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(connection_string: str, **options) -> ConnectionPool:
+    """The process-wide pool for a connection string, created on first use"""
+    with _pools_lock:
+        pool = _pools.get(connection_string)
+        if pool is None:
+            def connect():
+                import pyodbc
+                return pyodbc.connect(connection_string, timeout=CONNECT_TIMEOUT)
+
+            pool = ConnectionPool(connect, name=f"sql-{len(_pools) + 1}", **options)
+            _pools[connection_string] = pool
+        return pool
+
+
+def pool_stats() -> Dict[str, Dict]:
+    """Stats for every pool, keyed by pool name (connection strings hold credentials)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {pool.name: pool.stats() for pool in pools}
+
+
+def close_all_pools() -> None:
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+atexit.register(close_all_pools)
@@ -0,0 +1,57 @@
+"""
+Async token-bucket rate limiting
+Each upstream API gets its own bucket sized from its configured requests per
+second, so sources can be fetched concurrently without breaking their limits.
+"""
+
+import asyncio
+import time
+from typing import Dict, Optional
+
+
+class AsyncTokenBucket:
+    """
+    rate tokens per second, holding at most capacity (the allowed burst).
+    Waiters are served in arrival order.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self.acquired = 0
+        self.waited_seconds = 0.0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """Wait until tokens are available and take them; returns seconds waited"""
+        if tokens > self.capacity:
+            raise ValueError("cannot acquire more tokens than the bucket holds")
+        waited = 0.0
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                delay = (tokens - self._tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+                self._refill()
+            self._tokens -= tokens
+            self.acquired += 1
+            self.waited_seconds += waited
+        return waited
+
+    def stats(self) -> Dict:
+        return {
+            'rate': self.rate,
+            'capacity': self.capacity,
+            'acquired': self.acquired,
+            'waited_seconds': round(self.waited_seconds, 3)
+        }
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Multi-resolution waveform peak index
+Every audio file gets a small .peaks sidecar holding int8 min/max pairs at
+256/1024/4096 samples per bin, so waveforms are served by slicing a
+memory-mapped file instead of decoding audio at request time.
+Build sidecars for existing files: python waveform_index.py <audio files...>
+"""
+
+import io
+import logging
+import mmap
+import os
+import struct
+import sys
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'PEAK'
+FORMAT_VERSION = 1
+LEVELS = (256, 1024, 4096)  # samples per bin, each a multiple of the first
+PEAK_SCALE = 127
+PEAKS_EXTENSION = '.peaks'
+
+# magic, version, level count, sample rate, total samples
+HEADER = struct.Struct('<4sBBIQ')
+# samples per bin, bin count, byte offset of the interleaved (min, max) int8 pairs
+LEVEL_ENTRY = struct.Struct('<IIQ')
+
+
+def peaks_path(audio_path: str) -> str:
+    """Sidecar path next to an audio file (extension replaced)"""
+    return os.path.splitext(audio_path)[0] + PEAKS_EXTENSION
+
+
+class PeakBuilder:
+    """Accumulates the finest level block by block; coarser levels are reduced from it"""
+
+    def __init__(self, sample_rate: int, levels: Tuple[int, ...] = LEVELS):
+        self.sample_rate = sample_rate
+        self.levels = levels
+        self.bin_size = levels[0]
+        self.num_samples = 0
+        self._mins: List[np.ndarray] = []
+        self._maxs: List[np.ndarray] = []
+        self._carry = np.empty(0, dtype=np.float32)
+
+    def add(self, block: np.ndarray) -> None:
+        """Feed the next mono float block ([-1, 1])"""
+        self.num_samples += len(block)
+        if len(self._carry):
+            block = np.concatenate((self._carry, block))
+        full = len(block) - len(block) % self.bin_size
+        if full:
+            bins = block[:full].reshape(-1, self.bin_size)
+            self._mins.append(bins.min(axis=1))
+            self._maxs.append(bins.max(axis=1))
+        self._carry = np.array(block[full:], dtype=np.float32)
+
+    def finish(self) -> bytes:
+        """Serialized peak file for everything added so far"""
+        mins, maxs = list(self._mins), list(self._maxs)
+        if len(self._carry):
+            mins.append(self._carry.min(keepdims=True))
+            maxs.append(self._carry.max(keepdims=True))
+        base_min = quantize(np.concatenate(mins) if mins else np.zeros(0), np.floor)
+        base_max = quantize(np.concatenate(maxs) if maxs else np.zeros(0), np.ceil)
+
+        header = HEADER.pack(MAGIC, FORMAT_VERSION, len(self.levels), self.sample_rate, self.num_samples)
+        offset = HEADER.size + LEVEL_ENTRY.size * len(self.levels)
+        entries, payloads = [], []
+        for samples_per_bin in self.levels:
+            factor = samples_per_bin // self.bin_size
+            level_min = _reduce(base_min, factor, np.minimum)
+            level_max = _reduce(base_max, factor, np.maximum)
+            pairs = np.empty(2 * len(level_min), dtype=np.int8)
+            pairs[0::2], pairs[1::2] = level_min, level_max
+            entries.append(LEVEL_ENTRY.pack(samples_per_bin, len(level_min), offset))
+            payloads.append(pairs.tobytes())
+            offset += len(pairs)
+        return header + b''.join(entries) + b''.join(payloads)
+
+
+def quantize(values: np.ndarray, rounding) -> np.ndarray:
+    """Map [-1, 1] to int8, rounding outward so peaks are never understated"""
+    return np.clip(rounding(np.asarray(values, dtype=np.float64) * PEAK_SCALE), -PEAK_SCALE, PEAK_SCALE).astype(np.int8)
+
+
+def _reduce(values: np.ndarray, factor: int, op) -> np.ndarray:
+    if factor == 1 or not len(values):
+        return values
+    return op.reduceat(values, np.arange(0, len(values), factor))
+
+
+def build_peaks(audio: np.ndarray, sample_rate: int) -> bytes:
+    builder = PeakBuilder(sample_rate)
+    builder.add(audio)
+    return builder.finish()
+
+
+def write_peaks(path: str, data: bytes) -> None:
+    """Atomically write a peak file"""
+    # Unique per writer, so concurrent renders of one track never share a temp file
+    tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.part"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class PeakIndex:
+    """Read-only view over a .peaks file through mmap"""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n_levels, self.sample_rate, self.num_samples = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._mmap.close()
+            raise ValueError(f"Not a peak file: {path}")
+        self.levels: List[Tuple[int, int, int]] = [
+            LEVEL_ENTRY.unpack_from(self._mmap, HEADER.size + i * LEVEL_ENTRY.size) for i in range(n_levels)
+        ]
+
+    @property
+    def duration(self) -> float:
+        return self.num_samples / self.sample_rate if self.sample_rate else 0.0
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def __enter__(self) -> "PeakIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _level(self, bins: int) -> Tuple[int, np.ndarray]:
+        """Coarsest level with at least bins bins (the finest one if none has enough)"""
+        candidates = [level for level in self.levels if level[1] >= bins]
+        samples_per_bin, count, offset = max(candidates) if candidates else min(self.levels)
+        pairs = np.frombuffer(self._mmap, dtype=np.int8, count=2 * count, offset=offset)
+        return samples_per_bin, pairs.reshape(-1, 2)
+
+    def peaks(self, bins: int) -> Dict:
+        """Min/max envelope resampled to at most bins bins, scaled to [-1, 1]"""
+        samples_per_bin, pairs = self._level(max(1, bins))
+        if len(pairs) > bins:
+            edges = np.linspace(0, len(pairs), bins + 1).astype(np.intp)[:-1]
+            mins = np.minimum.reduceat(pairs[:, 0], edges)
+            maxs = np.maximum.reduceat(pairs[:, 1], edges)
+        else:
+            mins, maxs = pairs[:, 0], pairs[:, 1]
+        scale = 1.0 / PEAK_SCALE
+        return {
+            'bins': len(mins),
+            'samples_per_bin': self.num_samples / len(mins) if len(mins) else samples_per_bin,
+            'sample_rate': self.sample_rate,
+            'duration': round(self.duration, 3),
+            'min': np.round(mins * scale, 3).tolist(),
+            'max': np.round(maxs * scale, 3).tolist()
+        }
+
+
+def load_waveform(path: str, bins: int) -> Optional[Dict]:
+    """Peaks for a sidecar path, or None if there is no usable index"""
+    if not os.path.isfile(path):
+        return None
+    try:
+        with PeakIndex(path) as index:
+            return index.peaks(bins)
+    except (OSError, ValueError, struct.error) as e:
+        logger.warning(f"⚠️ Unreadable peak index {path}: {e}")
+        return None
+
+
+def waveform_summary(path: str, bins: int = 12) -> Optional[List[float]]:
+    """Bar heights in [0, 1] (the shape of the legacy waveform lists)"""
+    waveform = load_waveform(path, bins)
+    if waveform is None:
+        return None
+    return [round(max(-lo, hi), 3) for lo, hi in zip(waveform['min'], waveform['max'])]
+
+
+def decode_audio(data: bytes, filename: str) -> Tuple[np.ndarray, int]:
+    """Mono float32 samples of an encoded file; WAV via scipy, anything else via pydub"""
+    if filename.lower().endswith('.wav'):
+        from scipy.io import wavfile
+        sample_rate, audio = wavfile.read(io.BytesIO(data))
+        if audio.dtype.kind in 'iu':
+            info = np.iinfo(audio.dtype)
+            audio = (audio.astype(np.float32) - (info.max + info.min + 1) / 2) / ((info.max - info.min + 1) / 2)
+    else:
+        from pydub import AudioSegment
+        segment = AudioSegment.from_file(io.BytesIO(data))
+        sample_rate = segment.frame_rate
+        audio = np.array(segment.get_array_of_samples(), dtype=np.float32) / (1 << (8 * segment.sample_width - 1))
+        if segment.channels > 1:
+            audio = audio.reshape(-1, segment.channels)
+    audio = np.asarray(audio, dtype=np.float32)
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+    return audio, int(sample_rate)
+
+
+def build_for_bytes(data: bytes, filename: str) -> Optional[bytes]:
+    """Peak file for an encoded upload, or None if it cannot be decoded here"""
+    try:
+        audio, sample_rate = decode_audio(data, filename)
+    except ImportError as e:
+        logger.warning(f"⚠️ Cannot decode {filename} for peaks: {e}")
+        return None
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to decode {filename} for peaks: {e}")
+        return None
+    return build_peaks(audio, sample_rate)
+
+
+def build_for_file(audio_path: str) -> Optional[str]:
+    """Write the sidecar for an audio file on disk; returns its path"""
+    with open(audio_path, 'rb') as f:
+        data = build_for_bytes(f.read(), audio_path)
+    if data is None:
+        return None
+    path = peaks_path(audio_path)
+    write_peaks(path, data)
+    return path
+
+
+def main(paths: Iterable[str]) -> int:
+    failed = 0
+    for audio_path in paths:
+        path = build_for_file(audio_path)
+        if path:
+            print(f"✅ {path}")
+        else:
+            print(f"❌ {audio_path}")
+            failed += 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,139 @@
+"""
+Band-limited wavetable oscillators for the procedural renderer
+Single-cycle tables are built once per timbre and harmonic count, then every
+voice renders by phase-accumulator lookup instead of one np.sin per partial
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+
+import audio_dsp
+
+logger = logging.getLogger(__name__)
+
+TABLE_BITS = 11
+TABLE_SIZE = 1 << TABLE_BITS  # samples per cycle
+PHASE_BITS = 32  # uint32 phase accumulator, wraps once per cycle for free
+FRACTION_BITS = PHASE_BITS - TABLE_BITS
+FRACTION_SCALE = 1.0 / (1 << FRACTION_BITS)
+
+
+class Wavetable:
+    """One single-cycle table plus the per-sample slopes used for interpolation"""
+
+    def __init__(self, samples: np.ndarray):
+        self.samples = np.ascontiguousarray(samples, dtype=np.float32)
+        self.slopes = (np.roll(self.samples, -1) - self.samples).astype(np.float32)
+
+    @classmethod
+    def from_harmonics(cls, amplitudes: Sequence[float], size: int = TABLE_SIZE) -> "Wavetable":
+        """Additive sine series: amplitudes[k] is the level of harmonic k + 1"""
+        phase = np.arange(size, dtype=np.float64) * (audio_dsp.TWO_PI / size)
+        samples = np.zeros(size, dtype=np.float64)
+        for k, amplitude in enumerate(amplitudes):
+            samples += amplitude * np.sin((k + 1) * phase)
+        return cls(samples)
+
+
+class WavetableBank:
+    """
+    Timbres keyed by name, each a mip-chain of tables where level n holds the
+    first n + 1 harmonics. A voice picks the richest level whose top harmonic
+    stays below Nyquist, which keeps every table band-limited at any pitch.
+    """
+
+    def __init__(self, cache_path: Optional[str] = None):
+        self.cache_path = cache_path
+        self._timbres: Dict[str, List[Wavetable]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, amplitudes: Sequence[float]) -> None:
+        """Build (or load from the cache file) the tables for a timbre"""
+        amplitudes = [float(a) for a in amplitudes]
+        with self._lock:
+            tables = self._load_cached(name, amplitudes)
+            if tables is None:
+                tables = [Wavetable.from_harmonics(amplitudes[:n]) for n in range(1, len(amplitudes) + 1)]
+                self._save_cached(name, amplitudes, tables)
+            self._timbres[name] = tables
+
+    def table_for(self, timbre: str, frequency: float,
+                  sample_rate: int = audio_dsp.SAMPLE_RATE) -> Optional[Wavetable]:
+        """Band-limited table for a voice at frequency, or None if nothing is audible"""
+        tables = self._timbres[timbre]
+        if frequency <= 0:
+            return None
+        harmonics = min(len(tables), int(np.ceil(sample_rate / 2 / frequency)) - 1)
+        return tables[harmonics - 1] if harmonics > 0 else None
+
+    def add_voice(self, out: np.ndarray, timbre: str, frequency: float, amplitude: float = 1.0,
+                  sample_rate: int = audio_dsp.SAMPLE_RATE, start: int = 0) -> np.ndarray:
+        """Accumulate one voice into out (float32) in place, starting at sample start"""
+        table = self.table_for(timbre, frequency, sample_rate)
+        n = len(out)
+        if table is None or not n:
+            return out
+
+        increment = np.uint32(round(frequency / sample_rate * (1 << PHASE_BITS)) % (1 << PHASE_BITS))
+        phase = audio_dsp.scratch.get('wt_phase', n, np.uint32)
+        index = audio_dsp.scratch.get('wt_index', n, np.intp)
+        fraction = audio_dsp.scratch.get('wt_fraction', n)
+        wave = audio_dsp.scratch.get('wt_wave', n)
+
+        # phase = (start + i) * increment, wrapping modulo 2**32
+        np.multiply(audio_dsp.scratch.ramp(n, np.uint32), increment, out=phase)
+        if start:
+            phase += np.uint32((start * int(increment)) % (1 << PHASE_BITS))
+        np.right_shift(phase, FRACTION_BITS, out=index, casting='unsafe')
+        np.bitwise_and(phase, (1 << FRACTION_BITS) - 1, out=phase)
+        np.multiply(phase, np.float32(FRACTION_SCALE), out=fraction, casting='unsafe')
+
+        # Linear interpolation: table[i] + fraction * (table[i + 1] - table[i])
+        np.take(table.slopes, index, out=wave, mode='clip')  # 'raise' would buffer out
+        wave *= fraction
+        np.take(table.samples, index, out=fraction, mode='clip')
+        wave += fraction
+        if amplitude != 1.0:
+            wave *= np.float32(amplitude)
+        out += wave
+        return out
+
+    def _signature(self, name: str, amplitudes: List[float]) -> str:
+        payload = json.dumps({'name': name, 'amplitudes': amplitudes, 'size': TABLE_SIZE}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _cache_file(self, name: str, amplitudes: List[float]) -> str:
+        return os.path.join(self.cache_path, f"wavetable_{self._signature(name, amplitudes)[:16]}.npz")
+
+    def _load_cached(self, name: str, amplitudes: List[float]) -> Optional[List[Wavetable]]:
+        if not self.cache_path:
+            return None
+        try:
+            with np.load(self._cache_file(name, amplitudes)) as data:
+                return [Wavetable(data[f"level_{n}"]) for n in range(len(amplitudes))]
+        except FileNotFoundError:
+            return None
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"⚠️ Rebuilding unreadable wavetable cache for {name}: {e}")
+            return None
+
+    def _save_cached(self, name: str, amplitudes: List[float], tables: List[Wavetable]) -> None:
+        if not self.cache_path:
+            return
+        path = self._cache_file(name, amplitudes)
+        tmp_path = path + '.tmp.npz'
+        try:
+            os.makedirs(self.cache_path, exist_ok=True)
+            np.savez(tmp_path, **{f"level_{n}": table.samples for n, table in enumerate(tables)})
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"⚠️ Failed to cache wavetables for {name}: {e}")
+
+
+# Global bank; set WAVETABLE_CACHE_DIR to persist tables across restarts
+bank = WavetableBank(os.getenv('WAVETABLE_CACHE_DIR') or None)